@@ -31,6 +31,8 @@ DROP TABLE IF EXISTS Replies;
 DROP TABLE IF EXISTS Likes;
 DROP TABLE IF EXISTS Conversations;
 DROP TABLE IF EXISTS Messages;
+DROP TABLE IF EXISTS Counters;
+DROP TABLE IF EXISTS Deleted_Post_Indexes;
 
 -- --------------------------------------------------------
 
@@ -42,7 +44,38 @@ CREATE TABLE `conversations` (
   `conversation_id` int(11) NOT NULL,
   `user_1_id` int(11) NOT NULL,
   `user_2_id` int(11) NOT NULL,
-  `date_created` bigint(20) NOT NULL
+  `date_created` bigint(20) NOT NULL,
+  `user_1_conversation_idx` int(11) NOT NULL DEFAULT 0,
+  `user_2_conversation_idx` int(11) NOT NULL DEFAULT 0,
+  `message_count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `counters`
+--
+
+CREATE TABLE `counters` (
+  `counter_name` varchar(24) NOT NULL,
+  `counter_value` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Dumping data for table `counters`
+--
+
+INSERT INTO `counters` (`counter_name`, `counter_value`) VALUES
+('post_count', 2);
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `deleted_post_indexes`
+--
+
+CREATE TABLE `deleted_post_indexes` (
+  `post_idx` int(11) NOT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -78,7 +111,8 @@ CREATE TABLE `messages` (
   `body` varchar(120) NOT NULL,
   `date_created` bigint(20) NOT NULL,
   `conversation_id` int(11) NOT NULL,
-  `seen` tinyint(1) DEFAULT 0
+  `seen` tinyint(1) DEFAULT 0,
+  `message_idx` int(11) NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -94,16 +128,19 @@ CREATE TABLE `posts` (
   `body` varchar(120) NOT NULL,
   `contains_image` tinyint(1) NOT NULL,
   `view_count` mediumint(9) NOT NULL DEFAULT 0,
-  `old_like_count` mediumint(9) NOT NULL DEFAULT 0
+  `like_count` mediumint(9) NOT NULL DEFAULT 0,
+  `old_like_count` mediumint(9) NOT NULL DEFAULT 0,
+  `reply_count` mediumint(9) NOT NULL DEFAULT 0,
+  `post_idx` int(11) NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
 -- Dumping data for table `posts`
 --
 
-INSERT INTO `posts` (`post_id`, `author_id`, `date_created`, `body`, `contains_image`, `view_count`, `old_like_count`) VALUES
-(1, 2, 1772072134, 'Just made my account. Feeling swag!', 0, 5, 0),
-(2, 1, 1772072922, 'Unsettling fact of the day: Did you know your bones are constantly wet?', 0, 1, 0);
+INSERT INTO `posts` (`post_id`, `author_id`, `date_created`, `body`, `contains_image`, `view_count`, `like_count`, `old_like_count`, `reply_count`, `post_idx`) VALUES
+(1, 2, 1772072134, 'Just made my account. Feeling swag!', 0, 5, 2, 0, 1, 0),
+(2, 1, 1772072922, 'Unsettling fact of the day: Did you know your bones are constantly wet?', 0, 1, 1, 0, 0, 1);
 
 -- --------------------------------------------------------
 
@@ -116,15 +153,16 @@ CREATE TABLE `replies` (
   `parent_post_id` int(11) NOT NULL,
   `author_id` int(11) NOT NULL,
   `date_created` bigint(20) NOT NULL,
-  `body` varchar(120) NOT NULL
+  `body` varchar(120) NOT NULL,
+  `reply_idx` mediumint(9) NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
 -- Dumping data for table `replies`
 --
 
-INSERT INTO `replies` (`reply_id`, `parent_post_id`, `author_id`, `date_created`, `body`) VALUES
-(1, 1, 1, 1772072207, 'Hey Bob!');
+INSERT INTO `replies` (`reply_id`, `parent_post_id`, `author_id`, `date_created`, `body`, `reply_idx`) VALUES
+(1, 1, 1, 1772072207, 'Hey Bob!', 0);
 
 -- --------------------------------------------------------
 
@@ -138,7 +176,8 @@ CREATE TABLE `users` (
   `display_name` varchar(24) NOT NULL,
   `email` varchar(255) NOT NULL,
   `password` varchar(255) NOT NULL,
-  `is_admin` tinyint(1) DEFAULT 0
+  `is_admin` tinyint(1) DEFAULT 0,
+  `conversation_count` int(11) NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -161,12 +200,24 @@ ALTER TABLE `conversations`
   ADD UNIQUE KEY `UC_one_conversation_per_user_pair` (`user_1_id`,`user_2_id`),
   ADD KEY `user_2_id` (`user_2_id`);
 
+--
+-- Indexes for table `counters`
+--
+ALTER TABLE `counters`
+  ADD PRIMARY KEY (`counter_name`);
+
+--
+-- Indexes for table `deleted_post_indexes`
+--
+ALTER TABLE `deleted_post_indexes`
+  ADD PRIMARY KEY (`post_idx`);
+
 --
 -- Indexes for table `likes`
 --
 ALTER TABLE `likes`
   ADD UNIQUE KEY `UC_singular_like_per_post` (`post_id`,`user_id`),
-  ADD KEY `user_id` (`user_id`);
+  ADD KEY `IDX_likes_user_date` (`user_id`,`date_created`);
 
 --
 -- Indexes for table `messages`
@@ -174,7 +225,7 @@ ALTER TABLE `likes`
 ALTER TABLE `messages`
   ADD PRIMARY KEY (`message_id`),
   ADD KEY `author_id` (`author_id`),
-  ADD KEY `conversation_id` (`conversation_id`);
+  ADD KEY `IDX_messages_conversation_message` (`conversation_id`,`message_id`);
 
 --
 -- Indexes for table `posts`
@@ -188,7 +239,7 @@ ALTER TABLE `posts`
 --
 ALTER TABLE `replies`
   ADD PRIMARY KEY (`reply_id`),
-  ADD KEY `parent_post_id` (`parent_post_id`),
+  ADD KEY `IDX_replies_post_reply` (`parent_post_id`,`reply_id`),
   ADD KEY `author_id` (`author_id`);
 
 --
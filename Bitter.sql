@@ -9,6 +9,9 @@ DROP TABLE IF EXISTS Replies;
 DROP TABLE IF EXISTS Likes;
 DROP TABLE IF EXISTS Conversations;
 DROP TABLE IF EXISTS Messages;
+DROP TABLE IF EXISTS Counters;
+DROP TABLE IF EXISTS Deleted_Post_Indexes;
+DROP TABLE IF EXISTS schema_migrations;
 
 -- Users related
 CREATE TABLE Users (
@@ -17,7 +20,8 @@ CREATE TABLE Users (
     display_name VARCHAR(24) NOT NULL,
     email VARCHAR(255) UNIQUE NOT NULL,
     password VARCHAR(255) NOT NULL,
-    is_admin BOOLEAN DEFAULT False
+    is_admin BOOLEAN DEFAULT False,
+    conversation_count INT NOT NULL DEFAULT 0
 );
 
 -- Posts related
@@ -28,7 +32,10 @@ CREATE TABLE Posts (
     body VARCHAR(120) NOT NULL,
     contains_image BOOLEAN NOT NULL,
     view_count MEDIUMINT NOT NULL DEFAULT 0,
+    like_count MEDIUMINT NOT NULL DEFAULT 0,
     old_like_count MEDIUMINT NOT NULL DEFAULT 0,
+    reply_count MEDIUMINT NOT NULL DEFAULT 0,
+    post_idx INT NOT NULL DEFAULT 0,
     FOREIGN KEY (author_id) REFERENCES Users(user_id)
 );
 
@@ -38,8 +45,10 @@ CREATE TABLE Replies (
     author_id INT NOT NULL,
     date_created BIGINT NOT NULL,
     body VARCHAR(120) NOT NULL,
+    reply_idx MEDIUMINT NOT NULL DEFAULT 0,
     FOREIGN KEY (parent_post_id) REFERENCES Posts(post_id),
-    FOREIGN KEY (author_id) REFERENCES Users(user_id)
+    FOREIGN KEY (author_id) REFERENCES Users(user_id),
+    INDEX IDX_replies_post_reply (parent_post_id, reply_id)
 );
 
 CREATE TABLE Likes (
@@ -48,7 +57,8 @@ CREATE TABLE Likes (
     date_created BIGINT NOT NULL,
     FOREIGN KEY (post_id) REFERENCES Posts(post_id),
     FOREIGN KEY (user_id) REFERENCES Users(user_id),
-    CONSTRAINT UC_singular_like_per_post UNIQUE(post_id, user_id)
+    CONSTRAINT UC_singular_like_per_post UNIQUE(post_id, user_id),
+    INDEX IDX_likes_user_date (user_id, date_created)
 );
 
 -- Chat related
@@ -57,6 +67,9 @@ CREATE TABLE Conversations (
     user_1_id INT NOT NULL,
     user_2_id INT NOT NULL,
     date_created BIGINT NOT NULL,
+    user_1_conversation_idx INT NOT NULL DEFAULT 0,
+    user_2_conversation_idx INT NOT NULL DEFAULT 0,
+    message_count INT NOT NULL DEFAULT 0,
     FOREIGN KEY (user_1_id) REFERENCES Users(user_id),
     FOREIGN KEY (user_2_id) REFERENCES Users(user_id),
     CONSTRAINT UC_one_conversation_per_user_pair UNIQUE(user_1_id, user_2_id),
@@ -70,6 +83,21 @@ CREATE TABLE Messages (
     date_created BIGINT NOT NULL,
     conversation_id INT NOT NULL,
     seen BOOLEAN DEFAULT False,
+    message_idx INT NOT NULL DEFAULT 0,
     FOREIGN KEY (author_id) REFERENCES Users(user_id),
-    FOREIGN KEY (conversation_id) REFERENCES Conversations(conversation_id)
+    FOREIGN KEY (conversation_id) REFERENCES Conversations(conversation_id),
+    INDEX IDX_messages_conversation_message (conversation_id, message_id)
+);
+
+-- Counters for content that has no parent row to keep its count on
+CREATE TABLE Counters (
+    counter_name VARCHAR(24) PRIMARY KEY,
+    counter_value INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO Counters (counter_name, counter_value) VALUES ('post_count', 0);
+
+-- The stored post index of every post deleted since the post indexes were last renumbered
+CREATE TABLE Deleted_Post_Indexes (
+    post_idx INT PRIMARY KEY
 );
@@ -1,11 +1,16 @@
-from .config import APP_CONFIG
+import time
+
+# the time the package started being imported, which the startup time breakdown is measured from
+_import_started_at = time.perf_counter()
+
+from .config import APP_CONFIG, DB_POOL_CONFIG
 from flask import Flask
 from flask_socketio import SocketIO
 from flask_wtf import CSRFProtect
-from mysql.connector import pooling
 from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
 from pathlib import Path
-import time, os, dotenv, logging
+import threading, typing, os, dotenv, logging
 
 dotenv.load_dotenv()
 CWD = Path.cwd()
@@ -26,27 +31,67 @@ app.config.update(
 csrf = CSRFProtect(app)
 
 socketio = SocketIO(app)
-socket_rooms : dict[int, list[dict[str, str]]] = {}
-# ^ {conversation_id : [ {"user_id": user_id, "sid": request.sid}, ]}
 
-db_pool = pooling.MySQLConnectionPool(
-    pool_name = "mysql_pool",
-    pool_size = os.getenv("DB_POOL_SIZE", 5),
-    host = os.getenv("DB_HOST", "localhost"),
+# socket rooms are kept per process, while new chat messages are published through the room backend to every Bitter
+# process. the "unix" backend is needed when running more than one worker process
+from .utils.socket_backends import create_room_backend
+
+socket_room_backend = create_room_backend(
+    os.getenv("SOCKET_ROOM_BACKEND", "memory"),
+    os.getenv("SOCKET_BUS_DIR", "/tmp/bitter-socket-bus")
+)
+
+# sessions are not reset when a connection is returned to the pool, since a reset would deallocate the server-side
+# prepared statements that are cached on each connection. uses_db_connection rolls back any unfinished transaction
+# instead. each request or socket event checks out at most one connection, which its db functions share.
+# the pool grows up to DB_POOL_SIZE connections, and checkouts wait for a connection to be returned when it's full.
+# importing Bitter doesn't connect to the database, the pools open their connections on first use or when create_app()
+# prefills them
+from .utils.connection_pool import ElasticConnectionPool
+
+db_pool_config = dict(
+    min_size = int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+    max_size = int(os.getenv("DB_POOL_SIZE", 5)),
+    checkout_timeout = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 2)),
+    idle_timeout = DB_POOL_CONFIG["idle_timeout_seconds"],
+    ping_interval = DB_POOL_CONFIG["ping_interval_seconds"],
+    reap_interval = DB_POOL_CONFIG["reap_interval_seconds"],
     user = os.getenv("DB_USER", "root"),
     password = os.getenv("DB_PASSWORD", ""),
     database = "Bitter"
 )
 
+db_pool = ElasticConnectionPool(
+    pool_name = "mysql_pool",
+    host = os.getenv("DB_HOST", "localhost"),
+    **db_pool_config
+)
+
+# read-only routes read from the replicas in DB_REPLICA_HOSTS, a comma separated list of "host" or "host:port" values.
+# without replicas every route uses the primary
+db_replica_pools : list[ElasticConnectionPool] = []
+
+for replica_idx, replica_host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    replica_host, _, replica_port = replica_host.strip().partition(":")
+
+    db_replica_pools.append(ElasticConnectionPool(
+        pool_name = f"mysql_replica_pool_{replica_idx}",
+        host = replica_host,
+        port = int(replica_port or 3306),
+        **db_pool_config
+    ))
+
 # initialize routes and apis
 from . import (
     main_routes,
     error_routes,
     db_api,
-    socket_api
+    socket_api,
+    commands
 )
 
-from .utils import db_utils
+from .utils import db_utils, schema_utils
+from .utils.password_utils import password_hasher
 
 def setup_logging() -> None:
     log_dir_path = CWD / "logs"
@@ -68,6 +113,97 @@ def setup_logging() -> None:
     app.logger.info("Logging enabled")
 
 
+# seconds spent on each startup step, by step name. filled in by the import of Bitter and by create_app()
+startup_timings : dict[str, float] = {"import": time.perf_counter() - _import_started_at}
+
+_app_created = False
+_create_app_lock = threading.Lock()
+
+@contextmanager
+def _timed_startup_step(step_name : str) -> typing.Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[step_name] = time.perf_counter() - started_at
+
+def _format_startup_timings() -> str:
+    return ", ".join(f"{step_name} {seconds * 1000:.0f} ms" for step_name, seconds in startup_timings.items())
+
+def _bootstrap() -> None:
+    # starting the password hashing fork server, the admin account's password check and opening the minimum number of
+    # pooled connections aren't needed to serve the first requests, so by default they run after startup instead of
+    # delaying it. a hash that's requested before the fork server is started waits for it
+    with _timed_startup_step("start_password_hasher"):
+        password_hasher.start()
+
+    with _timed_startup_step("ensure_admin_account"):
+        db_utils.ensure_admin_account_exists()
+
+    with _timed_startup_step("prefill_pools"):
+        for pool in (db_pool, *db_replica_pools):
+            pool.prefill()
+
+    app.logger.info(f"Bootstrap finished, startup took {_format_startup_timings()}")
+
+def _run_background_bootstrap() -> None:
+    try:
+        _bootstrap()
+    except Exception:
+        app.logger.exception("Background bootstrap failed")
+
+def create_app(background_bootstrap = True) -> Flask:
+    """Prepare the app for serving requests and return it. Sets up logging, checks the admin account password in the
+    environment, applies the database migrations and starts the background tasks. Configuration errors, like a
+    malformed admin account password, are raised from here. The password hashing workers' fork server is started, the
+    admin account is ensured and the connection pools are prefilled on a background thread, unless
+    background_bootstrap is False, in which case they're done before returning. Calling create_app() again returns the
+    same app without repeating any step.
+
+    The time spent on each step is logged and kept in startup_timings.
+
+    Args:
+        background_bootstrap (bool, optional): Whether to bootstrap on a background thread. Defaults to True.
+
+    Raises:
+        ValueError: If the admin account password in the environment is malformed
+
+    Returns:
+        Flask: The app
+    """
+    global _app_created
+
+    with _create_app_lock:
+        if _app_created:
+            return app
+
+        with _timed_startup_step("setup_logging"):
+            setup_logging()
+
+        # only the format of the password is checked here, hashing it is left to the bootstrap
+        with _timed_startup_step("check_config"):
+            db_utils.check_admin_account_password()
+
+        # the code expects the current schema, so migrations are applied before any request is served. with no pending
+        # migrations this only takes a few short queries
+        with _timed_startup_step("migrations"):
+            schema_utils.apply_migrations()
+
+        with _timed_startup_step("start_background_tasks"):
+            for pool in (db_pool, *db_replica_pools):
+                pool.reaper.start()
+
+        _app_created = True
+
+    app.logger.info(f"App created, startup took {_format_startup_timings()}")
+
+    if background_bootstrap:
+        threading.Thread(target = _run_background_bootstrap, name = "startup-bootstrap", daemon = True).start()
+    else:
+        _bootstrap()
+
+    return app
+
 # propegate the Flask socketio run() to Bitter
 def run(host: str | None = None,
         port: int | None = None,
@@ -76,9 +212,7 @@ def run(host: str | None = None,
         allow_unsafe_werkzeug: bool = False) -> None:
     """Run the Flask and Flask SocketIO webserver. Effectively a wrapper of ```flask_socketio```'s ```SocketIO.run```.
     """
-    setup_logging()
-
-    db_utils.ensure_admin_account_exists()
+    create_app()
 
     app.logger.info("Flask startup")
 
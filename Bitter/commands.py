@@ -0,0 +1,102 @@
+from . import app
+from .config import API_CONFIG
+from .utils.db_utils import uses_db_connection, compact_likes
+from .utils.schema_utils import apply_migrations, find_full_scans
+from .utils.db_statements import StatementCursor
+from mysql.connector.pooling import PooledMySQLConnection
+import click
+
+@app.cli.command("reconcile-counters")
+@click.option("--chunk-size", type = int, default = API_CONFIG["counter_reconciliation_chunk_size"],
+              help = "Number of post ids to recount per transaction")
+@uses_db_connection
+def reconcile_counters(chunk_size : int, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> None:
+    """Recompute the like_count and reply_count columns of every post from the likes and replies tables. The posts are
+    recounted in chunks of post ids with a commit after each chunk, so that no single transaction locks a large part of
+    the posts table.
+    """
+    if chunk_size < 1:
+        raise click.BadParameter("Chunk size must be at least 1", param_hint = "--chunk-size")
+
+    db_cursor.execute("fetch_max_post_id")
+    max_post_id = (db_cursor.fetchone() or {}).get("max_post_id", 0)
+
+    recounted_post_count = 0
+
+    # recount each chunk of post ids in its own transaction
+    for chunk_start in range(1, max_post_id + 1, chunk_size):
+        db_cursor.execute("reconcile_post_counters", (chunk_start, chunk_start + chunk_size))
+        db_conn.commit()
+
+        recounted_post_count += max(db_cursor.rowcount, 0)
+        click.echo(f"Reconciled post ids {chunk_start}-{min(chunk_start + chunk_size - 1, max_post_id)}")
+
+    app.logger.info(f"Reconciled the like and reply counters of {recounted_post_count} posts")
+    click.echo(f"Done. Recounted {recounted_post_count} posts")
+
+@app.cli.command("compact-likes")
+def compact_likes_command() -> None:
+    """Run one like compaction pass right away instead of waiting for the background task. Likes beyond each user's
+    like limit are moved into the liked posts' old_like_count values.
+    """
+    compacted_like_count = compact_likes()
+    click.echo(f"Done. Compacted {compacted_like_count} likes")
+
+@app.cli.command("rebuild-content-indexes")
+@uses_db_connection
+def rebuild_content_indexes(db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> None:
+    """Renumber the stored post, reply, conversation and message indexes from scratch, along with the counts they are
+    derived from. Deleting a post records its post index instead of renumbering every newer post, and every timeline
+    page subtracts the recorded indexes below each post, so running this now and then keeps that lookup short. The
+    other indexes are kept contiguous by the routes that create and delete content.
+    """
+    # each kind of content is renumbered in its own transaction. a count is rebuilt in the same transaction as the
+    # indexes that are derived from it
+    statement_groups = {
+        "posts": ["rebuild_post_count", "rebuild_post_indexes", "clear_deleted_post_indexes"],
+        "replies": ["rebuild_reply_indexes"],
+        "conversations": [
+            "rebuild_conversation_counts",
+            "rebuild_user_1_conversation_indexes",
+            "rebuild_user_2_conversation_indexes"
+        ],
+        "messages": ["rebuild_message_counts", "rebuild_message_indexes"]
+    }
+
+    for content_type, statement_names in statement_groups.items():
+        for statement_name in statement_names:
+            db_cursor.execute(statement_name)
+
+        db_conn.commit()
+        click.echo(f"Rebuilt {content_type} indexes")
+
+    app.logger.info("Rebuilt content indexes")
+
+@app.cli.command("migrate")
+def migrate() -> None:
+    """Apply the migrations in Bitter/migrations that haven't been applied to the database yet. Migrations are also
+    applied when the server starts.
+    """
+    applied_migrations = apply_migrations()
+
+    for migration_filename in applied_migrations:
+        click.echo(f"Applied {migration_filename}")
+
+    click.echo(f"Done. Applied {len(applied_migrations)} migrations")
+
+@app.cli.command("check-query-plans")
+@click.option("--min-rows", type = int, default = API_CONFIG["query_plan_full_scan_min_rows"],
+              help = "Smallest estimated row count of a full scan that fails the check")
+def check_query_plans(min_rows : int) -> None:
+    """EXPLAIN the queries that run on almost every request and fail if any of them would scan a whole table or index.
+    Run this against a database with production-like amounts of data, since MySQL scans small tables on purpose.
+    """
+    full_scans = find_full_scans(min_rows)
+
+    for full_scan in full_scans:
+        click.echo(full_scan, err = True)
+
+    if full_scans:
+        raise click.ClickException(f"{len(full_scans)} full scans found in hot queries")
+
+    click.echo("Done. No hot query scans a whole table or index")
@@ -3,16 +3,69 @@ import logging
 
 APP_CONFIG = {
     "CSRF_session_tokens_enabled": False,
-    "JWT_max_age_hours": 31 * 24 # 31 days
+    "JWT_max_age_hours": 31 * 24, # 31 days
+    "JWT_renewal_age_fraction": 0.1, # renew access tokens older than about 3 days
+    "verified_token_cache_max_size": 10000
 }
 
 API_CONFIG = {
-    "account_password_salt_length": 50,
-    "post_fetch_max_results": 5,
-    "reply_fetch_max_results": 5,
-    "conversation_fetch_max_results": 8,
-    "message_fetch_max_results": 10,
-    "user_like_count_limit": 100
+    "post_fetch_default_results": 20,
+    "post_fetch_max_results": 50,
+    "reply_fetch_default_results": 20,
+    "reply_fetch_max_results": 50,
+    "conversation_fetch_default_results": 20,
+    "conversation_fetch_max_results": 50,
+    "message_fetch_default_results": 30,
+    "message_fetch_max_results": 100,
+    "user_like_count_limit": 100,
+    "counter_reconciliation_chunk_size": 1000,
+    "migration_lock_timeout_seconds": 60,
+    "query_plan_full_scan_min_rows": 1000,
+    "view_count_flush_interval_seconds": 5,
+    "view_count_flush_threshold": 500,
+    "view_count_flush_batch_size": 50,
+    "seen_receipt_flush_interval_seconds": 1,
+    "seen_receipt_flush_threshold": 200,
+    "seen_receipt_flush_batch_size": 50,
+    "like_compaction_interval_seconds": 60,
+    "like_compaction_flush_threshold": 100,
+    "like_compaction_max_users_per_run": 100,
+    "like_compaction_batch_size": 100,
+    "timeline_cache_max_pages": 128,
+    "timeline_cache_ttl_seconds": 10,
+    "user_directory_max_size": 10000,
+    "user_directory_ttl_seconds": 30,
+    "user_directory_negative_ttl_seconds": 5,
+    "conversation_cache_max_size": 10000,
+    "conversation_cache_ttl_seconds": 3600,
+    "conversation_cache_negative_ttl_seconds": 5,
+    "recent_writers_max_size": 10000,
+    "read_your_writes_window_seconds": 5
+}
+
+DB_POOL_CONFIG = {
+    "idle_timeout_seconds": 300,
+    "ping_interval_seconds": 30,
+    "reap_interval_seconds": 60
+}
+
+# passwords are hashed by werkzeug in a process pool. method is the full method string werkzeug stores in front of each
+# hash, including its parameters, so that hashes made with other parameters can be told apart and upgraded on login.
+# at most max_queued_hashes hashes are run or queued at once, and requests wait up to queue_timeout_seconds for a place
+# in the queue
+PASSWORD_HASH_CONFIG = {
+    "method": "scrypt:32768:8:1",
+    "salt_length": 50,
+    "process_pool_size": 2,
+    "max_queued_hashes": 64,
+    "queue_timeout_seconds": 5
+}
+
+# the "unix" socket room backend waits up to publish_timeout_seconds for room in a process' receive buffer, and tries
+# publish_attempts times before dropping the message for that process
+SOCKET_BUS_CONFIG = {
+    "publish_timeout_seconds": 0.05,
+    "publish_attempts": 3
 }
 
 LOGGING = {
@@ -42,7 +95,8 @@ FORM_FIELD_LENGTH_LIMITS = {
     "reply_id":             {"min": 1, "max": 24},
     "conversation_id":      {"min": 1, "max": 24},
     "message_body":         {"min": 1, "max": 120},
-    "fetch_content_cursor": {"min": 1, "max": 10},
+    "fetch_content_cursor": {"min": 1, "max": 100},
+    "fetch_content_limit":  {"min": 1, "max": 3},
     "uploads_category":     {"min": 1, "max": 24},
     "uploads_filename":     {"min": 1, "max": 24}
 }
@@ -93,6 +147,10 @@ FORM_FIELD_REGEX_PATTERNS = {
         "message": FORM_VALIDATOR_ERROR_MESSAGES["regexp_alphanum"] + ", space and _ - @ . , ! ? : ;"
     },
     "fetch_content_cursor": {
+        "regex": r"^[A-Za-z0-9_\-\.]+$",
+        "message": FORM_VALIDATOR_ERROR_MESSAGES["regexp_alphanum"] + " and _ - ."
+    },
+    "fetch_content_limit": {
         "regex": r"^[0-9]+$",
         "message": FORM_VALIDATOR_ERROR_MESSAGES["regexp_num"]
     },
@@ -332,6 +390,13 @@ FORM_CONFIG = {
         "default": None,
         "custom_data": {}
     },
+    "fetch_content_limit": {
+        "field_name": "limit",
+        "validators": [],
+        "filters": [],
+        "default": None,
+        "custom_data": {}
+    },
     "uploads_category": {
         "field_name": "Uploads category",
         "validators": [
@@ -1,4 +1,4 @@
-from . import app, CWD
+from . import app, CWD, db_pool, db_replica_pools
 from .forms import (
     LoginForm,
     SignupForm,
@@ -22,21 +22,40 @@ from .utils.misc_utils import (
     make_json_response,
     make_error_response
 )
-from .utils.db_utils import uses_db_connection
+from .utils.db_utils import (
+    uses_db_connection,
+    view_count_buffer,
+    like_compaction_buffer,
+    timeline_cache,
+    patch_cached_posts,
+    user_directory,
+    fetch_user_by_username,
+    update_cached_display_name,
+    get_user_pair,
+    cache_new_conversation,
+    is_recent_writer,
+    release_db_connection,
+    fetch_login_credentials,
+    upgrade_password_hash,
+    fetch_duplicate_username_or_email,
+    create_user_account
+)
+from .utils.password_utils import password_hasher
+from .utils.db_statements import StatementCursor, LIKED_POST_LOOKUP_SIZE
+from .utils.cache_utils import cache_registry
+from .utils.pagination_utils import parse_page_args, make_page
 from flask import (
     request,
     send_file,
     send_from_directory,
     Response
 )
-from .config import API_CONFIG
-from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 from mysql.connector.pooling import PooledMySQLConnection
-from mysql.connector.cursor import MySQLCursorDict
+from mysql.connector import IntegrityError, errorcode
 from datetime import datetime, timezone
-import os, json
+import uuid, os, json
 
 @app.route("/api/uploads", methods = ["GET"])
 @app.route("/api/uploads/<category>", methods = ["GET"])
@@ -72,37 +91,35 @@ def uploads(category = None, filename = None) -> Response:
     return resp
 
 @app.route("/api/login", methods = ["POST"])
-@uses_db_connection
 @validates_CSRF_form(LoginForm)
-@use_only_expected_kwargs
-def login(form : LoginForm, db_cursor : MySQLCursorDict) -> Response:
+def login(form : LoginForm) -> Response:
     input_username = form.username.data
     input_password = form.password.data
 
     # fetch the stored password and check if the inputted password is correct
-    db_cursor.execute(
-        # get user id and password for the user that has the inputted username
-        f"""
-        SELECT user_id, password, is_admin FROM users
-        WHERE username = '{input_username}'
-        """
-    )
-
-    user_query = db_cursor.fetchone() or {}
+    user_query = fetch_login_credentials(input_username)
     
     if not user_query:
         return make_error_response(f"User '{input_username}' doesn't exist", 404)
-    
+
+    # return the connection to the pool before verifying the password, so that it isn't held for the whole hash
+    release_db_connection()
+
     hashed_password = user_query.get("password", "")
-    correct_password = check_password_hash(hashed_password, input_password)
+    correct_password = password_hasher.verify_password(hashed_password, input_password)
 
     if not correct_password:
         return make_error_response(f"Incorrect password for user '{input_username}'", 401)
 
-    # format the Response and attach a JWT access token to it
     user_id = user_query.get("user_id")
     is_admin = user_query.get("is_admin") == 1
 
+    # rehash the password if its hash was made with outdated hash parameters, while the plaintext password is known
+    if password_hasher.needs_upgrade(hashed_password):
+        upgrade_password_hash(user_id, hashed_password, password_hasher.hash_password(input_password))
+        app.logger.info(f"Upgraded password hash of user id '{user_id}'")
+
+    # format the Response and attach a JWT access token to it
     resp = Response("Login successful", 200, mimetype = "text/plain")
     append_access_token_to_response(user_id, is_admin, resp)
 
@@ -112,45 +129,30 @@ def login(form : LoginForm, db_cursor : MySQLCursorDict) -> Response:
 
 @app.route("/api/signup", methods = ["POST"])
 @validates_CSRF_form(SignupForm)
-@uses_db_connection
-def signup(form : SignupForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def signup(form : SignupForm) -> Response:
     display_name = form.display_name.data
     username = form.username.data
     email = form.email.data
     password = form.password.data
 
-    # check if either username of email is unavailable
-    db_cursor.execute(
-        # select the first value, either username of email, that already exists in the users table
-        f"""
-        SELECT 
-            COALESCE(
-                (SELECT username FROM users WHERE username = '{username}'),
-                (SELECT email FROM users WHERE email = '{email}')
-            ) as result
-        """
-    )
-
-    # return a conflict error if either the username or email value is a duplicate
-    duplicate_value = (db_cursor.fetchone() or {}).get("result")
+    # check if either username of email is unavailable before hashing the password, and return a conflict error if
+    # either the username or email value is a duplicate
+    duplicate_value = fetch_duplicate_username_or_email(username, email)
     if duplicate_value != None:
         unavailable_column = "Username" if duplicate_value == username else "Email"
         return make_error_response(f"{unavailable_column} '{duplicate_value}' is unavailable", 409)
 
-    # generate the password hash and update db
-    hashed_password = generate_password_hash(
-        password,
-        salt_length = API_CONFIG["account_password_salt_length"]
-    )
-
-    db_cursor.execute(
-        # create a new row in users with the inputted values
-        f"""
-        INSERT INTO users (username, display_name, email, password) 
-        VALUES ('{username}', '{display_name}', '{email}', '{hashed_password}')
-        """
-    )
-    db_conn.commit()
+    # return the connection to the pool before generating the password hash, so that it isn't held for the whole hash
+    release_db_connection()
+
+    hashed_password = password_hasher.hash_password(password)
+
+    # another signup may have taken the username or email while the password was hashed
+    if not create_user_account(username, display_name, email, hashed_password):
+        return make_error_response("Username or email is unavailable", 409)
+
+    # the username may be cached as belonging to no user
+    user_directory.delete(username.lower())
 
     # dont log the plaintext password
     account_creation_object = {
@@ -166,7 +168,7 @@ def signup(form : SignupForm, db_conn : PooledMySQLConnection, db_cursor : MySQL
 @login_required
 @validates_CSRF_form(UpdateProfileForm)
 @uses_db_connection
-def update_profile(current_user : dict, form : UpdateProfileForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def update_profile(current_user : dict, form : UpdateProfileForm, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> Response:
     # figure out what the user wants to update
     request_includes_display_name = form.display_name.data != ""
     request_includes_pfp = isinstance(form.pfp.data, FileStorage) and form.pfp.data.filename != ""
@@ -182,13 +184,8 @@ def update_profile(current_user : dict, form : UpdateProfileForm, db_conn : Pool
         display_name = form.display_name.data
 
         # update db
-        db_cursor.execute(
-            # update the display name of the user who's user id is the inputted
-            # user id
-            f"""
-            UPDATE users SET display_name = '{display_name}' WHERE user_id = {user_id}
-            """
-        )
+        # update the display name of the user who's user id is the inputted user id
+        db_cursor.execute("update_display_name", (display_name, user_id))
 
         updated_display_name = True
 
@@ -213,6 +210,11 @@ def update_profile(current_user : dict, form : UpdateProfileForm, db_conn : Pool
 
     db_conn.commit()
 
+    # cached timeline pages and the user directory contain display names
+    if updated_display_name:
+        timeline_cache.clear()
+        update_cached_display_name(user_id, display_name)
+
     # create a "profile_change" object to use for logging and user-feedback
     profile_change = {
         "updated_display_name": updated_display_name,
@@ -239,62 +241,72 @@ def update_profile(current_user : dict, form : UpdateProfileForm, db_conn : Pool
 def create_post(current_user : dict,
                 form : PostCreationForm,
                 db_conn : PooledMySQLConnection,
-                db_cursor : MySQLCursorDict) -> Response:
+                db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_body = form.post_body.data
 
-    # create a post in the db now since storing the image requires the generated post id
     user_id : int = current_user["user_id"]
     date_created = datetime.now(timezone.utc).timestamp() // 1 # floor to seconds
     contains_image = isinstance(form.image.data, FileStorage) and form.image.data.filename != ""
 
-    db_cursor.execute(
-        # create a new row in the posts table with the inputted values
-        f"""
-        INSERT INTO posts (author_id, date_created, body, contains_image) 
-        VALUES ({user_id}, {date_created}, '{post_body}', {contains_image})
-        """
-    )
-    db_cursor.execute(
-        # fetch the post that was just created
-        f"""
-        SELECT
-            posts.*,
-            0 as "like_count",
-            0 as "reply_count",
-            users.username as "author_username",
-            users.display_name as "author_display_name",
-            0 as "user_liked"
-        FROM posts
-        INNER JOIN users ON posts.author_id = users.user_id
-        WHERE author_id = {user_id}
-        ORDER BY post_id DESC
-        LIMIT 1
-        """
-    )
-
-    new_post = db_cursor.fetchone() or {}
-    post_id = new_post.get("post_id")
-    
-    # store the image if one was inputted
+    # the image is checked and saved under a temporary name before the post is created, so that no lock is held while
+    # it's read and written. it's renamed after the post id once the post is committed
+    pending_image_path = None
     if contains_image:
-        # attempt to save the inputted image
-        image_file = form.image.data
-        error_response = handle_user_upload(
-            image_file,
-            f"post-images/{post_id}.png",
-            "post_image"
-        )
-
-        # return an error and rollback the post creation if the image wasnt saved
+        pending_image_name = f"post-images/pending-{uuid.uuid4().hex}.png"
+        error_response = handle_user_upload(form.image.data, pending_image_name, "post_image")
         if error_response:
-            db_conn.rollback()
             return error_response
 
-    db_conn.commit()
+        pending_image_path = CWD / app.config["UPLOAD_FOLDER"] / pending_image_name
+
+    try:
+        # fetch the author's username and display name and the number of deleted post indexes for the response before
+        # the post count is locked
+        db_cursor.execute("fetch_own_profile", (user_id,))
+        author = db_cursor.fetchone() or {}
+
+        db_cursor.execute("fetch_deleted_post_count")
+        deleted_post_count : int = db_cursor.fetchone()["deleted_post_count"]
+
+        # create a new row in the posts table with the inputted values. this locks the post count, which the new post's
+        # stored index is read from. the post count is incremented right before committing, so that the lock is held
+        # briefly, and its new value is returned as the statement's insert id
+        db_cursor.execute("create_post", (user_id, date_created, post_body, contains_image))
+        post_id : int = db_cursor.lastrowid
+
+        db_cursor.execute("increment_post_count")
+        stored_post_idx : int = db_cursor.lastrowid - 1
+
+        db_conn.commit()
+
+    except Exception:
+        if pending_image_path:
+            pending_image_path.unlink(missing_ok = True)
+        raise
+
+    if pending_image_path:
+        pending_image_path.replace(pending_image_path.with_name(f"{post_id}.png"))
+
+    # the new post is built from the inserted values instead of being fetched back. every deleted post index is below
+    # the new post's
+    new_post = {
+        "post_id": post_id,
+        "author_id": user_id,
+        "date_created": int(date_created),
+        "body": post_body,
+        "contains_image": int(contains_image),
+        "view_count": 0,
+        "like_count": 0,
+        "reply_count": 0,
+        "post_idx": stored_post_idx - deleted_post_count,
+        "author_username": author.get("username"),
+        "author_display_name": author.get("display_name"),
+        "user_liked": 0
+    }
 
-    # remove the old_like_count since the user client doesnt need to differentiate between it and like_count
-    new_post.pop("old_like_count")
+    # the new post shifts every timeline page
+    timeline_cache.clear()
 
     app.logger.info(f"Created post {json.dumps(new_post)}")
 
@@ -307,7 +319,7 @@ def create_post(current_user : dict,
 def create_reply(current_user : dict,
                  form : ReplyCreationForm,
                  db_conn : PooledMySQLConnection,
-                 db_cursor : MySQLCursorDict) -> Response:
+                 db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     reply_body = form.reply_body.data
     parent_post_id = form.post_id.data
@@ -316,31 +328,36 @@ def create_reply(current_user : dict,
     user_id : int = current_user["user_id"]
     date_created = datetime.now(timezone.utc).timestamp() // 1 # floor to seconds
 
-    db_cursor.execute(
-        # add a new row to the replies table using the inputted values
-        f"""
-        INSERT INTO replies (parent_post_id, author_id, date_created, body)
-        VALUES ({parent_post_id}, {user_id}, {date_created}, '{reply_body}')
-        """
-    )
-    db_cursor.execute(
-        # fetch the reply_id from the reply that was just created
-        f"""
-        SELECT 
-            replies.*,
-            users.username as "author_username",
-            users.display_name as "author_display_name"
-        FROM replies
-        INNER JOIN users ON replies.author_id = users.user_id
-        WHERE author_id = {user_id}
-        ORDER BY reply_id DESC
-        LIMIT 1
-        """
-    )
-
-    new_reply = db_cursor.fetchone() or {}
+    # fetch the author's username and display name for the response before the parent post is locked
+    db_cursor.execute("fetch_own_profile", (user_id,))
+    author = db_cursor.fetchone() or {}
+
+    # increment the parent post's reply count, which the new reply's index is derived from. no row is matched if the
+    # parent post doesn't exist. the new reply count is returned as the statement's insert id
+    db_cursor.execute("increment_reply_count", (parent_post_id,))
+    if db_cursor.rowcount < 1:
+        return make_error_response(f"Post '{parent_post_id}' doesn't exist", 404)
+
+    reply_idx : int = db_cursor.lastrowid - 1
+
+    # add a new row to the replies table using the inputted values
+    db_cursor.execute("create_reply", (parent_post_id, user_id, date_created, reply_body, reply_idx))
+
+    # the new reply is built from the inserted values instead of being fetched back
+    new_reply = {
+        "reply_id": db_cursor.lastrowid,
+        "parent_post_id": int(parent_post_id),
+        "author_id": user_id,
+        "date_created": int(date_created),
+        "body": reply_body,
+        "reply_idx": reply_idx,
+        "author_username": author.get("username"),
+        "author_display_name": author.get("display_name")
+    }
     db_conn.commit()
 
+    patch_cached_posts("reply_count", {int(parent_post_id): 1})
+
     app.logger.info(f"Created reply {json.dumps(new_reply)}")
     
     return make_json_response(new_reply, 201)
@@ -352,7 +369,7 @@ def create_reply(current_user : dict,
 def create_conversation(current_user : dict,
                         form : ConversationCreationForm,
                         db_conn : PooledMySQLConnection,
-                        db_cursor : MySQLCursorDict) -> Response:
+                        db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     input_username = form.username.data
 
@@ -361,66 +378,43 @@ def create_conversation(current_user : dict,
     date_created = datetime.now(timezone.utc).timestamp() // 1 # floor to seconds
 
     # ensure that the inputted user exists and that a conversation can be created with them and the current user
-    db_cursor.execute(
-        # retrieve the user id corresponding to the inputted username, if it exist. also retreive whether a conversation
-        # already exists with both the user id of the inputted username and the user id of the currently logged in user
-        f"""
-        SELECT
-            user_id,
-            COALESCE(convo_as_u1.conversation_id, convo_as_u2.conversation_id) AS "conversation_id"
-        FROM users
-        LEFT JOIN conversations convo_as_u1 ON (user_id, {user_id}) = (convo_as_u1.user_1_id, convo_as_u1.user_2_id)
-        LEFT JOIN conversations convo_as_u2 ON ({user_id}, user_id) = (convo_as_u2.user_1_id, convo_as_u2.user_2_id)
-        WHERE username = '{input_username}'
-        """
-    )
-
-    user_query = db_cursor.fetchone() or {}
-
-    # return errors for a variety of cases
-    if not user_query:
+    recipient = fetch_user_by_username(input_username, db_cursor)
+    if not recipient:
         return make_error_response(f"User '{input_username}' doesn't exist", 404)
 
-    if user_query.get("conversation_id"):
-        return make_error_response("A conversation with that user already exists", 409)
-    
-    user_id_2 = user_query.get("user_id")
+    user_id_2 = recipient["user_id"]
     if user_id == user_id_2:
         return make_error_response("Can't create a conversation with yourself", 400)
-    
-    # create the conversation in the db
-    db_cursor.execute(
-        # create a new row in the conversations table with the inputted user and the current user
-        f"""
-        INSERT INTO conversations (user_1_id, user_2_id, date_created)
-        VALUES ({user_id}, {user_id_2}, {date_created})
-        """
-    )
+
+    # check whether a conversation already exists between them on the primary, instead of through the conversation
+    # cache, which may still hold a "no conversation" entry from before another request created it
+    db_cursor.execute("fetch_conversation_id", (user_id, user_id_2, user_id_2, user_id))
+    if db_cursor.fetchone():
+        return make_error_response("A conversation with that user already exists", 409)
+
+    # create the conversation in the db with the inputted user and the current user. both users' conversation counts
+    # are incremented first since the new conversation's indexes are derived from them. the lower user id is always
+    # stored as user 1, so that the unique (user_1_id, user_2_id) constraint rejects a conversation created by both
+    # users at once, whichever of them created it
+    user_1_id, user_2_id = get_user_pair(user_id, user_id_2)
+    db_cursor.execute("increment_conversation_counts", (user_1_id, user_2_id))
+
+    try:
+        db_cursor.execute("create_conversation", (date_created, user_1_id, user_2_id))
+    except IntegrityError as error:
+        if error.errno != errorcode.ER_DUP_ENTRY:
+            raise
+
+        db_conn.rollback()
+        return make_error_response("A conversation with that user already exists", 409)
 
     # fetch the newly created conversation
-    db_cursor.execute(
-        # return the conversation id, when the conversation was created, if the most recent message of the conversation
-        # has been seen by the recipient, as well as the recipients display name and username for the newest
-        # conversation the current user is a part of
-        f"""
-        SELECT
-            convos.conversation_id,
-            convos.date_created,
-            0 AS "contains_unseen_messages",
-            COALESCE(u1.user_id, u2.user_id) AS "recipient_user_id",
-            COALESCE(u1.display_name, u2.display_name) AS "recipient_display_name",
-            COALESCE(u1.username, u2.username) AS "recipient_username"
-        FROM conversations convos
-        LEFT JOIN users u1 ON (u1.user_id, {user_id}) = (convos.user_1_id, convos.user_2_id)
-        LEFT JOIN users u2 ON ({user_id}, u2.user_id) = (convos.user_1_id, convos.user_2_id)
-        WHERE {user_id} IN (convos.user_1_id, convos.user_2_id)
-        ORDER BY convos.conversation_id DESC
-        LIMIT 1
-        """
-    )
+    db_cursor.execute("fetch_newest_conversation", (user_id, user_id, user_id))
 
     new_conversation = db_cursor.fetchone() or {}
     db_conn.commit()
+
+    cache_new_conversation(user_id, user_id_2, new_conversation["conversation_id"])
     
     # format the log message
     new_conversation_log_message = new_conversation.copy()
@@ -432,72 +426,60 @@ def create_conversation(current_user : dict,
 
 @app.route("/api/fetch-posts", methods = ["GET"])
 @login_required
-@uses_db_connection
-def fetch_posts(current_user : dict, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+@uses_db_connection(read_only = True)
+@use_only_expected_kwargs
+def fetch_posts(current_user : dict, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
-    cursor = request.args.get("cursor")
-    cursor, error_response = check_user_input_validity(cursor, "fetch_content_cursor")
+    page_args, error_response = parse_page_args("posts", request.args.get("cursor"), request.args.get("limit"))
     if error_response:
         return error_response
 
+    cursor, limit = page_args
     user_id : int = current_user["user_id"]
-    cursor = int(cursor)
-    
-    # fetch posts from db
-    db_cursor.execute(
-        # for each post with post id within a certain range, return all its data, the number of rows in the likes table
-        # with the same post id, the number of rows in the replies table with the same parent post id, and the post
-        # author's username and display name. order these results by descending post id
-        f"""
-        SELECT 
-            posts.*,
-            (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id) as "like_count",
-            (SELECT COUNT(*) FROM replies WHERE replies.parent_post_id = posts.post_id) as "reply_count",
-            users.username as "author_username",
-            users.display_name as "author_display_name",
-            (SELECT EXISTS (SELECT 1 FROM likes WHERE likes.post_id = posts.post_id AND likes.user_id = {user_id})) as "user_liked",
-            (ROW_NUMBER() OVER (ORDER BY posts.post_id ASC) - 1) as "post_idx"
-        FROM posts 
-        INNER JOIN users ON posts.author_id = users.user_id
-        {f"WHERE posts.post_id < {cursor}" if cursor != 0 else ""}
-        ORDER BY posts.post_id DESC
-        LIMIT {API_CONFIG["post_fetch_max_results"]}
-        """
-    )
-
-    posts = db_cursor.fetchall() or []
-
-    db_cursor.execute(
-        # increase the view count by 1 for each post that was just fetched
-        f"""
-        UPDATE posts p1
-        INNER JOIN (
-            SELECT * FROM posts
-            {f"WHERE posts.post_id < {cursor}" if cursor != 0 else ""}
-            ORDER BY post_id DESC
-            LIMIT {API_CONFIG["post_fetch_max_results"]}
-        ) AS p2
-        ON p1.post_id = p2.post_id
-        SET p1.view_count = p1.view_count+1
-        """
-    )
-    
-    db_conn.commit()
 
-    # merge the like_count and old_like_count values since the user client doesnt need to differentiate between them.
-    # also add 1 to the view count to account for the current user
+    # fetch the user-independent part of the page from the timeline cache, or from db if it isn't cached. users who just
+    # wrote something skip the cache, since a cached page may have been read from a replica before their write reached it
+    cache_generation = timeline_cache.generation
+    cached_posts = None if is_recent_writer(user_id) else timeline_cache.get((cursor, limit))
+
+    if cached_posts is None:
+        db_cursor.execute("fetch_timeline_page", (cursor, limit + 1))
+        cached_posts = db_cursor.fetchall() or []
+
+        timeline_cache.set((cursor, limit), cached_posts, generation = cache_generation)
+
+    # copy the cached posts, since the current user's data is added to them below. the post past the limit only shows
+    # whether there's another page, so make_page leaves it out
+    page = make_page("posts", [dict(post) for post in cached_posts], limit)
+    posts = page["posts"]
+
+    # fetch which of the posts the current user has liked. the post id list is padded with post id 0, which never
+    # exists, so that every page fits the same prepared statement
+    post_ids = [post["post_id"] for post in posts]
+    liked_post_ids = set()
+
+    if post_ids:
+        padded_post_ids = post_ids + [0] * (LIKED_POST_LOOKUP_SIZE - len(post_ids))
+        db_cursor.execute("fetch_liked_post_ids", (user_id, *padded_post_ids))
+        liked_post_ids = {like["post_id"] for like in db_cursor.fetchall()}
+
     for post in posts:
-        post["like_count"] += post["old_like_count"]
-        post.pop("old_like_count")
+        post["user_liked"] = int(post["post_id"] in liked_post_ids)
+
+    # count a view for each post that was just fetched. the views are written to db in batches in the background
+    view_count_buffer.add(post["post_id"] for post in posts)
 
-        post["view_count"] += 1
+    # add the views that haven't been written to db yet, including the current user's
+    for post in posts:
+        post["view_count"] += view_count_buffer.pending_count(post["post_id"])
 
-    return make_json_response(posts, 200)
+    return make_json_response(page, 200)
 
 @app.route("/api/fetch-post", methods = ["GET"])
 @login_required
 @uses_db_connection
-def fetch_post(current_user : dict, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+@use_only_expected_kwargs
+def fetch_post(current_user : dict, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_id = request.args.get("post_id")
     post_id, error_response = check_user_input_validity(post_id, "post_id")
@@ -506,151 +488,72 @@ def fetch_post(current_user : dict, db_conn : PooledMySQLConnection, db_cursor :
     
     user_id : int = current_user["user_id"]
 
-    # fetch posts from db
-    db_cursor.execute(
-        # return all post data for the post with the inputted post id as well as the number of rows in the likes table
-        # with the same post id, the number of rows in the replies table with the same parent post id, and the post
-        # author's username and display name
-        f"""
-        SELECT 
-            posts.*,
-            (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id) as "like_count",
-            (SELECT COUNT(*) FROM replies WHERE replies.parent_post_id = posts.post_id) as "reply_count",
-            users.username as "author_username",
-            users.display_name as "author_display_name",
-            (SELECT EXISTS (SELECT 1 FROM likes WHERE likes.post_id = posts.post_id AND likes.user_id = {user_id})) as "user_liked"
-        FROM posts
-        INNER JOIN users ON posts.author_id = users.user_id
-        WHERE post_id = {post_id}
-        """
-    )
-    
+    # fetch the post from db
+    db_cursor.execute("fetch_post", (user_id, post_id))
     post = db_cursor.fetchone() or {}
 
-    db_cursor.execute(
-        # increase the view count by 1 for the post with the inputted post id
-        f"""
-        UPDATE posts SET view_count = view_count+1 
-        WHERE post_id = {post_id}
-        """
-    )
-
-    db_conn.commit()
-
-    # merge the like_count and old_like_count values since the user client doesnt need to differentiate between them.
-    # also add 1 to the view count to account for the current user
+    # count a view for the post. the views are written to db in batches in the background
     if post:
-        post["like_count"] += post["old_like_count"]
-        post.pop("old_like_count")
+        view_count_buffer.add([post["post_id"]])
 
-        post["view_count"] += 1
+        # add the views that haven't been written to db yet, including the current user's
+        post["view_count"] += view_count_buffer.pending_count(post["post_id"])
 
     return make_json_response(post, 200)
 
 @app.route("/api/fetch-replies", methods = ["GET"])
 @login_required
-@uses_db_connection
+@uses_db_connection(read_only = True)
 @use_only_expected_kwargs
-def fetch_replies(db_cursor : MySQLCursorDict) -> Response:
+def fetch_replies(db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_id = request.args.get("post_id")
     post_id, error_response = check_user_input_validity(post_id, "post_id")
     if error_response:
         return error_response
 
-    cursor = request.args.get("cursor")
-    cursor, error_response = check_user_input_validity(cursor, "fetch_content_cursor")
+    page_args, error_response = parse_page_args("replies", request.args.get("cursor"), request.args.get("limit"))
     if error_response:
         return error_response
 
-    cursor = int(cursor)
+    cursor, limit = page_args
     
     # fetch replies from db
-    db_cursor.execute(
-        # for each reply with the parent post id post_id, return all its data as well as the reply index relative to the
-        # parent post, the reply author's username and display name. order these results by descending reply id
-        f"""
-        SELECT 
-            replies.*,
-            users.username as "author_username",
-            users.display_name as "author_display_name",
-            (ROW_NUMBER() OVER (ORDER BY replies.reply_id ASC) - 1) as "reply_idx"
-        FROM replies
-        INNER JOIN users ON replies.author_id = users.user_id
-        WHERE replies.parent_post_id = {post_id} {f"AND replies.reply_id < {cursor}" if cursor != 0 else ""}
-        ORDER BY replies.reply_id DESC
-        LIMIT {API_CONFIG["reply_fetch_max_results"]}
-        """
-    )
+    db_cursor.execute("fetch_replies", (post_id, cursor, limit + 1))
 
     replies = db_cursor.fetchall() or []
 
-    return make_json_response(replies, 200)
+    return make_json_response(make_page("replies", replies, limit), 200)
 
 @app.route("/api/fetch-conversations", methods = ["GET"])
 @login_required
-@uses_db_connection
+@uses_db_connection(read_only = True)
 @use_only_expected_kwargs
-def fetch_conversations(current_user : dict, db_cursor : MySQLCursorDict) -> Response:
+def fetch_conversations(current_user : dict, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
-    cursor = request.args.get("cursor")
-    cursor, error_response = check_user_input_validity(cursor, "fetch_content_cursor")
+    page_args, error_response = parse_page_args("conversations", request.args.get("cursor"), request.args.get("limit"))
     if error_response:
         return error_response
 
-    cursor = int(cursor)
+    cursor, limit = page_args
     user_id : int = current_user["user_id"]
 
     # fetch conversations from db
-    db_cursor.execute(
-        # return the conversation id, when the conversation was created, if the most recent message of the conversation
-        # has been seen by the recipient, as well as the recipients display name and username for each conversation the
-        # current user is a part of
-        f"""
-        SELECT
-            convos.conversation_id,
-            convos.date_created,
-            (
-                SELECT seen = 0 FROM messages
-                WHERE (
-                    conversation_id = convos.conversation_id AND
-                    author_id != {user_id}
-                )
-                ORDER BY message_id DESC
-                LIMIT 1
-            ) AS "contains_unseen_messages",
-            COALESCE(u1.user_id, u2.user_id) AS "recipient_user_id",
-            COALESCE(u1.display_name, u2.display_name) AS "recipient_display_name",
-            COALESCE(u1.username, u2.username) AS "recipient_username",
-            (ROW_NUMBER() OVER (ORDER BY convos.conversation_id ASC) - 1) as "conversation_idx"
-        FROM conversations convos
-        LEFT JOIN users u1 ON (u1.user_id, {user_id}) = (convos.user_1_id, convos.user_2_id)
-        LEFT JOIN users u2 ON ({user_id}, u2.user_id) = (convos.user_1_id, convos.user_2_id)
-        WHERE {user_id} in (convos.user_1_id, convos.user_2_id)
-            {f"AND convos.conversation_id < {cursor}" if cursor != 0 else ""}
-        ORDER BY convos.conversation_id DESC
-        LIMIT {API_CONFIG["conversation_fetch_max_results"]}
-        """
-    )
+    db_cursor.execute("fetch_conversations", (user_id, user_id, user_id, user_id, user_id, cursor, limit + 1))
 
     conversations = db_cursor.fetchall() or []
 
-    return make_json_response(conversations, 200)
+    return make_json_response(make_page("conversations", conversations, limit), 200)
 
 @app.route("/api/fetch-own-profile", methods = ["GET"])
 @login_required
-@uses_db_connection
+@uses_db_connection(read_only = True)
 @use_only_expected_kwargs
-def fetch_own_profile(current_user : dict, db_cursor : MySQLCursorDict) -> Response:
+def fetch_own_profile(current_user : dict, db_cursor : StatementCursor) -> Response:
     user_id : int = current_user["user_id"]
     
-    # fetch the current user's info
-    db_cursor.execute(
-        # return the display name and username of the currently logged in user
-        f"""
-        SELECT display_name,username FROM users WHERE user_id = {user_id}
-        """
-    )
+    # fetch the display name and username of the currently logged in user
+    db_cursor.execute("fetch_own_profile", (user_id,))
     user_query = db_cursor.fetchone() or {}
 
     if not user_query:
@@ -666,24 +569,17 @@ def fetch_own_profile(current_user : dict, db_cursor : MySQLCursorDict) -> Respo
 
 @app.route("/api/fetch-profile-from-username", methods = ["GET"])
 @login_required
-@uses_db_connection
+@uses_db_connection(read_only = True)
 @use_only_expected_kwargs
-def fetch_profile_from_username(db_cursor : MySQLCursorDict) -> Response:
+def fetch_profile_from_username(db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     username = request.args.get("username")
     username, error_response = check_user_input_validity(username, "user_username")
     if error_response:
         return error_response
     
-    # fetch user by username
-    db_cursor.execute(
-        # return the user id and display name for the user who's username value is the inputted username
-        f"""
-        SELECT user_id, display_name FROM users
-        WHERE username = '{username}'
-        """
-    )
-    user_query = db_cursor.fetchone() or {}
+    # fetch the user id and display name of the user with the inputted username
+    user_query = fetch_user_by_username(username, db_cursor)
 
     if not user_query:
         return make_error_response("User does not exist", 404)
@@ -697,76 +593,37 @@ def fetch_profile_from_username(db_cursor : MySQLCursorDict) -> Response:
 @login_required
 @validates_CSRF_form(LikePostForm)
 @uses_db_connection
-def like_post(current_user : dict, form : LikePostForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def like_post(current_user : dict, form : LikePostForm, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_id = form.post_id.data
 
     user_id : int = current_user["user_id"]
     date_created = datetime.now(timezone.utc).timestamp() // 1 # floor to seconds
     
-    # get like-status
-    db_cursor.execute(
-        # return whether the currently logged in user has likes the inputted post id if a post with the inputted post id
-        # exists
-        f"""
-        SELECT
-            likes.user_id IS NOT NULL AS "like_exists"
-        FROM posts
-        LEFT JOIN likes
-            ON (
-                likes.post_id = posts.post_id AND
-                likes.user_id = {user_id}
-            )
-        WHERE posts.post_id = {post_id}
-        """
-    )
-
-    like_exists_query = db_cursor.fetchone() or {}
-
-    if not like_exists_query:
+    # increment the post's like count first, which also ensures that the post exists
+    db_cursor.execute("increment_like_count", (post_id,))
+
+    if db_cursor.rowcount < 1:
         return make_error_response(f"Post '{post_id}' doesn't exist", 404)
-    
-    elif like_exists_query.get("like_exists"):
+
+    # create a like row for the currently logged in user and the inputted post id. the unique (post_id, user_id)
+    # constraint rejects a second like. likes beyond the user's like limit are compacted in the background
+    try:
+        db_cursor.execute("create_like", (post_id, user_id, date_created))
+    except IntegrityError as error:
+        if error.errno != errorcode.ER_DUP_ENTRY:
+            raise
+
+        db_conn.rollback()
         return make_error_response(f"User already liked post '{post_id}'", 409)
-    
-    # create a like row
-    db_cursor.execute(
-        # add a row to the likes table and for the currently logged in user and the inputted post id
-        f"""
-        INSERT INTO likes (post_id, user_id, date_created) 
-        VALUES ({post_id}, {user_id}, {date_created})
-        """
-    )
-
-    # remove old likes
-    db_cursor.execute(
-        # to limit db size, each user's oldest like is removed if their like-count exceeds the like-count limit. each
-        # removed like record increments the corresponding post's "old_like_count" value
-        f"""
-        UPDATE posts all_posts
-        INNER JOIN (
-            SELECT post_id FROM likes
-            WHERE likes.user_id = {user_id}
-            ORDER BY date_created DESC
-            LIMIT {API_CONFIG['user_like_count_limit']}, {API_CONFIG['user_like_count_limit']+999}
-        ) AS relevant_posts
-        ON all_posts.post_id = relevant_posts.post_id
-        SET all_posts.old_like_count = all_posts.old_like_count + 1;
-
-        DELETE likes FROM likes
-        INNER JOIN (
-            SELECT post_id FROM likes
-            WHERE likes.user_id = {user_id}
-            ORDER BY date_created DESC
-            LIMIT {API_CONFIG['user_like_count_limit']}, {API_CONFIG['user_like_count_limit']+999}
-        ) AS relevant_likes
-        ON likes.post_id = relevant_likes.post_id
-        """,
-        multi = True
-    )
 
     db_conn.commit()
 
+    patch_cached_posts("like_count", {int(post_id): 1})
+
+    # check whether the user went over the like limit with the next like compaction
+    like_compaction_buffer.add([user_id])
+
     like_data = {"user_id": user_id, "post_id": post_id}
     app.logger.info(f"User liked post {json.dumps(like_data)}")
 
@@ -776,49 +633,33 @@ def like_post(current_user : dict, form : LikePostForm, db_conn : PooledMySQLCon
 @login_required
 @validates_CSRF_form(UnlikePostForm)
 @uses_db_connection
-def unlike_post(current_user : dict, form : UnlikePostForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def unlike_post(current_user : dict, form : UnlikePostForm, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_id = form.post_id.data
 
     user_id : int = current_user["user_id"]
 
-    # ensure the post exists and is liked by the current user
-    db_cursor.execute(
-        # return whether the currently logged in user has liked the inputted post id if a post with the inputted post id
-        # exists
-        f"""
-        SELECT
-            likes.user_id IS NOT NULL AS "like_exists"
-        FROM posts
-        LEFT JOIN likes
-            ON (
-                likes.post_id = posts.post_id AND
-                likes.user_id = {user_id}
-            )
-        WHERE posts.post_id = {post_id}
-        """
-    )
-
-    like_exists_query = db_cursor.fetchone() or {}
-
-    if not like_exists_query:
+    # decrement the post's like count first, which also ensures that the post exists. like liking a post and like
+    # compaction, this locks the post before its likes, so that they can't deadlock
+    db_cursor.execute("decrement_like_count", (post_id,))
+
+    if db_cursor.rowcount < 1:
         return make_error_response(f"Post '{post_id}' doesn't exist", 404)
-    
-    elif not like_exists_query.get("like_exists"):
-        return make_error_response(f"User hasn't liked post '{post_id}'", 409)
 
-    # delete the like row
-    db_cursor.execute(
-        # delete the row from the likes table that says this user liked the inputted post
-        f"""
-        DELETE FROM likes WHERE post_id = {post_id} AND user_id = {user_id}
-        """
-    )
+    # delete the like row that says this user liked the inputted post. the decremented like count is only committed if
+    # this statement deleted the row, so that concurrent unlikes and like compaction can't decrement it twice
+    db_cursor.execute("delete_like", (post_id, user_id))
+
+    if db_cursor.rowcount < 1:
+        db_conn.rollback()
+        return make_error_response(f"User hasn't liked post '{post_id}'", 409)
 
     db_conn.commit()
 
+    patch_cached_posts("like_count", {int(post_id): -1})
+
     unlike_data = {"user_id": user_id, "post_id": post_id}
-    app.logger.info(f"User liked post {json.dumps(unlike_data)}")
+    app.logger.info(f"User unliked post {json.dumps(unlike_data)}")
 
     return Response(f"Unliked post id {post_id}", 200, mimetype = "text/plain")
 
@@ -826,22 +667,12 @@ def unlike_post(current_user : dict, form : UnlikePostForm, db_conn : PooledMySQ
 @admin_required
 @validates_CSRF_form(DeletePostForm)
 @uses_db_connection
-def delete_post(current_user : dict, form : DeletePostForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def delete_post(current_user : dict, form : DeletePostForm, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     post_id = form.post_id.data
     
     # fetch the relevant post
-    db_cursor.execute(
-        # fetch the relevant post and its data using the inputted post_id if it exists
-        f"""
-        SELECT 
-            posts.*,
-            (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id) as "like_count",
-            (SELECT COUNT(*) FROM replies WHERE replies.parent_post_id = posts.post_id) as "reply_count"
-        FROM posts
-        WHERE post_id = {post_id}
-        """
-    )
+    db_cursor.execute("fetch_post_for_deletion", (post_id,))
 
     relevant_post = db_cursor.fetchone() or {}
     
@@ -849,15 +680,19 @@ def delete_post(current_user : dict, form : DeletePostForm, db_conn : PooledMySQ
         return make_error_response(f"Post '{post_id}' does not exist", 404)
 
     # delete the likes, replies and post related to the inputted post id. the order of deletion is important since if
-    # the post is deleted first any likes and replies related to the post will fail their post-id foreign-key check. for
-    # some reason using a single db_cursor.execute call with multiple commands silently fails, therefore call each
-    # DELETE command separately
-    db_cursor.execute(f"DELETE FROM likes WHERE post_id = {post_id};")
-    db_cursor.execute(f"DELETE FROM replies WHERE parent_post_id = {post_id};")
-    db_cursor.execute(f"DELETE FROM posts WHERE post_id = {post_id};")
+    # the post is deleted first any likes and replies related to the post will fail their post-id foreign-key check
+    db_cursor.execute("delete_post_likes", (post_id,))
+    db_cursor.execute("delete_post_replies", (post_id,))
+    db_cursor.execute("delete_post", (post_id,))
+
+    # lower the post index of every newer post by recording the deleted post's index, instead of renumbering them
+    db_cursor.execute("record_deleted_post_index", (relevant_post["post_idx"],))
 
     db_conn.commit()
 
+    # the deleted post shifts every timeline page
+    timeline_cache.clear()
+
     # remove the post image if it exists
     filepath = CWD / app.config["UPLOAD_FOLDER"] / "post-images" / f"{post_id}.png"
     if filepath.exists():
@@ -872,34 +707,48 @@ def delete_post(current_user : dict, form : DeletePostForm, db_conn : PooledMySQ
 @admin_required
 @validates_CSRF_form(DeleteReplyForm)
 @uses_db_connection
-def delete_reply(current_user : dict, form : DeleteReplyForm, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> Response:
+def delete_reply(current_user : dict, form : DeleteReplyForm, db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> Response:
     # extract and sanitize user inputs
     reply_id = form.reply_id.data
     
     # fetch the relevant reply
-    db_cursor.execute(
-        # fetch the relevant reply and its data using the inputted reply_id if it exists
-        f"""
-        SELECT * FROM replies WHERE reply_id = {reply_id}
-        """
-    )
+    db_cursor.execute("fetch_reply", (reply_id,))
 
     relevant_reply = db_cursor.fetchone() or {}
 
     if not relevant_reply:
         return make_error_response(f"Reply '{reply_id}' does not exist", 404)
 
-    # delete the reply
-    db_cursor.execute(
-        # delete the reply with the inputted reply id
-        f"""
-        DELETE FROM replies WHERE reply_id = {reply_id}
-        """
-    )
+    # update the parent post's reply count, delete the reply and close the gap it left in the reply indexes. the reply
+    # count is updated first, so that the parent post is always locked before its replies like in create_reply
+    parent_post_id = relevant_reply["parent_post_id"]
+    db_cursor.execute("decrement_reply_count", (parent_post_id,))
+    db_cursor.execute("delete_reply", (reply_id,))
+    db_cursor.execute("shift_reply_indexes", (parent_post_id, reply_id))
 
     db_conn.commit()
 
+    patch_cached_posts("reply_count", {parent_post_id: -1})
+
     relevant_reply["deleter_user_id"] = current_user["user_id"]
     app.logger.info(f"Deleted reply {json.dumps(relevant_reply)}")
 
     return Response(status = 204)
+
+@app.route("/api/cache-stats", methods = ["GET"])
+@admin_required
+@use_only_expected_kwargs
+def cache_stats() -> Response:
+    # report the size and hit/miss counters of every in-process cache
+    stats = {name: cache.stats() for name, cache in cache_registry.items()}
+
+    return make_json_response(stats, 200)
+
+@app.route("/api/db-pool-stats", methods = ["GET"])
+@admin_required
+@use_only_expected_kwargs
+def db_pool_stats() -> Response:
+    # report the size of every database connection pool and its checkout wait and hold times
+    stats = {pool.pool_name: pool.stats() for pool in (db_pool, *db_replica_pools)}
+
+    return make_json_response(stats, 200)
@@ -4,13 +4,15 @@ from .utils.misc_utils import (
     format_logging_info,
     make_error_response
 )
-from mysql.connector.errors import DatabaseError, InterfaceError
+from .utils.password_utils import PasswordHashingBusyError
+from mysql.connector.errors import DatabaseError, InterfaceError, PoolError
 from flask import redirect, url_for, flash, request
 from werkzeug.exceptions import HTTPException
 
 @app.errorhandler(DatabaseError)
 @app.errorhandler(InterfaceError)
-def on_database_error(_error : DatabaseError | InterfaceError) -> None:
+@app.errorhandler(PoolError)
+def on_database_error(_error : DatabaseError | InterfaceError | PoolError) -> None:
     # log database exceptions here
     app.logger.error(format_logging_info())
 
@@ -22,6 +24,19 @@ def on_database_error(_error : DatabaseError | InterfaceError) -> None:
         flash("Error - Database error")
         return redirect(url_for("timeline"))
 
+@app.errorhandler(PasswordHashingBusyError)
+def on_password_hashing_busy(_error : PasswordHashingBusyError) -> None:
+    # a burst of logins or signups filled the password hashing queue
+    app.logger.warning(format_logging_info())
+
+    # tell the user about the error
+    is_api_request = str(request.url_rule).startswith("/api/")
+    if is_api_request:
+        return make_error_response("Too many logins right now, try again shortly", 503)
+    else:
+        flash("Error - Too many logins right now, try again shortly")
+        return redirect(url_for("timeline"))
+
 @app.errorhandler(HTTPException)
 def on_http_exception(error : HTTPException) -> None:
     # log general uncaught http exceptions here
@@ -0,0 +1,27 @@
+-- composite indexes for the paginated and per-user queries. the single column foreign key indexes that the new indexes
+-- start with are dropped in the same statement, since the new indexes serve those foreign keys too. every statement is
+-- safe to run again, and runs without blocking reads or writes of the table
+
+-- fetch_messages and the unseen message check of fetch_conversations
+ALTER TABLE messages
+    ADD INDEX IF NOT EXISTS IDX_messages_conversation_message (conversation_id, message_id),
+    DROP INDEX IF EXISTS conversation_id,
+    ALGORITHM = INPLACE, LOCK = NONE;
+
+-- fetch_replies and shift_reply_indexes
+ALTER TABLE replies
+    ADD INDEX IF NOT EXISTS IDX_replies_post_reply (parent_post_id, reply_id),
+    DROP INDEX IF EXISTS parent_post_id,
+    ALGORITHM = INPLACE, LOCK = NONE;
+
+-- the posts.author_id foreign key. no statement reads posts by author anymore, so 0004 replaces this index with a
+-- single column one again
+ALTER TABLE posts
+    ADD INDEX IF NOT EXISTS IDX_posts_author_post (author_id, post_id),
+    DROP INDEX IF EXISTS author_id,
+    ALGORITHM = INPLACE, LOCK = NONE;
+
+-- like compaction. databases created before this index was added to Bitter.sql don't have it yet
+ALTER TABLE likes
+    ADD INDEX IF NOT EXISTS IDX_likes_user_date (user_id, date_created),
+    ALGORITHM = INPLACE, LOCK = NONE;
@@ -0,0 +1,41 @@
+-- the like, reply, conversation and message counts kept on the rows they count for, and the counters table holding the
+-- post count. databases created before these were added to Bitter.sql get them here, counted from the existing rows
+-- like 'flask --app Bitter reconcile-counters' and 'rebuild-content-indexes' count them. every statement is safe to run
+-- again
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS conversation_count INT NOT NULL DEFAULT 0 AFTER is_admin;
+
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS like_count MEDIUMINT NOT NULL DEFAULT 0 AFTER view_count,
+    ADD COLUMN IF NOT EXISTS reply_count MEDIUMINT NOT NULL DEFAULT 0 AFTER old_like_count;
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS message_count INT NOT NULL DEFAULT 0 AFTER date_created;
+
+CREATE TABLE IF NOT EXISTS counters (
+    counter_name VARCHAR(24) PRIMARY KEY,
+    counter_value INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO counters (counter_name, counter_value) VALUES ('post_count', 0);
+
+-- reconcile_post_counters, over every post
+UPDATE posts
+SET
+    like_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id),
+    reply_count = (SELECT COUNT(*) FROM replies WHERE replies.parent_post_id = posts.post_id);
+
+-- rebuild_conversation_counts
+UPDATE users
+SET conversation_count = (
+    SELECT COUNT(*) FROM conversations
+    WHERE users.user_id IN (conversations.user_1_id, conversations.user_2_id)
+);
+
+-- rebuild_message_counts
+UPDATE conversations
+SET message_count = (SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.conversation_id);
+
+-- rebuild_post_count
+UPDATE counters SET counter_value = (SELECT COUNT(*) FROM posts) WHERE counter_name = 'post_count';
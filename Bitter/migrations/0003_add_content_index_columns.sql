@@ -0,0 +1,75 @@
+-- the content indexes that the paginated queries seek by. databases created before these were added to Bitter.sql get
+-- them here, numbered from the existing rows like 'flask --app Bitter rebuild-content-indexes' numbers them. every
+-- statement is safe to run again
+
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS post_idx INT NOT NULL DEFAULT 0 AFTER reply_count;
+
+ALTER TABLE replies
+    ADD COLUMN IF NOT EXISTS reply_idx MEDIUMINT NOT NULL DEFAULT 0 AFTER body;
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS user_1_conversation_idx INT NOT NULL DEFAULT 0 AFTER date_created,
+    ADD COLUMN IF NOT EXISTS user_2_conversation_idx INT NOT NULL DEFAULT 0 AFTER user_1_conversation_idx;
+
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS message_idx INT NOT NULL DEFAULT 0 AFTER seen;
+
+-- rebuild_post_indexes
+UPDATE posts
+INNER JOIN (
+    SELECT post_id, ROW_NUMBER() OVER (ORDER BY post_id ASC) - 1 AS "post_idx"
+    FROM posts
+) AS numbered_posts
+ON posts.post_id = numbered_posts.post_id
+SET posts.post_idx = numbered_posts.post_idx;
+
+-- rebuild_reply_indexes
+UPDATE replies
+INNER JOIN (
+    SELECT reply_id, ROW_NUMBER() OVER (PARTITION BY parent_post_id ORDER BY reply_id ASC) - 1 AS "reply_idx"
+    FROM replies
+) AS numbered_replies
+ON replies.reply_id = numbered_replies.reply_id
+SET replies.reply_idx = numbered_replies.reply_idx;
+
+-- rebuild_user_1_conversation_indexes
+UPDATE conversations
+INNER JOIN (
+    SELECT
+        conversation_id,
+        user_id,
+        ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY conversation_id ASC) - 1 AS "conversation_idx"
+    FROM (
+        SELECT conversation_id, user_1_id AS "user_id" FROM conversations
+        UNION ALL
+        SELECT conversation_id, user_2_id AS "user_id" FROM conversations
+    ) AS participants
+) AS numbered_conversations
+ON (conversations.conversation_id, conversations.user_1_id) = (numbered_conversations.conversation_id, numbered_conversations.user_id)
+SET conversations.user_1_conversation_idx = numbered_conversations.conversation_idx;
+
+-- rebuild_user_2_conversation_indexes
+UPDATE conversations
+INNER JOIN (
+    SELECT
+        conversation_id,
+        user_id,
+        ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY conversation_id ASC) - 1 AS "conversation_idx"
+    FROM (
+        SELECT conversation_id, user_1_id AS "user_id" FROM conversations
+        UNION ALL
+        SELECT conversation_id, user_2_id AS "user_id" FROM conversations
+    ) AS participants
+) AS numbered_conversations
+ON (conversations.conversation_id, conversations.user_2_id) = (numbered_conversations.conversation_id, numbered_conversations.user_id)
+SET conversations.user_2_conversation_idx = numbered_conversations.conversation_idx;
+
+-- rebuild_message_indexes
+UPDATE messages
+INNER JOIN (
+    SELECT message_id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY message_id ASC) AS "message_idx"
+    FROM messages
+) AS numbered_messages
+ON messages.message_id = numbered_messages.message_id
+SET messages.message_idx = numbered_messages.message_idx;
@@ -0,0 +1,8 @@
+-- no statement reads posts by author, so the (author_id, post_id) index added in 0001 only served the posts.author_id
+-- foreign key. it's replaced by the single column index the foreign key had before, which is cheaper to maintain on
+-- every post insert. the statement is safe to run again, and runs without blocking reads or writes of the table
+
+ALTER TABLE posts
+    ADD INDEX IF NOT EXISTS author_id (author_id),
+    DROP INDEX IF EXISTS IDX_posts_author_post,
+    ALGORITHM = INPLACE, LOCK = NONE;
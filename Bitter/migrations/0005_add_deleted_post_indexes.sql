@@ -0,0 +1,7 @@
+-- the stored post index of every post deleted since the post indexes were last renumbered. the exact post-idx of a post
+-- is its stored post index minus the number of deleted post indexes below it, so deleting a post doesn't have to
+-- renumber every newer post. the statement is safe to run again
+
+CREATE TABLE IF NOT EXISTS deleted_post_indexes (
+    post_idx INT PRIMARY KEY
+);
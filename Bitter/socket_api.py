@@ -1,9 +1,10 @@
-from . import socketio, app
+from . import socketio, app, socket_room_backend
 from .utils.misc_utils import login_required, use_only_expected_kwargs
 from .utils.socket_utils import (
     add_room_member,
     remove_room_member,
     emit_error_response,
+    publish_message,
     broadcast_message_to_room
 )
 from .utils.db_utils import (
@@ -13,7 +14,20 @@ from .utils.db_utils import (
     create_message
 )
 from flask import request
-import asyncio, json
+import json
+
+def deliver_message(message : dict) -> None:
+    # send a published message to the members of its socket-room that are connected to this process, and mark the
+    # message as seen if its recipient received it and it wasn't created as seen already
+    recipient_received = broadcast_message_to_room(message)
+    if recipient_received and not message["seen"]:
+        mark_message_as_seen(message["message_id"])
+
+socket_room_backend.set_message_handler(deliver_message)
+
+# Socket.IO runs in threading mode and handles every event on a thread of its own, so the handlers call the blocking
+# db_utils functions directly. a slow query only holds up its own event, and the number of events doing database work
+# at once is bounded by the connection pool, like it is for the HTTP routes
 
 @socketio.on("disconnect")
 def user_disconnect(_reason) -> None:
@@ -25,42 +39,37 @@ def register_for_realtime(recipient_username : str, current_user : dict) -> None
     # ensure proper param types
     recipient_username = str(recipient_username)
 
-    async def respond() -> None:
-        shared_conversation = fetch_shared_conversation_id(recipient_username)
-        if "error" in shared_conversation:
-            log_dict = json.dumps({"recipient_username": recipient_username})
-            app.logger.info(f"400: Socket register for realtime - {log_dict} - {shared_conversation['error']}")
+    shared_conversation = fetch_shared_conversation_id(recipient_username)
+    if "error" in shared_conversation:
+        log_dict = json.dumps({"recipient_username": recipient_username})
+        app.logger.info(f"400: Socket register for realtime - {log_dict} - {shared_conversation['error']}")
 
-            emit_error_response(shared_conversation["error"])
-            return
+        emit_error_response(shared_conversation["error"])
+        return
 
-        user_id : int = current_user["user_id"]
-        conversation_id = shared_conversation["conversation_id"]
+    user_id : int = current_user["user_id"]
+    conversation_id = shared_conversation["conversation_id"]
 
-        add_room_member(conversation_id, user_id, request.sid)
-    
-    asyncio.run(respond())
+    add_room_member(conversation_id, user_id, request.sid)
 
 @socketio.on("request_message_history")
 @login_required
 @use_only_expected_kwargs
-def request_message_history(recipient_username : str, cursor : str | int) -> None:
-    # ensure proper param types
+def request_message_history(recipient_username : str, cursor : str | None = None, limit : str | int | None = None) -> None:
+    # ensure proper param types. a missing cursor or limit requests the first page or the default page size
     recipient_username = str(recipient_username)
-    cursor = str(cursor)
+    cursor = str(cursor) if cursor else None
+    limit = str(limit) if limit else None
 
-    async def respond() -> None:
-        messages = fetch_messages(recipient_username, cursor)
-        if "error" in messages:
-            log_dict = json.dumps({"recipient_username": recipient_username, "cursor": cursor})
-            app.logger.info(f"400: Socket chat request_message_history - {log_dict} - {messages['error']}")
+    message_page = fetch_messages(recipient_username, cursor, limit)
+    if "error" in message_page:
+        log_dict = json.dumps({"recipient_username": recipient_username, "cursor": cursor, "limit": limit})
+        app.logger.info(f"400: Socket chat request_message_history - {log_dict} - {message_page['error']}")
 
-            emit_error_response(messages["error"])
-            return
+        emit_error_response(message_page["error"])
+        return
 
-        socketio.emit("send_message_history", messages, to = request.sid)
-    
-    asyncio.run(respond())
+    socketio.emit("send_message_history", message_page, to = request.sid)
 
 @socketio.on("send_message")
 @login_required
@@ -70,17 +79,13 @@ def send_message(recipient_username : str, message_body : str) -> None:
     recipient_username = str(recipient_username)
     message_body = str(message_body)
 
-    async def respond() -> None:
-        new_message = create_message(recipient_username, message_body)
-        if "error" in new_message:
-            log_dict = json.dumps({"recipient_username": recipient_username, "message_body": message_body})
-            app.logger.info(f"400: Socket chat send_message - {log_dict} - {new_message['error']}")
+    new_message = create_message(recipient_username, message_body)
+    if "error" in new_message:
+        log_dict = json.dumps({"recipient_username": recipient_username, "message_body": message_body})
+        app.logger.info(f"400: Socket chat send_message - {log_dict} - {new_message['error']}")
 
-            emit_error_response(new_message["error"])
-            return
+        emit_error_response(new_message["error"])
+        return
 
-        recipient_received = broadcast_message_to_room(new_message)
-        if recipient_received:
-            mark_message_as_seen(new_message["message_id"])
-    
-    asyncio.run(respond())
+    # the message is delivered by each Bitter process' deliver_message
+    publish_message(new_message)
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+import threading, time, typing
+
+# every cache by name, so that their stats can be reported together
+cache_registry : dict[str, "LRUCache"] = {}
+
+class LRUCache:
+    """Thread-safe in-process cache that holds at most max_size entries and expires each entry ttl seconds after it was
+    stored. When the cache is full, the least recently used entry is evicted.
+
+    Every invalidation or in-place update bumps the cache's generation. A value that was read from the database before
+    the generation changed may be stale, so set() ignores values stored with an outdated generation.
+    """
+
+    def __init__(self, name : str, max_size : int, ttl : float) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries : OrderedDict[typing.Hashable, tuple[float, typing.Any]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        cache_registry[name] = self
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key : typing.Hashable, default : typing.Any = None) -> typing.Any:
+        """Return the cached value of the inputted key, or default if it isn't cached or has expired
+
+        Args:
+            key (typing.Hashable): The key to look up
+            default (typing.Any, optional): The value to return on a miss. Defaults to None.
+
+        Returns:
+            typing.Any: The cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self,
+            key : typing.Hashable,
+            value : typing.Any,
+            generation : int | None = None,
+            ttl : float | None = None) -> None:
+        """Cache a value under the inputted key
+
+        Args:
+            key (typing.Hashable): The key to cache the value under
+            value (typing.Any): The value to cache
+            generation (int | None, optional): The generation the cache had before the value was read. The value is
+            discarded if the cache was invalidated or updated since. Defaults to None, which always caches the value.
+            ttl (float | None, optional): Seconds until this entry expires. Defaults to None, which uses the cache's
+            ttl.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last = False)
+
+    def delete(self, key : typing.Hashable) -> None:
+        """Remove the inputted key from the cache if it's cached"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def update_values(self, update_func : typing.Callable[[typing.Any], None]) -> None:
+        """Call update_func on every cached value, so that cached values can be patched in place instead of being
+        invalidated
+
+        Args:
+            update_func (typing.Callable[[typing.Any], None]): Function that updates a cached value in place
+        """
+        with self._lock:
+            for _, value in self._entries.values():
+                update_func(value)
+
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Return the size and hit/miss counters of the cache
+
+        Returns:
+            dict: {"size": int, "max_size": int, "hits": int, "misses": int, "hit_rate": float}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,274 @@
+from .periodic_tasks import PeriodicTask
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.pooling import PooledMySQLConnection
+from mysql.connector.errors import PoolError, Error
+from collections import deque
+import threading, time, os
+
+class PooledConnection(PooledMySQLConnection):
+    """A connection checked out of an ElasticConnectionPool. Like PooledMySQLConnection, every attribute except close()
+    is passed on to the underlying MySQLConnection, and close() returns the connection to its pool.
+    """
+
+    def __init__(self, pool : "ElasticConnectionPool", cnx : MySQLConnection) -> None:
+        # PooledMySQLConnection.__init__ only accepts MySQLConnectionPool instances, so it isn't called
+        self._cnx_pool = pool
+        self._cnx = cnx
+        self.checked_out_at = time.monotonic()
+        self.committed = False
+        # ^ whether a transaction was committed on the connection since this flag was last reset
+
+    def commit(self) -> None:
+        self._cnx.commit()
+        self.committed = True
+
+    def close(self) -> None:
+        if self._cnx is None:
+            return
+
+        self._cnx_pool.return_connection(self._cnx, self.checked_out_at)
+        self._cnx = None
+
+
+class ElasticConnectionPool:
+    """Thread-safe MySQL connection pool that keeps between min_size and max_size connections open. Checkouts take the
+    most recently returned idle connection, open a new connection if the pool is below max_size, or otherwise wait up to
+    checkout_timeout seconds for a connection to be returned before raising PoolError.
+
+    Connections that were idle for longer than ping_interval seconds are pinged, and reconnected if needed, before they
+    are handed out. reap_idle_connections() closes connections that were idle for longer than idle_timeout seconds,
+    down to min_size, and runs every reap interval once reaper is started.
+
+    Creating the pool doesn't connect to the database. Connections are opened on demand, or up to min_size at once by
+    prefill(). A forked child process starts with an empty pool, since it would otherwise share the parent's
+    connections.
+    """
+
+    def __init__(self,
+                 pool_name : str,
+                 min_size : int,
+                 max_size : int,
+                 checkout_timeout : float,
+                 idle_timeout : float,
+                 ping_interval : float,
+                 reap_interval : float,
+                 **connection_config) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size, expected 0 <= min size ({min_size}) <= max size ({max_size}) and max size >= 1")
+
+        self.pool_name = pool_name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+
+        self.reaper = PeriodicTask(f"{pool_name}-reaper", self.reap_idle_connections, interval = reap_interval)
+
+        self._connection_config = connection_config
+        self._idle : deque[tuple[float, MySQLConnection]] = deque()
+        # ^ (time the connection was returned, connection), oldest first
+        self._size = 0
+        # ^ the number of open connections, including those that are checked out or being opened
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+        self._metrics = {
+            "checkouts": 0,
+            "exhaustions": 0,
+            "connections_opened": 0,
+            "connections_reaped": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "total_hold_seconds": 0.0,
+            "max_hold_seconds": 0.0
+        }
+
+        os.register_at_fork(after_in_child = self._reset_after_fork)
+
+    @property
+    def pool_size(self) -> int:
+        """The most connections the pool keeps open at once"""
+        return self.max_size
+
+    def get_connection(self) -> PooledConnection:
+        """Check out a connection, waiting up to checkout_timeout seconds if every connection is in use
+
+        Raises:
+            PoolError: If no connection was returned to the pool in time
+
+        Returns:
+            PooledConnection: The checked out connection. Closing it returns it to the pool.
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.checkout_timeout
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    returned_at, cnx = self._idle.pop()
+                    break
+
+                # reserve a slot for a new connection, which is opened without holding the lock
+                if self._size < self.max_size:
+                    self._size += 1
+                    returned_at, cnx = None, None
+                    break
+
+                remaining_seconds = deadline - time.monotonic()
+                if remaining_seconds <= 0:
+                    self._metrics["exhaustions"] += 1
+                    raise PoolError(
+                        f"Failed getting connection; pool exhausted after waiting {self.checkout_timeout} seconds"
+                    )
+
+                self._waiting += 1
+                self._condition.wait(remaining_seconds)
+                self._waiting -= 1
+
+        try:
+            if cnx is None:
+                cnx = self._open_connection()
+
+            elif time.monotonic() - returned_at > self.ping_interval:
+                # the server may have closed a connection that was idle for a while
+                cnx.ping(reconnect = True)
+
+        except Exception:
+            self._discard_connection(cnx)
+            raise
+
+        wait_seconds = time.monotonic() - started_at
+        with self._condition:
+            self._metrics["checkouts"] += 1
+            self._metrics["total_wait_seconds"] += wait_seconds
+            self._metrics["max_wait_seconds"] = max(self._metrics["max_wait_seconds"], wait_seconds)
+
+        return PooledConnection(self, cnx)
+
+    def return_connection(self, cnx : MySQLConnection, checked_out_at : float) -> None:
+        """Put a checked out connection back in the pool. Called by PooledConnection.close()"""
+        hold_seconds = time.monotonic() - checked_out_at
+
+        with self._condition:
+            self._metrics["total_hold_seconds"] += hold_seconds
+            self._metrics["max_hold_seconds"] = max(self._metrics["max_hold_seconds"], hold_seconds)
+
+            self._idle.append((time.monotonic(), cnx))
+            self._condition.notify()
+
+    def prefill(self) -> int:
+        """Open connections until the pool holds at least min_size connections, like MySQLConnectionPool does when it's
+        created
+
+        Returns:
+            int: The number of opened connections
+        """
+        opened_connections = 0
+
+        while True:
+            # reserve a slot for the new connection, which is opened without holding the lock
+            with self._condition:
+                if self._size >= self.min_size:
+                    return opened_connections
+
+                self._size += 1
+
+            try:
+                cnx = self._open_connection()
+            except Exception:
+                self._discard_connection(None)
+                raise
+
+            with self._condition:
+                self._idle.append((time.monotonic(), cnx))
+                self._condition.notify()
+
+            opened_connections += 1
+
+    def reap_idle_connections(self) -> int:
+        """Close the connections that were idle for longer than idle_timeout seconds, keeping at least min_size
+        connections open
+
+        Returns:
+            int: The number of closed connections
+        """
+        reaped_connections : list[MySQLConnection] = []
+        now = time.monotonic()
+
+        with self._condition:
+            # the oldest idle connections are at the start of the deque
+            while self._idle and self._size > self.min_size and now - self._idle[0][0] > self.idle_timeout:
+                reaped_connections.append(self._idle.popleft()[1])
+                self._size -= 1
+
+            self._metrics["connections_reaped"] += len(reaped_connections)
+
+        for cnx in reaped_connections:
+            self._close_quietly(cnx)
+
+        return len(reaped_connections)
+
+    def stats(self) -> dict:
+        """Return the size of the pool and its checkout metrics
+
+        Returns:
+            dict: {"size": int, "idle": int, "in_use": int, "waiting": int, "min_size": int, "max_size": int,
+            "checkouts": int, "exhaustions": int, "connections_opened": int, "connections_reaped": int,
+            "avg_wait_ms": float, "max_wait_ms": float, "avg_hold_ms": float, "max_hold_ms": float}
+        """
+        with self._condition:
+            metrics = dict(self._metrics)
+            size, idle, waiting = self._size, len(self._idle), self._waiting
+
+        checkouts = metrics["checkouts"]
+
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "waiting": waiting,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "checkouts": checkouts,
+            "exhaustions": metrics["exhaustions"],
+            "connections_opened": metrics["connections_opened"],
+            "connections_reaped": metrics["connections_reaped"],
+            "avg_wait_ms": metrics["total_wait_seconds"] / checkouts * 1000 if checkouts else 0.0,
+            "max_wait_ms": metrics["max_wait_seconds"] * 1000,
+            "avg_hold_ms": metrics["total_hold_seconds"] / checkouts * 1000 if checkouts else 0.0,
+            "max_hold_ms": metrics["max_hold_seconds"] * 1000
+        }
+
+    def _open_connection(self) -> MySQLConnection:
+        cnx = MySQLConnection(**self._connection_config)
+
+        with self._condition:
+            self._metrics["connections_opened"] += 1
+
+        return cnx
+
+    def _discard_connection(self, cnx : MySQLConnection | None) -> None:
+        # free the connection's slot, so that a waiting checkout can open a new connection in its place
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+        if cnx is not None:
+            self._close_quietly(cnx)
+
+    def _reset_after_fork(self) -> None:
+        # the child's copies of the parent's connections share their sockets with the parent, so they're dropped without
+        # being closed, since closing them would end the parent's sessions. the lock may have been held by a thread that
+        # doesn't exist in the child, so it's replaced too
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+    def _close_quietly(self, cnx : MySQLConnection) -> None:
+        try:
+            cnx.close()
+        except Error:
+            # the connection was already lost
+            pass
@@ -0,0 +1,610 @@
+from ..config import API_CONFIG
+from mysql.connector.pooling import PooledMySQLConnection
+from mysql.connector.connection import MySQLConnection
+from mysql.connector import errors
+from mysql.connector.cursor import RE_SQL_FIND_PARAM
+import typing
+
+# the largest value a signed INT column can hold. used in place of a fetch_content_cursor value of 0 so that the
+# "fetch from the newest row" case can share a statement with the "fetch from the cursor" case
+CURSOR_START = 2147483647
+
+# number of (post_id, view_increment) slots in the "add_view_counts" statement. batches with fewer posts fill the
+# remaining slots with post id 0, which never exists
+VIEW_COUNT_BATCH_SIZE = API_CONFIG["view_count_flush_batch_size"]
+
+# number of message id slots in the "mark_messages_as_seen" statement. batches with fewer messages fill the remaining
+# slots with message id 0, which never exists
+SEEN_RECEIPT_BATCH_SIZE = API_CONFIG["seen_receipt_flush_batch_size"]
+
+# number of post id slots in the "archive_likes" and "delete_archived_likes" statements. batches with fewer likes fill
+# the remaining slots with post id 0, which never exists
+LIKE_COMPACTION_BATCH_SIZE = API_CONFIG["like_compaction_batch_size"]
+
+# number of post id slots in the "fetch_liked_post_ids" statement, which fits a timeline page of the maximum size.
+# pages with fewer posts fill the remaining slots with post id 0, which never exists
+LIKED_POST_LOOKUP_SIZE = API_CONFIG["post_fetch_max_results"]
+
+# every query Bitter sends to the database, as named parameterized statements. each statement is prepared server-side
+# once per pooled connection and reused by every later call with that connection
+STATEMENTS = {
+    # fetch the hashed password of the admin account if it exists
+    "fetch_admin_password": """
+        SELECT password FROM users WHERE username = 'admin'
+    """,
+    # change the admin account's password
+    "update_admin_password": """
+        UPDATE users SET password = %s WHERE username = 'admin'
+    """,
+    # replace a password hash with its upgraded hash, unless the password was changed since the old hash was read
+    "upgrade_password_hash": """
+        UPDATE users SET password = %s WHERE user_id = %s AND password = %s
+    """,
+    # add the new admin account. there will never be a username conflict with username "admin" since this runs before
+    # users have access to the db
+    "create_admin_account": """
+        INSERT INTO users (username, display_name, password, is_admin)
+        VALUES ('admin', 'Admin', %s, true)
+    """,
+    # return the conversation id of the conversation that the two inputted user ids share, if it exists
+    "fetch_conversation_id": """
+        SELECT conversation_id FROM conversations
+        WHERE (user_1_id = %s AND user_2_id = %s) OR (user_1_id = %s AND user_2_id = %s)
+    """,
+    # add 1 to the message count of the conversation a message is about to be created in. the new message count is
+    # passed through LAST_INSERT_ID(), so that it's returned as the statement's insert id without another query
+    "increment_message_count": """
+        UPDATE conversations SET message_count = LAST_INSERT_ID(message_count + 1) WHERE conversation_id = %s
+    """,
+    # create a new message row with the inputted values. its message index is the conversation's message count, which
+    # was just incremented and is locked by this transaction
+    "create_message": """
+        INSERT INTO messages (author_id, body, date_created, conversation_id, seen, message_idx)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """,
+    # update the seen value of each message with one of the inputted message ids
+    "mark_messages_as_seen": f"""
+        UPDATE messages SET seen = true
+        WHERE message_id IN ({", ".join(["%s"] * SEEN_RECEIPT_BATCH_SIZE)})
+    """,
+    # return the messages of the inputted conversation id with message id within a certain range, ordered by descending
+    # message id
+    "fetch_messages": """
+        SELECT * FROM messages
+        WHERE conversation_id = %s AND message_id < %s
+        ORDER BY message_id DESC
+        LIMIT %s
+    """,
+    # get user id and password for the user that has the inputted username
+    "fetch_login_credentials": """
+        SELECT user_id, password, is_admin FROM users
+        WHERE username = %s
+    """,
+    # select the first value, either username of email, that already exists in the users table
+    "fetch_duplicate_username_or_email": """
+        SELECT
+            COALESCE(
+                (SELECT username FROM users WHERE username = %s),
+                (SELECT email FROM users WHERE email = %s)
+            ) as result
+    """,
+    # create a new row in users with the inputted values
+    "create_user": """
+        INSERT INTO users (username, display_name, email, password)
+        VALUES (%s, %s, %s, %s)
+    """,
+    # update the display name of the user who's user id is the inputted user id
+    "update_display_name": """
+        UPDATE users SET display_name = %s WHERE user_id = %s
+    """,
+    # return how many posts were deleted since the post indexes were last renumbered. the exact post-idx of a new post
+    # is its stored post index minus this count
+    "fetch_deleted_post_count": """
+        SELECT COUNT(*) AS "deleted_post_count" FROM deleted_post_indexes
+    """,
+    # create a new row in the posts table with the inputted values. its stored post index is the number of post indexes
+    # handed out. the post count row is locked before the post id is generated, so that the stored post indexes are in
+    # the same order as the post ids
+    "create_post": """
+        INSERT INTO posts (author_id, date_created, body, contains_image, post_idx)
+        SELECT %s, %s, %s, %s, counter_value
+        FROM counters WHERE counter_name = 'post_count'
+        FOR UPDATE
+    """,
+    # add 1 to the number of post indexes handed out, once the post that was given the next index is created. deleting a
+    # post doesn't subtract from it, so post indexes are never handed out twice, and only rebuild-content-indexes lowers
+    # it when it renumbers the posts. the new value is passed through LAST_INSERT_ID(), so that it's returned as the
+    # statement's insert id without another query
+    "increment_post_count": """
+        UPDATE counters SET counter_value = LAST_INSERT_ID(counter_value + 1) WHERE counter_name = 'post_count'
+    """,
+    # add 1 to the reply count of the post that is about to be replied to. the new reply count is passed through
+    # LAST_INSERT_ID(), so that it's returned as the statement's insert id without another query
+    "increment_reply_count": """
+        UPDATE posts SET reply_count = LAST_INSERT_ID(reply_count + 1) WHERE post_id = %s
+    """,
+    # add a new row to the replies table using the inputted values. its reply index is the parent post's reply count,
+    # which was just incremented and is locked by this transaction, minus 1
+    "create_reply": """
+        INSERT INTO replies (parent_post_id, author_id, date_created, body, reply_idx)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    # add 1 to the conversation count of both users of a conversation that is about to be created
+    "increment_conversation_counts": """
+        UPDATE users SET conversation_count = conversation_count + 1 WHERE user_id IN (%s, %s)
+    """,
+    # create a new row in the conversations table with the inputted user and the current user. the conversation's index
+    # relative to each user is that user's conversation count, which was just incremented and is locked by this
+    # transaction, minus 1
+    "create_conversation": """
+        INSERT INTO conversations (user_1_id, user_2_id, date_created, user_1_conversation_idx, user_2_conversation_idx)
+        SELECT u1.user_id, u2.user_id, %s, u1.conversation_count - 1, u2.conversation_count - 1
+        FROM users u1, users u2
+        WHERE u1.user_id = %s AND u2.user_id = %s
+    """,
+    # return the conversation id, when the conversation was created, if the most recent message of the conversation has
+    # been seen by the recipient, as well as the recipients display name and username for the newest conversation the
+    # current user is a part of
+    "fetch_newest_conversation": """
+        SELECT
+            convos.conversation_id,
+            convos.date_created,
+            0 AS "contains_unseen_messages",
+            COALESCE(u1.user_id, u2.user_id) AS "recipient_user_id",
+            COALESCE(u1.display_name, u2.display_name) AS "recipient_display_name",
+            COALESCE(u1.username, u2.username) AS "recipient_username"
+        FROM conversations convos
+        LEFT JOIN users u1 ON (u1.user_id, %s) = (convos.user_1_id, convos.user_2_id)
+        LEFT JOIN users u2 ON (%s, u2.user_id) = (convos.user_1_id, convos.user_2_id)
+        WHERE %s IN (convos.user_1_id, convos.user_2_id)
+        ORDER BY convos.conversation_id DESC
+        LIMIT 1
+    """,
+    # for each post with post id within a certain range, return all its data, its like count including old likes, its
+    # reply count, and the post author's username and display name. order these results by descending post id. nothing
+    # here depends on the current user, so that timeline pages can be cached for every user. the post index is the
+    # stored post index minus the posts deleted below it since the post indexes were last renumbered
+    "fetch_timeline_page": """
+        SELECT
+            posts.post_id,
+            posts.author_id,
+            posts.date_created,
+            posts.body,
+            posts.contains_image,
+            posts.view_count,
+            posts.like_count + posts.old_like_count as "like_count",
+            posts.reply_count,
+            users.username as "author_username",
+            users.display_name as "author_display_name",
+            posts.post_idx - (
+                SELECT COUNT(*) FROM deleted_post_indexes WHERE deleted_post_indexes.post_idx < posts.post_idx
+            ) AS "post_idx"
+        FROM posts
+        INNER JOIN users ON posts.author_id = users.user_id
+        WHERE posts.post_id < %s
+        ORDER BY posts.post_id DESC
+        LIMIT %s
+    """,
+    # return which of the inputted post ids the currently logged in user has liked
+    "fetch_liked_post_ids": f"""
+        SELECT post_id FROM likes
+        WHERE user_id = %s AND post_id IN ({", ".join(["%s"] * LIKED_POST_LOOKUP_SIZE)})
+    """,
+    # return all post data for the post with the inputted post id as well as its like count including old likes, its
+    # reply count, and the post author's username and display name
+    "fetch_post": """
+        SELECT
+            posts.post_id,
+            posts.author_id,
+            posts.date_created,
+            posts.body,
+            posts.contains_image,
+            posts.view_count,
+            posts.like_count + posts.old_like_count as "like_count",
+            posts.reply_count,
+            users.username as "author_username",
+            users.display_name as "author_display_name",
+            (SELECT EXISTS (SELECT 1 FROM likes WHERE likes.post_id = posts.post_id AND likes.user_id = %s)) as "user_liked"
+        FROM posts
+        INNER JOIN users ON posts.author_id = users.user_id
+        WHERE post_id = %s
+    """,
+    # add a batch of buffered view counts to the view count of each post in the batch
+    "add_view_counts": f"""
+        UPDATE posts
+        INNER JOIN (
+            {" UNION ALL ".join(["SELECT %s AS post_id, %s AS view_increment"] * VIEW_COUNT_BATCH_SIZE)}
+        ) AS view_increments
+        ON posts.post_id = view_increments.post_id
+        SET posts.view_count = posts.view_count + view_increments.view_increment
+    """,
+    # for each reply with the parent post id post_id, return all its data, which includes the reply index relative to the
+    # parent post, as well as the reply author's username and display name. order these results by descending reply id
+    "fetch_replies": """
+        SELECT
+            replies.*,
+            users.username as "author_username",
+            users.display_name as "author_display_name"
+        FROM replies
+        INNER JOIN users ON replies.author_id = users.user_id
+        WHERE replies.parent_post_id = %s AND replies.reply_id < %s
+        ORDER BY replies.reply_id DESC
+        LIMIT %s
+    """,
+    # return the conversation id, when the conversation was created, if the most recent message of the conversation has
+    # been seen by the recipient, as well as the recipients display name and username for each conversation the current
+    # user is a part of
+    "fetch_conversations": """
+        SELECT
+            convos.conversation_id,
+            convos.date_created,
+            (
+                SELECT seen = 0 FROM messages
+                WHERE (
+                    conversation_id = convos.conversation_id AND
+                    author_id != %s
+                )
+                ORDER BY message_id DESC
+                LIMIT 1
+            ) AS "contains_unseen_messages",
+            COALESCE(u1.user_id, u2.user_id) AS "recipient_user_id",
+            COALESCE(u1.display_name, u2.display_name) AS "recipient_display_name",
+            COALESCE(u1.username, u2.username) AS "recipient_username",
+            IF(convos.user_1_id = %s, convos.user_1_conversation_idx, convos.user_2_conversation_idx) AS "conversation_idx"
+        FROM conversations convos
+        LEFT JOIN users u1 ON (u1.user_id, %s) = (convos.user_1_id, convos.user_2_id)
+        LEFT JOIN users u2 ON (%s, u2.user_id) = (convos.user_1_id, convos.user_2_id)
+        WHERE %s in (convos.user_1_id, convos.user_2_id)
+            AND convos.conversation_id < %s
+        ORDER BY convos.conversation_id DESC
+        LIMIT %s
+    """,
+    # return the display name and username of the currently logged in user
+    "fetch_own_profile": """
+        SELECT display_name,username FROM users WHERE user_id = %s
+    """,
+    # return the user id and display name for the user who's username value is the inputted username
+    "fetch_profile_from_username": """
+        SELECT user_id, display_name FROM users
+        WHERE username = %s
+    """,
+    # add a row to the likes table and for the currently logged in user and the inputted post id
+    "create_like": """
+        INSERT INTO likes (post_id, user_id, date_created)
+        VALUES (%s, %s, %s)
+    """,
+    # add 1 to the like count of the post that was just liked
+    "increment_like_count": """
+        UPDATE posts SET like_count = like_count + 1 WHERE post_id = %s
+    """,
+    # to limit db size, each user's oldest likes are compacted if their like-count exceeds the like-count limit. return
+    # the ids of up to the inputted number of users who have more likes than the limit. this reads the whole
+    # (user_id, date_created) index of the likes table, so it's only run by the compact-likes command
+    "fetch_users_over_like_limit": """
+        SELECT user_id FROM likes
+        GROUP BY user_id
+        HAVING COUNT(*) > %s
+        LIMIT %s
+    """,
+    # return the post ids of a batch of the user's likes that are older than their newest like-count limit likes. the
+    # like rows aren't locked here, since every transaction that changes likes locks the liked posts first
+    "fetch_overflow_likes": """
+        SELECT post_id FROM likes
+        WHERE user_id = %s
+        ORDER BY date_created DESC, post_id DESC
+        LIMIT %s, %s
+    """,
+    # lock the posts of a batch of overflow likes before their like rows, in the same order as liking and unliking a
+    # post lock them, so that compaction can't deadlock with them
+    "lock_liked_posts": f"""
+        SELECT post_id FROM posts
+        WHERE post_id IN ({", ".join(["%s"] * LIKE_COMPACTION_BATCH_SIZE)})
+        ORDER BY post_id
+        FOR UPDATE
+    """,
+    # return and lock the likes of a batch that still exist once their posts are locked, since the user may have
+    # unliked some of the posts since the batch was read
+    "fetch_likes_to_archive": f"""
+        SELECT post_id FROM likes
+        WHERE user_id = %s AND post_id IN ({", ".join(["%s"] * LIKE_COMPACTION_BATCH_SIZE)})
+        FOR UPDATE
+    """,
+    # move each compacted like from the corresponding post's "like_count" value to its "old_like_count" value
+    "archive_likes": f"""
+        UPDATE posts SET
+            old_like_count = old_like_count + 1,
+            like_count = like_count - 1
+        WHERE post_id IN ({", ".join(["%s"] * LIKE_COMPACTION_BATCH_SIZE)})
+    """,
+    # delete the like records that were just counted into "old_like_count"
+    "delete_archived_likes": f"""
+        DELETE FROM likes
+        WHERE user_id = %s AND post_id IN ({", ".join(["%s"] * LIKE_COMPACTION_BATCH_SIZE)})
+    """,
+    # delete the row from the likes table that says this user liked the inputted post
+    "delete_like": """
+        DELETE FROM likes WHERE post_id = %s AND user_id = %s
+    """,
+    # subtract 1 from the like count of the post that was just unliked
+    "decrement_like_count": """
+        UPDATE posts SET like_count = like_count - 1 WHERE post_id = %s
+    """,
+    # fetch the relevant post and its data using the inputted post_id if it exists
+    "fetch_post_for_deletion": """
+        SELECT * FROM posts WHERE post_id = %s FOR UPDATE
+    """,
+    # the likes, replies and post related to a post id are deleted in this order since if the post is deleted first any
+    # likes and replies related to the post will fail their post-id foreign-key check
+    "delete_post_likes": """
+        DELETE FROM likes WHERE post_id = %s
+    """,
+    "delete_post_replies": """
+        DELETE FROM replies WHERE parent_post_id = %s
+    """,
+    "delete_post": """
+        DELETE FROM posts WHERE post_id = %s
+    """,
+    # record the stored post index of a deleted post, which lowers the post index of every newer post by 1 without
+    # rewriting their rows
+    "record_deleted_post_index": """
+        INSERT INTO deleted_post_indexes (post_idx) VALUES (%s)
+    """,
+    # fetch the relevant reply and its data using the inputted reply_id if it exists
+    "fetch_reply": """
+        SELECT * FROM replies WHERE reply_id = %s
+    """,
+    # delete the reply with the inputted reply id
+    "delete_reply": """
+        DELETE FROM replies WHERE reply_id = %s
+    """,
+    # subtract 1 from the reply count of the post whose reply was just deleted
+    "decrement_reply_count": """
+        UPDATE posts SET reply_count = reply_count - 1 WHERE post_id = %s
+    """,
+    # subtract 1 from the reply index of every newer reply to the same post as a deleted reply, so the indexes stay
+    # contiguous
+    "shift_reply_indexes": """
+        UPDATE replies SET reply_idx = reply_idx - 1 WHERE parent_post_id = %s AND reply_id > %s
+    """,
+    # return the largest post id, which is the upper bound for counter reconciliation
+    "fetch_max_post_id": """
+        SELECT COALESCE(MAX(post_id), 0) AS "max_post_id" FROM posts
+    """,
+    # recount the like and reply counts of each post with a post id within a certain range from the likes and replies
+    # tables
+    "reconcile_post_counters": """
+        UPDATE posts
+        SET
+            like_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id),
+            reply_count = (SELECT COUNT(*) FROM replies WHERE replies.parent_post_id = posts.post_id)
+        WHERE posts.post_id >= %s AND posts.post_id < %s
+    """,
+    # renumber the post index of every post and recount the post count. the renumbered indexes are exact, so the
+    # recorded deleted post indexes are cleared in the same transaction
+    "rebuild_post_indexes": """
+        UPDATE posts
+        INNER JOIN (
+            SELECT post_id, ROW_NUMBER() OVER (ORDER BY post_id ASC) - 1 AS "post_idx"
+            FROM posts
+        ) AS numbered_posts
+        ON posts.post_id = numbered_posts.post_id
+        SET posts.post_idx = numbered_posts.post_idx
+    """,
+    "rebuild_post_count": """
+        UPDATE counters SET counter_value = (SELECT COUNT(*) FROM posts) WHERE counter_name = 'post_count'
+    """,
+    "clear_deleted_post_indexes": """
+        DELETE FROM deleted_post_indexes
+    """,
+    # renumber the reply index of every reply relative to its parent post
+    "rebuild_reply_indexes": """
+        UPDATE replies
+        INNER JOIN (
+            SELECT reply_id, ROW_NUMBER() OVER (PARTITION BY parent_post_id ORDER BY reply_id ASC) - 1 AS "reply_idx"
+            FROM replies
+        ) AS numbered_replies
+        ON replies.reply_id = numbered_replies.reply_id
+        SET replies.reply_idx = numbered_replies.reply_idx
+    """,
+    # renumber the message index of every message relative to its conversation, starting at 1, and recount the message
+    # count of every conversation
+    "rebuild_message_indexes": """
+        UPDATE messages
+        INNER JOIN (
+            SELECT message_id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY message_id ASC) AS "message_idx"
+            FROM messages
+        ) AS numbered_messages
+        ON messages.message_id = numbered_messages.message_id
+        SET messages.message_idx = numbered_messages.message_idx
+    """,
+    "rebuild_message_counts": """
+        UPDATE conversations
+        SET message_count = (SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.conversation_id)
+    """,
+    # renumber the index of every conversation relative to each of its two users, and recount the conversation count of
+    # every user. a conversation is numbered once per user, so the user_1 and user_2 sides are updated separately
+    "rebuild_user_1_conversation_indexes": """
+        UPDATE conversations
+        INNER JOIN (
+            SELECT
+                conversation_id,
+                user_id,
+                ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY conversation_id ASC) - 1 AS "conversation_idx"
+            FROM (
+                SELECT conversation_id, user_1_id AS "user_id" FROM conversations
+                UNION ALL
+                SELECT conversation_id, user_2_id AS "user_id" FROM conversations
+            ) AS participants
+        ) AS numbered_conversations
+        ON (conversations.conversation_id, conversations.user_1_id) = (numbered_conversations.conversation_id, numbered_conversations.user_id)
+        SET conversations.user_1_conversation_idx = numbered_conversations.conversation_idx
+    """,
+    "rebuild_user_2_conversation_indexes": """
+        UPDATE conversations
+        INNER JOIN (
+            SELECT
+                conversation_id,
+                user_id,
+                ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY conversation_id ASC) - 1 AS "conversation_idx"
+            FROM (
+                SELECT conversation_id, user_1_id AS "user_id" FROM conversations
+                UNION ALL
+                SELECT conversation_id, user_2_id AS "user_id" FROM conversations
+            ) AS participants
+        ) AS numbered_conversations
+        ON (conversations.conversation_id, conversations.user_2_id) = (numbered_conversations.conversation_id, numbered_conversations.user_id)
+        SET conversations.user_2_conversation_idx = numbered_conversations.conversation_idx
+    """,
+    "rebuild_conversation_counts": """
+        UPDATE users
+        SET conversation_count = (
+            SELECT COUNT(*) FROM conversations
+            WHERE users.user_id IN (conversations.user_1_id, conversations.user_2_id)
+        )
+    """,
+    # wait up to the inputted number of seconds for the lock that only one process applying migrations can hold
+    "acquire_migration_lock": """
+        SELECT GET_LOCK('bitter_schema_migrations', %s) AS "lock_acquired"
+    """,
+    "release_migration_lock": """
+        SELECT RELEASE_LOCK('bitter_schema_migrations') AS "lock_released"
+    """,
+    # the table of applied migrations, created the first time migrations are applied
+    "create_schema_migrations_table": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            date_applied BIGINT NOT NULL
+        )
+    """,
+    "fetch_applied_migration_versions": """
+        SELECT version FROM schema_migrations
+    """,
+    # record that the migration with the inputted version was applied
+    "record_migration": """
+        INSERT INTO schema_migrations (version, name, date_applied)
+        VALUES (%s, %s, %s)
+    """
+}
+
+
+class StatementCursor:
+    """Cursor that executes the named statements in STATEMENTS as server-side prepared statements. The prepared
+    statements are cached on the underlying pooled connection, so each statement is only parsed and planned by MySQL
+    once per connection. Result rows are fetched eagerly using the binary protocol and returned as dictionaries, like
+    a buffered MySQLCursorDict.
+
+    Statements are executed with a single COM_STMT_EXECUTE. MySQLCursorPrepared sends a COM_STMT_RESET before every
+    execute, which costs a round trip of its own and is only needed to discard long data or an open server-side cursor.
+    Neither is used here, since parameters are never streamed and every result set is read in full.
+    """
+
+    def __init__(self, conn : PooledMySQLConnection | MySQLConnection) -> None:
+        self._conn = conn
+        self._rows : list[dict] = []
+        self._row_idx = 0
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, statement_name : str, params : typing.Sequence = ()) -> None:
+        """Execute the named statement with the inputted parameters
+
+        Args:
+            statement_name (str): A key of STATEMENTS
+            params (typing.Sequence, optional): Values for the statement's placeholders, in order. Defaults to ().
+
+        Raises:
+            mysql.connector.errors.ProgrammingError: If the number of parameters doesn't match the statement's
+        """
+        raw_conn, prepared_statement = get_prepared_statement(self._conn, statement_name)
+        params = tuple(params)
+
+        if len(params) != len(prepared_statement["parameters"]):
+            raise errors.ProgrammingError(
+                errno = 1210,
+                msg = f"Incorrect number of arguments executing prepared statement '{statement_name}'"
+            )
+
+        result = raw_conn.cmd_stmt_execute(
+            prepared_statement["statement_id"],
+            data = params,
+            parameters = prepared_statement["parameters"]
+        )
+
+        self._rows = []
+        self._row_idx = 0
+
+        # statements without a result set return their OK packet
+        if isinstance(result, dict):
+            self.rowcount = result.get("affected_rows", -1)
+            self.lastrowid = result.get("insert_id")
+            return
+
+        # read the whole result set right away so the connection is ready for the next statement
+        _, description, _ = result
+        raw_conn.unread_result = True
+        rows, _ = raw_conn.get_rows(binary = True, columns = description)
+
+        self._rows = [self._row_to_dict(description, row) for row in rows]
+        self.rowcount = len(self._rows)
+        self.lastrowid = None
+
+    def fetchone(self) -> dict | None:
+        if self._row_idx >= len(self._rows):
+            return None
+
+        row = self._rows[self._row_idx]
+        self._row_idx += 1
+        return row
+
+    def fetchall(self) -> list[dict]:
+        rows = self._rows[self._row_idx:]
+        self._row_idx = len(self._rows)
+        return rows
+
+    def close(self) -> None:
+        # the prepared statements belong to the connection and outlive this cursor, so only the results are dropped
+        self._rows = []
+        self._row_idx = 0
+
+    def _row_to_dict(self, description : list[tuple], row : tuple) -> dict:
+        # the binary protocol already decodes numeric and temporal values, only string-like values are left as bytes
+        converter = self._conn.converter
+        return {
+            column[0]: converter.to_python(column, value) if isinstance(value, (bytes, bytearray)) else value
+            for column, value in zip(description, row)
+        }
+
+
+def get_prepared_statement(conn : PooledMySQLConnection | MySQLConnection,
+                           statement_name : str) -> tuple[MySQLConnection, dict]:
+    """Return the server-side prepared statement for the named statement on the inputted connection, preparing it if
+    needed. The cache is stored on the connection object that the pool hands out again and again, and is discarded if
+    the connection has reconnected since the server-side statements don't survive a new session.
+
+    Args:
+        conn (PooledMySQLConnection | MySQLConnection): The connection to prepare the statement on
+        statement_name (str): A key of STATEMENTS
+
+    Returns:
+        tuple[MySQLConnection, dict]: The connection that the statement is prepared on, and the prepared statement as
+        returned by MySQLConnection.cmd_stmt_prepare
+    """
+    if statement_name not in STATEMENTS:
+        raise KeyError(f"Unknown database statement '{statement_name}'")
+
+    # pooled connections wrap the MySQLConnection that is actually kept in the pool
+    raw_conn = getattr(conn, "_cnx", None) or conn
+
+    statement_cache = getattr(raw_conn, "_prepared_statements", None)
+    if statement_cache is None or statement_cache["connection_id"] != raw_conn.connection_id:
+        statement_cache = {"connection_id": raw_conn.connection_id, "statements": {}}
+        raw_conn._prepared_statements = statement_cache
+
+    prepared_statements : dict[str, dict] = statement_cache["statements"]
+    if statement_name not in prepared_statements:
+        # the server expects "?" placeholders. %s is replaced outside of quotes only, like MySQLCursorPrepared does
+        operation = RE_SQL_FIND_PARAM.sub(b"?", STATEMENTS[statement_name].encode(raw_conn.python_charset))
+        prepared_statements[statement_name] = raw_conn.cmd_stmt_prepare(operation)
+
+    return raw_conn, prepared_statements[statement_name]
@@ -1,98 +1,640 @@
-from .. import app, db_pool
+from .. import app, db_pool, db_replica_pools
 from ..config import API_CONFIG
 from .misc_utils import (
     login_required,
     use_only_expected_kwargs,
     check_user_input_validity
 )
-from contextlib import closing
+from .db_statements import (
+    StatementCursor,
+    VIEW_COUNT_BATCH_SIZE,
+    SEEN_RECEIPT_BATCH_SIZE,
+    LIKE_COMPACTION_BATCH_SIZE
+)
+from .write_buffers import CountingWriteBuffer, SetWriteBuffer
+from .pagination_utils import parse_page_args, make_page
+from .cache_utils import LRUCache
+from .socket_utils import is_user_in_room
+from .password_utils import password_hasher
+from contextlib import closing, contextmanager
 from mysql.connector.pooling import PooledMySQLConnection
-from mysql.connector.cursor import MySQLCursorDict
+from mysql.connector.errors import Error
+from mysql.connector import IntegrityError, errorcode
+from flask import g, has_app_context, has_request_context, request, Response
 from functools import wraps
-import os, typing, json
+import os, typing, json, itertools
 from datetime import datetime, timezone
-from werkzeug.security import generate_password_hash, check_password_hash
 
-def get_db_connection() -> PooledMySQLConnection:
-    """Attempt to get a connection to the MySQL database. Return a 
+# replicas are picked in turn, so that reads are spread evenly over them
+_replica_pool_cycle = itertools.cycle(db_replica_pools)
+
+# user ids of users who committed a write within the last read_your_writes_window_seconds. their reads go to the primary,
+# since the replicas may not have their write yet. this only covers the writes made through this process, so HTTP
+# responses to writes also carry the time of the write in the last_write cookie, which every process checks
+recent_writers = LRUCache(
+    "recent-writers",
+    max_size = API_CONFIG["recent_writers_max_size"],
+    ttl = API_CONFIG["read_your_writes_window_seconds"]
+)
+
+def is_recent_writer(user_id : int) -> bool:
+    """Whether the user committed a write within the last read_your_writes_window_seconds, either through this process
+    or, according to the last_write cookie of the current request, through any process
+
+    Args:
+        user_id (int): The user to check
+
+    Returns:
+        bool: Whether the user's reads should go to the primary
+    """
+    if recent_writers.get(user_id, False):
+        return True
+
+    if not has_request_context():
+        return False
+
+    try:
+        last_write = float(request.cookies.get("last_write", ""))
+    except ValueError:
+        return False
+
+    # a write time in the future is ignored, so that a made up cookie can't keep a client on the primary
+    return 0 <= datetime.now(timezone.utc).timestamp() - last_write < API_CONFIG["read_your_writes_window_seconds"]
+
+def get_db_connection(read_only = False) -> PooledMySQLConnection:
+    """Attempt to get a connection to the MySQL database. Read-only connections are taken from the replica pools if any
+    replicas are configured, and from the primary pool otherwise or if the replica can't be reached.
+
+    Args:
+        read_only (bool, optional): Whether the connection will only be used for reads. Defaults to False.
 
     Returns:
         PooledMySQLConnection: A connection instance to the database
     """
+    if read_only and db_replica_pools:
+        replica_pool = next(_replica_pool_cycle)
+
+        try:
+            return replica_pool.get_connection()
+        except Error:
+            app.logger.warning(f"Failed getting a connection from '{replica_pool.pool_name}', reading from the primary")
+
     return db_pool.get_connection()
 
-def uses_db_connection(func) -> typing.Callable:
+class ScopedConnection:
+    """A pooled connection and cursor shared by every uses_db_connection call of one request or socket event. The
+    connection is checked out on the first call and returned to the pool when the app context is torn down.
+    """
+
+    def __init__(self, read_only = False) -> None:
+        self.conn = get_db_connection(read_only)
+        self.cursor = StatementCursor(self.conn)
+        self.depth = 0
+        # ^ the number of uses_db_connection calls that are currently using the connection
+
+    def release(self) -> None:
+        with closing(self.conn):
+            with closing(self.cursor):
+                # the pool doesn't reset sessions, so an unfinished transaction would otherwise leak into the next
+                # checkout of this connection
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+
+def get_scoped_connection(read_only = False) -> ScopedConnection:
+    """Return the connection of the current app context, checking one out of the pool if the context has none yet.
+    Reads reuse the context's primary connection if it has one, so that they see the context's own writes.
+
+    Args:
+        read_only (bool, optional): Whether the connection will only be used for reads. Defaults to False.
+
+    Returns:
+        ScopedConnection: The connection of the current app context
+    """
+    if read_only and "db_connection" not in g:
+        if "db_replica_connection" not in g:
+            g.db_replica_connection = ScopedConnection(read_only = True)
+
+        return g.db_replica_connection
+
+    if "db_connection" not in g:
+        g.db_connection = ScopedConnection()
+
+    return g.db_connection
+
+def release_db_connection() -> None:
+    """Return the connections of the current app context to the pool before slow work that doesn't use them, like
+    hashing a password. The next uses_db_connection call of the context checks out a new connection. Must not be called
+    from within a function decorated with uses_db_connection, since that function is still using the connection.
+    Outside an app context, connections are already returned when each decorated function returns.
+    """
+    if not has_app_context():
+        return
+
+    for connection_key in ("db_connection", "db_replica_connection"):
+        scoped_connection : ScopedConnection | None = g.get(connection_key)
+        if not scoped_connection:
+            continue
+
+        if scoped_connection.depth:
+            raise RuntimeError("Can't release the database connection while a uses_db_connection call is using it")
+
+        g.pop(connection_key)
+        scoped_connection.release()
+
+@app.teardown_appcontext
+def release_scoped_connection(_exception : BaseException | None) -> None:
+    release_db_connection()
+
+@app.after_request
+def append_last_write_to_response(resp : Response) -> Response:
+    # tell the client when the request committed a write, so that its next requests read from the primary whichever
+    # process serves them
+    if g.get("committed_write_at"):
+        resp.set_cookie(
+            "last_write",
+            str(g.committed_write_at),
+            max_age = API_CONFIG["read_your_writes_window_seconds"],
+            path = "/",
+            secure = True,
+            httponly = True,
+            samesite = "Strict"
+        )
+
+    return resp
+
+def uses_db_connection(func : typing.Callable | None = None, read_only = False) -> typing.Callable:
     """Decorator that gets a database connection and passes it to the decorated function as parameter values "db_conn"
-    (PooledMySQLConnection) and "db_cursor" (MySQLCursorDict). The decorated function may, but is not required to,
-    expect either of the "db_conn" and "db_cursor" parameters. The database connection and cursor are automatically
-    closed when out of scope.
+    (PooledMySQLConnection) and "db_cursor" (StatementCursor). The decorated function may, but is not required to,
+    expect either of the "db_conn" and "db_cursor" parameters. Used either as @uses_db_connection or as
+    @uses_db_connection(read_only = True).
+
+    Within an app context, such as an HTTP request or a socket event, every decorated function shares the context's
+    connection, which is returned to the pool once when the context is torn down. Any transaction that the outermost
+    decorated function didn't commit is rolled back when it returns. Outside an app context, like in background
+    flushers and periodic tasks, each call checks out its own connection and returns it to the pool when done.
+
+    Read-only functions get a replica connection, unless the current user is a recent writer, in which case they read
+    from the primary until their writes have had time to reach the replicas.
+
+    Args:
+        read_only (bool, optional): Whether the decorated function only reads. Defaults to False.
 
     Returns:
         Any: The returned value from the decorated function
     """
+    if func is None:
+        return lambda func: uses_db_connection(func, read_only)
+
     @wraps(func)
     def wrapper(*args, **kwargs) -> typing.Any:
-        with closing(get_db_connection()) as conn:
-            with closing(conn.cursor(dictionary=True)) as cursor:
-                return func(*args, **kwargs, db_conn = conn, db_cursor = cursor)
+        if not has_app_context():
+            scoped_connection = ScopedConnection(read_only)
+            try:
+                return func(*args, **kwargs, db_conn = scoped_connection.conn, db_cursor = scoped_connection.cursor)
+            finally:
+                scoped_connection.release()
+
+        # the current user is passed on by login_required
+        current_user : dict | None = kwargs.get("current_user")
+        uses_replica = read_only and not (current_user and is_recent_writer(current_user["user_id"]))
+
+        scoped_connection = get_scoped_connection(uses_replica)
+        scoped_connection.depth += 1
+        try:
+            return func(*args, **kwargs, db_conn = scoped_connection.conn, db_cursor = scoped_connection.cursor)
+        finally:
+            scoped_connection.depth -= 1
+
+            # nested calls leave their transaction to the outermost call, which is where the transaction ends
+            if scoped_connection.depth == 0:
+                if scoped_connection.conn.in_transaction:
+                    scoped_connection.conn.rollback()
+
+                # send the current user's reads to the primary for a while if they just wrote something
+                if scoped_connection.conn.committed and current_user:
+                    recent_writers.set(current_user["user_id"], True)
+                    g.committed_write_at = datetime.now(timezone.utc).timestamp()
+
+                scoped_connection.conn.committed = False
     
     return wrapper
 
+@contextmanager
+def db_transaction(db_conn : PooledMySQLConnection) -> typing.Iterator[None]:
+    """Context manager that commits the statements run within it, or rolls them back if an exception is raised
+
+    Args:
+        db_conn (PooledMySQLConnection): The connection the statements are run on
+    """
+    try:
+        yield
+    except BaseException:
+        db_conn.rollback()
+        raise
+
+    db_conn.commit()
+
+# the user-independent part of timeline pages, keyed by (cursor, limit). likes, replies and view counts are patched into
+# the cached pages, while creating or deleting a post shifts every page and clears the cache
+timeline_cache = LRUCache(
+    "timeline",
+    max_size = API_CONFIG["timeline_cache_max_pages"],
+    ttl = API_CONFIG["timeline_cache_ttl_seconds"]
+)
+
+def patch_cached_posts(key : str, changes : dict[int, int]) -> None:
+    """Add a change to a counter of posts in every cached timeline page
+
+    Args:
+        key (str): The counter to change, like "like_count"
+        changes (dict[int, int]): {post_id: amount to add to the counter}
+    """
+    def patch_page(posts : list[dict]) -> None:
+        for post in posts:
+            if post["post_id"] in changes:
+                post[key] += changes[post["post_id"]]
+
+    timeline_cache.update_values(patch_page)
+
+# username -> {"user_id": int, "display_name": str} of existing users, or {} for usernames that don't belong to a user.
+# usernames are lowercased, since the users table compares them case-insensitively. the directory is kept per process
+# and only patched by the process that changed a display name, so other processes may show the old display name until
+# their entry expires
+user_directory = LRUCache(
+    "user-directory",
+    max_size = API_CONFIG["user_directory_max_size"],
+    ttl = API_CONFIG["user_directory_ttl_seconds"]
+)
+
+def fetch_user_by_username(username : str, db_cursor : StatementCursor) -> dict:
+    """Return the user id and display name of the user with the inputted username, from the user directory if possible
+
+    Args:
+        username (str): A sanitized username
+        db_cursor (StatementCursor): The cursor to query the users table with on a cache miss
+
+    Returns:
+        dict: {"user_id": int, "display_name": str}, or {} if no user has the username
+    """
+    directory_key = username.lower()
+    cache_generation = user_directory.generation
+    user = user_directory.get(directory_key)
+
+    if user is None:
+        # fetch the user id and display name of the user with the inputted username
+        db_cursor.execute("fetch_profile_from_username", (username,))
+        user = db_cursor.fetchone() or {}
+
+        # the user may have signed up moments ago, possibly through another process, so usernames that weren't found are
+        # only cached briefly
+        user_directory.set(
+            directory_key,
+            user,
+            generation = cache_generation,
+            ttl = None if user else API_CONFIG["user_directory_negative_ttl_seconds"]
+        )
+
+    # copy the user, so that callers can't change the cached value
+    return dict(user)
+
+def update_cached_display_name(user_id : int, display_name : str) -> None:
+    """Patch the display name of the inputted user id in the user directory
+
+    Args:
+        user_id (int): The user who changed their display name
+        display_name (str): The new display name
+    """
+    def patch_user(user : dict) -> None:
+        if user.get("user_id") == user_id:
+            user["display_name"] = display_name
+
+    user_directory.update_values(patch_user)
+
+# (lower user id, higher user id) -> the id of the conversation the two users share, or 0 if they don't share one. a
+# conversation's users never change, so only the entries for pairs without a conversation expire quickly. those are
+# replaced by cache_new_conversation in the process that created the conversation, while other processes see it once
+# their entry expires
+conversation_cache = LRUCache(
+    "conversations",
+    max_size = API_CONFIG["conversation_cache_max_size"],
+    ttl = API_CONFIG["conversation_cache_ttl_seconds"]
+)
+
+def get_user_pair(user_id : int, other_user_id : int) -> tuple[int, int]:
+    return (min(user_id, other_user_id), max(user_id, other_user_id))
+
+def fetch_conversation_id(user_id : int, other_user_id : int, db_cursor : StatementCursor) -> int | None:
+    """Return the id of the conversation that the two inputted users share, from the conversation cache if possible
+
+    Args:
+        user_id (int): One user of the conversation
+        other_user_id (int): The other user of the conversation
+        db_cursor (StatementCursor): The cursor to query the conversations table with on a cache miss
+
+    Returns:
+        int | None: The conversation id, or None if the users don't share a conversation
+    """
+    user_pair = get_user_pair(user_id, other_user_id)
+    cache_generation = conversation_cache.generation
+    conversation_id = conversation_cache.get(user_pair)
+
+    if conversation_id is None:
+        # return the conversation id of the conversation that the two inputted user ids share, if it exists
+        db_cursor.execute("fetch_conversation_id", (user_id, other_user_id, other_user_id, user_id))
+        conversation_id = (db_cursor.fetchone() or {}).get("conversation_id", 0)
+
+        negative_ttl = API_CONFIG["conversation_cache_negative_ttl_seconds"]
+        conversation_cache.set(
+            user_pair,
+            conversation_id,
+            generation = cache_generation,
+            ttl = None if conversation_id else negative_ttl
+        )
+
+    return conversation_id or None
+
+def cache_new_conversation(user_id : int, other_user_id : int, conversation_id : int) -> None:
+    """Store a newly created conversation in the conversation cache, replacing a cached "no conversation" entry
+
+    Args:
+        user_id (int): One user of the conversation
+        other_user_id (int): The other user of the conversation
+        conversation_id (int): The id of the new conversation
+    """
+    conversation_cache.set(get_user_pair(user_id, other_user_id), conversation_id)
+
 @uses_db_connection
-def ensure_admin_account_exists(db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> None:
+def write_view_counts(view_counts : dict[int, int], db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> None:
+    """Add buffered view counts to the posts table, VIEW_COUNT_BATCH_SIZE posts per statement
+
+    Args:
+        view_counts (dict[int, int]): {post_id: number of views to add}
+    """
+    view_count_items = list(view_counts.items())
+
+    for batch_start in range(0, len(view_count_items), VIEW_COUNT_BATCH_SIZE):
+        batch = view_count_items[batch_start : batch_start + VIEW_COUNT_BATCH_SIZE]
+
+        # pad the batch with post id 0, which never exists, so that every batch fits the same prepared statement
+        batch += [(0, 0)] * (VIEW_COUNT_BATCH_SIZE - len(batch))
+        db_cursor.execute("add_view_counts", [value for post_view_count in batch for value in post_view_count])
+
+    db_conn.commit()
+
+    patch_cached_posts("view_count", view_counts)
+
+# post views are counted in-process and flushed in batches, so that fetching posts doesn't lock the fetched post rows
+view_count_buffer = CountingWriteBuffer(
+    "view-counts",
+    write_view_counts,
+    flush_interval = API_CONFIG["view_count_flush_interval_seconds"],
+    flush_threshold = API_CONFIG["view_count_flush_threshold"]
+)
+
+@uses_db_connection
+def write_seen_receipts(message_ids : set[int], db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> None:
+    """Mark buffered messages as seen, SEEN_RECEIPT_BATCH_SIZE messages per statement
+
+    Args:
+        message_ids (set[int]): Ids of the messages to mark as seen
+    """
+    message_ids = list(message_ids)
+
+    for batch_start in range(0, len(message_ids), SEEN_RECEIPT_BATCH_SIZE):
+        batch = message_ids[batch_start : batch_start + SEEN_RECEIPT_BATCH_SIZE]
+
+        # pad the batch with message id 0, which never exists, so that every batch fits the same prepared statement
+        batch += [0] * (SEEN_RECEIPT_BATCH_SIZE - len(batch))
+        db_cursor.execute("mark_messages_as_seen", batch)
+
+    db_conn.commit()
+
+# seen receipts from message history fetches and from realtime messages are merged and flushed in batches
+seen_receipt_buffer = SetWriteBuffer(
+    "seen-receipts",
+    write_seen_receipts,
+    flush_interval = API_CONFIG["seen_receipt_flush_interval_seconds"],
+    flush_threshold = API_CONFIG["seen_receipt_flush_threshold"]
+)
+
+def compact_user_likes(user_ids : typing.Iterable[int],
+                       db_conn : PooledMySQLConnection,
+                       db_cursor : StatementCursor) -> int:
+    """To limit db size, move the likes of each inputted user beyond their newest API_CONFIG["user_like_count_limit"]
+    likes out of the likes table and into the liked posts' "old_like_count" values. Each batch of likes is compacted in
+    its own transaction. Users who don't have more likes than the limit are skipped after reading their newest likes.
+
+    Args:
+        user_ids (typing.Iterable[int]): Ids of the users whose likes to compact
+
+    Returns:
+        int: Number of likes that were compacted
+    """
+    like_limit = API_CONFIG["user_like_count_limit"]
+    compacted_like_count = 0
+
+    # pad a batch with post id 0, which never exists, so that every batch fits the same prepared statements
+    def pad_batch(post_ids : list[int]) -> list[int]:
+        return post_ids + [0] * (LIKE_COMPACTION_BATCH_SIZE - len(post_ids))
+
+    for user_id in user_ids:
+        while True:
+            db_cursor.execute("fetch_overflow_likes", (user_id, like_limit, LIKE_COMPACTION_BATCH_SIZE))
+            post_ids = [like["post_id"] for like in db_cursor.fetchall()]
+
+            if not post_ids:
+                db_conn.commit()
+                break
+
+            # lock the liked posts before the likes, like liking and unliking a post do, so that they can't deadlock
+            db_cursor.execute("lock_liked_posts", pad_batch(post_ids))
+            db_cursor.fetchall()
+
+            db_cursor.execute("fetch_likes_to_archive", [user_id, *pad_batch(post_ids)])
+            archived_post_ids = [like["post_id"] for like in db_cursor.fetchall()]
+
+            if archived_post_ids:
+                db_cursor.execute("archive_likes", pad_batch(archived_post_ids))
+                db_cursor.execute("delete_archived_likes", [user_id, *pad_batch(archived_post_ids)])
+
+            db_conn.commit()
+            compacted_like_count += len(archived_post_ids)
+
+            if len(post_ids) < LIKE_COMPACTION_BATCH_SIZE:
+                break
+
+    return compacted_like_count
+
+@uses_db_connection
+def compact_liked_users(user_ids : set[int], db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> None:
+    """Compact the likes of the users who liked a post since the last flush of the like compaction buffer
+
+    Args:
+        user_ids (set[int]): Ids of the users who liked a post
+    """
+    compacted_like_count = compact_user_likes(user_ids, db_conn, db_cursor)
+
+    if compacted_like_count:
+        app.logger.info(f"Compacted {compacted_like_count} likes of {len(user_ids)} recently liking users")
+
+# the users who liked a post are collected and their likes compacted in batches, so that only users whose like count
+# grew are checked, instead of the likes of every user
+like_compaction_buffer = SetWriteBuffer(
+    "like-compaction",
+    compact_liked_users,
+    flush_interval = API_CONFIG["like_compaction_interval_seconds"],
+    flush_threshold = API_CONFIG["like_compaction_flush_threshold"]
+)
+
+@uses_db_connection
+def compact_likes(db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> int:
+    """Compact the likes of every user who has more likes than API_CONFIG["user_like_count_limit"]. This groups the
+    whole likes index by user, so it's only run by hand, to catch users whose likes weren't compacted by the like
+    compaction buffer, like those who liked posts right before the server was stopped.
+
+    Returns:
+        int: Number of likes that were compacted
+    """
+    like_limit = API_CONFIG["user_like_count_limit"]
+    compacted_like_count = 0
+
+    while True:
+        # find the users who have more likes than the limit. each user found is compacted below the limit, so the next
+        # query returns the users that didn't fit in this one
+        db_cursor.execute("fetch_users_over_like_limit", (like_limit, API_CONFIG["like_compaction_max_users_per_run"]))
+        user_ids = [user["user_id"] for user in db_cursor.fetchall()]
+
+        db_conn.commit()
+
+        if not user_ids:
+            break
+
+        compacted_like_count += compact_user_likes(user_ids, db_conn, db_cursor)
+
+    if compacted_like_count:
+        app.logger.info(f"Compacted {compacted_like_count} likes")
+
+    return compacted_like_count
+
+@uses_db_connection
+@use_only_expected_kwargs
+def fetch_login_credentials(username : str, db_cursor : StatementCursor) -> dict:
+    # get user id and password for the user that has the inputted username
+    db_cursor.execute("fetch_login_credentials", (username,))
+
+    return db_cursor.fetchone() or {}
+
+@uses_db_connection
+@use_only_expected_kwargs
+def fetch_duplicate_username_or_email(username : str, email : str, db_cursor : StatementCursor) -> str | None:
+    # select the first value, either username of email, that already exists in the users table
+    db_cursor.execute("fetch_duplicate_username_or_email", (username, email))
+
+    return (db_cursor.fetchone() or {}).get("result")
+
+@uses_db_connection
+def create_user_account(username : str,
+                        display_name : str,
+                        email : str,
+                        hashed_password : str,
+                        db_conn : PooledMySQLConnection,
+                        db_cursor : StatementCursor) -> bool:
+    """Create a new row in users with the inputted values
+
+    Returns:
+        bool: Whether the account was created. False if the username or email was taken in the meantime
+    """
+    try:
+        db_cursor.execute("create_user", (username, display_name, email, hashed_password))
+    except IntegrityError as error:
+        if error.errno != errorcode.ER_DUP_ENTRY:
+            raise
+
+        db_conn.rollback()
+        return False
+
+    db_conn.commit()
+
+    return True
+
+@uses_db_connection
+def upgrade_password_hash(user_id : int,
+                          old_hashed_password : str,
+                          new_hashed_password : str,
+                          db_conn : PooledMySQLConnection,
+                          db_cursor : StatementCursor) -> bool:
+    """Replace a user's password hash with the same password hashed with the current hash parameters. Nothing is
+    changed if the stored hash isn't old_hashed_password anymore, since the password was changed in the meantime.
+
+    Returns:
+        bool: Whether the hash was replaced
+    """
+    db_cursor.execute("upgrade_password_hash", (new_hashed_password, user_id, old_hashed_password))
+    db_conn.commit()
+
+    return db_cursor.rowcount > 0
+
+@uses_db_connection
+@use_only_expected_kwargs
+def fetch_admin_password(db_cursor : StatementCursor) -> str | None:
+    # fetch the hashed password of the admin account if it exists
+    db_cursor.execute("fetch_admin_password")
+
+    return (db_cursor.fetchone() or {}).get("password")
+
+@uses_db_connection
+def store_admin_password(hashed_password : str,
+                         admin_account_exists : bool,
+                         db_conn : PooledMySQLConnection,
+                         db_cursor : StatementCursor) -> None:
+    # change the password of the admin account, or add the admin account if it doesnt exist
+    if admin_account_exists:
+        db_cursor.execute("update_admin_password", (hashed_password,))
+    else:
+        db_cursor.execute("create_admin_account", (hashed_password,))
+
+    db_conn.commit()
+
+def check_admin_account_password() -> str:
+    """Return the admin account password in the environment, once it's checked to be a valid password
+
+    Raises:
+        ValueError: If the password is malformed
+
+    Returns:
+        str: The password
+    """
     # extract and sanitize user inputs
     password = os.getenv("ADMIN_ACCOUNT_PASSWORD", "pass123")
     password, error_message = check_user_input_validity(password, "user_password", return_response = False)
     if error_message:
         raise ValueError(f"Malformed admin account password. Password: '{password}', error message: '{error_message}'")
-    
-    hashed_password = generate_password_hash(
-        password,
-        salt_length = API_CONFIG["account_password_salt_length"]
-    )
 
-    # fetch the hashed password of the admin account if it exists
-    db_cursor.execute(
-        f"""
-        SELECT password FROM users WHERE username = "admin"
-        """
-    )
-
-    admin_account = db_cursor.fetchone() or {}
-
-    if admin_account:
-        old_hashed_password = admin_account.get("password")
-        password_has_changed = not check_password_hash(old_hashed_password, password)
-
-        # update the admin account's passowrd if the admin account exists and the password in env doesnt match the admin
-        # account's current password
-        if password_has_changed:
-            # change the password
-            db_cursor.execute(
-                f"""
-                UPDATE users SET password = '{hashed_password}' WHERE username = 'admin'
-                """
-            )
-    
-    else:
+    return password
+
+def ensure_admin_account_exists() -> None:
+    password = check_admin_account_password()
+
+    # the password is only hashed once the connection that read the old hash was returned to the pool
+    old_hashed_password = fetch_admin_password()
+    release_db_connection()
+
+    if old_hashed_password is None:
         # add the admin account since it doesnt exist
-        db_cursor.execute(
-            # add the new admin account. there will never be a username conflict with username "admin" since this runs
-            # before users have access to the db
-            f"""
-            INSERT INTO users (username, display_name, password, is_admin)
-            VALUES ('admin', 'Admin', '{hashed_password}', true)
-            """
-        )
+        store_admin_password(password_hasher.hash_password(password), admin_account_exists = False)
 
-    db_conn.commit()
+    # update the admin account's password if the password in env doesnt match the admin account's current password, or
+    # if its hash was made with outdated hash parameters
+    elif (not password_hasher.verify_password(old_hashed_password, password)
+          or password_hasher.needs_upgrade(old_hashed_password)):
+        store_admin_password(password_hasher.hash_password(password), admin_account_exists = True)
 
     app.logger.info("Ensured primary admin account exists")
 
 @login_required
 @uses_db_connection
 @use_only_expected_kwargs
-def fetch_shared_conversation_id(username : str, current_user : dict, db_cursor : MySQLCursorDict) -> dict:
+def fetch_shared_conversation_id(username : str, current_user : dict, db_cursor : StatementCursor) -> dict:
     # extract and sanitize user inputs
     username, error_message = check_user_input_validity(username, "user_username", return_response = False)
     if error_message:
@@ -100,33 +642,14 @@ def fetch_shared_conversation_id(username : str, current_user : dict, db_cursor
 
     user_id : int = current_user["user_id"]
 
-    # fetch the conversation
-    db_cursor.execute(
-        # return the conversation id of the conversation that the currenly logged in user and the inputted username
-        # share, if it exists
-        f"""
-        WITH user_id_2 AS (
-            SELECT user_id FROM users
-            WHERE username = '{username}'
-        )
-
-        SELECT convos.conversation_id
-        FROM conversations convos
-        LEFT JOIN user_id_2
-            ON 1
-        WHERE (
-            ({user_id}, user_id) = (convos.user_1_id, convos.user_2_id) OR 
-            (user_id, {user_id}) = (convos.user_1_id, convos.user_2_id)
-        )
-        """
-    )
-
-    conversation = db_cursor.fetchone() or {}
+    # fetch the conversation that the currenly logged in user and the inputted username share, if it exists
+    user = fetch_user_by_username(username, db_cursor)
+    conversation_id = user and fetch_conversation_id(user_id, user["user_id"], db_cursor)
 
-    if not conversation:
+    if not conversation_id:
         return {"error": "Conversation ID doesn't exist"}
 
-    return conversation
+    return {"conversation_id": conversation_id}
 
 @login_required
 @uses_db_connection
@@ -134,7 +657,7 @@ def create_message(recipient_username : str,
                    message_body : str,
                    current_user : dict,
                    db_conn : PooledMySQLConnection,
-                   db_cursor : MySQLCursorDict) -> dict:
+                   db_cursor : StatementCursor) -> dict:
     # extract and sanitize user inputs
     recipient_username, error_message = check_user_input_validity(recipient_username, "user_username", return_response = False)
     if error_message:
@@ -145,165 +668,101 @@ def create_message(recipient_username : str,
         return {"error": error_message}
     
     user_id : int = current_user["user_id"]
-    date_created = datetime.now(timezone.utc).timestamp() // 1 # floor to seconds
+    date_created = int(datetime.now(timezone.utc).timestamp()) # floor to seconds
     
     # ensure that the inputted user exists and that a conversation can be created with them and the current user
-    db_cursor.execute(
-        # retrieve the user id corresponding to the inputted username, if one exist. also retreive whether a conversation
-        # exists with both the user id of the inputted username and the user id of the currently logged in user
-        f"""
-        SELECT
-            user_id AS "user_id",
-            COALESCE(convo_as_u1.conversation_id, convo_as_u2.conversation_id) AS "conversation_id"
-        FROM users
-        LEFT JOIN conversations convo_as_u1 ON (user_id, {user_id}) = (convo_as_u1.user_1_id, convo_as_u1.user_2_id)
-        LEFT JOIN conversations convo_as_u2 ON ({user_id}, user_id) = (convo_as_u2.user_1_id, convo_as_u2.user_2_id)
-        WHERE username = '{recipient_username}'
-        """
-    )
-
-    user_query = db_cursor.fetchone() or {}
-    conversation_id = user_query.get("conversation_id")
-
-    # return errors for a variety of cases
-    if not user_query:
+    recipient = fetch_user_by_username(recipient_username, db_cursor)
+    if not recipient:
         return {"error": f"User '{recipient_username}' doesn't exist"}
 
-    elif not conversation_id:
+    conversation_id = fetch_conversation_id(user_id, recipient["user_id"], db_cursor)
+
+    # return errors for a variety of cases
+    if not conversation_id:
         return {"error": "A conversation with that user doesn't exist"}
     
-    elif user_id == user_query.get("user_id"):
+    elif user_id == recipient["user_id"]:
         return {"error": "Can't message yourself"}
 
-    # create the message in the db
-    db_cursor.execute(
-        # create a new message row with the inputted values
-        f"""
-        INSERT INTO messages (author_id, body, date_created, conversation_id)
-        VALUES ({user_id}, '{message_body}', {date_created}, {conversation_id})
-        """
-    )
-
-    db_cursor.execute(
-        # fetch the new message
-        f"""
-        SELECT * FROM messages
-        ORDER BY message_id DESC
-        LIMIT 1
-        """
-    )
-
-    new_message = db_cursor.fetchone() or {}
-    db_conn.commit()
+    # the message is delivered to the recipient right away if they have the conversation open on this process, so it's
+    # created as seen. recipients connected to other processes mark it as seen once it's delivered to them
+    seen = int(is_user_in_room(conversation_id, recipient["user_id"]))
+
+    with db_transaction(db_conn):
+        # the conversation's message count is incremented first since the new message's index is derived from it. the
+        # new message count is returned as the statement's insert id
+        db_cursor.execute("increment_message_count", (conversation_id,))
+        if db_cursor.rowcount < 1:
+            return {"error": "A conversation with that user doesn't exist"}
+
+        message_idx : int = db_cursor.lastrowid
+
+        # create the message in the db. the new row is built from the inserted values instead of being fetched back
+        db_cursor.execute("create_message", (user_id, message_body, date_created, conversation_id, seen, message_idx))
+
+    new_message = {
+        "message_id": db_cursor.lastrowid,
+        "author_id": user_id,
+        "body": message_body,
+        "date_created": date_created,
+        "conversation_id": conversation_id,
+        "seen": seen,
+        "message_idx": message_idx
+    }
 
     app.logger.info(f"Created message {json.dumps(new_message)}")
 
     return new_message
 
-@uses_db_connection
-def mark_message_as_seen(safe_message_id : int, db_conn : PooledMySQLConnection, db_cursor : MySQLCursorDict) -> None:
-    # update message row
-    db_cursor.execute(
-        # update the seen value of the message with the inputted message id
-        f"""
-        UPDATE messages SET seen = true
-        WHERE message_id = {safe_message_id}
-        """
-    )
-
-    db_conn.commit()
+def mark_message_as_seen(safe_message_id : int) -> None:
+    # the message row is updated by the next seen receipt flush
+    seen_receipt_buffer.add([safe_message_id])
 
 @login_required
 @uses_db_connection
+@use_only_expected_kwargs
 def fetch_messages(recipient_username : str,
                    cursor : str,
+                   limit : str,
                    current_user : dict,
-                   db_conn : PooledMySQLConnection,
-                   db_cursor : MySQLCursorDict) -> dict | list:
+                   db_cursor : StatementCursor) -> dict:
     # extract and sanitize user inputs
     recipient_username, error_message = check_user_input_validity(recipient_username, "user_username", return_response = False)
     if error_message:
         return {"error": error_message}
     
-    cursor, error_message = check_user_input_validity(cursor, "fetch_content_cursor", return_response = False)
+    page_args, error_message = parse_page_args("messages", cursor, limit, return_response = False)
     if error_message:
         return {"error": error_message}
 
-    cursor = int(cursor)
+    cursor, limit = page_args
     user_id : int = current_user["user_id"]
 
-    # fetch messages
-    db_cursor.execute(
-        # return all messages with the conversation id of the conversation that the currently logged in user and the
-        # inputted recipient username share, if it exists
-        f"""
-        WITH user_id_2 AS (
-            SELECT user_id FROM users
-            WHERE username = '{recipient_username}'
-        ), relevant_convo AS (
-            SELECT conversation_id FROM conversations
-            LEFT JOIN user_id_2 ON 1
-            WHERE (
-                ({user_id}, user_id_2.user_id) = (conversations.user_1_id, conversations.user_2_id) OR
-                (user_id_2.user_id, {user_id}) = (conversations.user_1_id, conversations.user_2_id)
-            )
-        )
+    # fetch the messages of the conversation that the currently logged in user and the inputted recipient username
+    # share. there are no messages to fetch if the recipient or the conversation doesn't exist
+    recipient = fetch_user_by_username(recipient_username, db_cursor)
+    conversation_id = recipient and fetch_conversation_id(user_id, recipient["user_id"], db_cursor)
 
-        SELECT
-            messages.*,
-            ROW_NUMBER() OVER (ORDER BY messages.message_id ASC) as "message_idx"
-        FROM messages
-        INNER JOIN relevant_convo
-        	ON messages.conversation_id = relevant_convo.conversation_id
-        {f"WHERE messages.message_id < {cursor}" if cursor != 0 else ""}
-        ORDER BY messages.message_id DESC
-        LIMIT {API_CONFIG["message_fetch_max_results"]}
-        """
-    )
-
-    messages = db_cursor.fetchall() or []
-
-    db_cursor.execute(
-        # for each message in the previous query who's author isn't the currently logged in user, mark it as seen
-        f"""
-        UPDATE messages all_messages
-        INNER JOIN (
-            WITH user_id_2 AS (
-                SELECT user_id FROM users
-                WHERE username = '{recipient_username}'
-            ), relevant_convo AS (
-                SELECT conversation_id FROM conversations
-                LEFT JOIN user_id_2 ON 1
-                WHERE (
-                    ({user_id}, user_id_2.user_id) = (conversations.user_1_id, conversations.user_2_id) OR
-                    (user_id_2.user_id, {user_id}) = (conversations.user_1_id, conversations.user_2_id)
-                )
-            )
-
-            SELECT
-                messages.*,
-                ROW_NUMBER() OVER (ORDER BY messages.message_id ASC) as "message_idx"
-            FROM messages
-            INNER JOIN relevant_convo
-                ON messages.conversation_id = relevant_convo.conversation_id
-            {f"WHERE messages.message_id < {cursor}" if cursor != 0 else ""}
-            ORDER BY messages.message_id DESC
-            LIMIT {API_CONFIG["message_fetch_max_results"]}
-        ) AS relevant_messages
-            ON (
-                all_messages.message_id = relevant_messages.message_id AND
-                relevant_messages.author_id != {user_id}
-            )
-        SET all_messages.seen = true
-        """
-    )
+    messages = []
+    if conversation_id:
+        db_cursor.execute("fetch_messages", (conversation_id, cursor, limit + 1))
+        messages = db_cursor.fetchall() or []
 
-    db_conn.commit()
+    # the message past the limit only shows whether there's another page, so make_page leaves it out
+    page = make_page("messages", messages, limit)
+    messages = page["messages"]
+
+    # mark the fetched messages who's author isn't the currently logged in user as seen. the message rows are updated
+    # by the next seen receipt flush
+    seen_receipt_buffer.add(message["message_id"] for message in messages if message["author_id"] != user_id)
 
     # add "origin" data, which for each message specifies whether the currently logged in user sent or recieved the
-    # message
+    # message. messages that are waiting to be marked as seen are reported as seen already
     for message in messages:
         from_current_user = message["author_id"] == user_id
         message["origin"] = "sent" if from_current_user else "received"
 
-    return messages
+        if from_current_user and seen_receipt_buffer.is_pending(message["message_id"]):
+            message["seen"] = 1
+
+    return page
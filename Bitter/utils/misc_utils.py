@@ -1,34 +1,43 @@
 from .. import app
-from ..config import (
-    FORM_CONFIG,
-    APP_CONFIG,
-    FORM_FIELD_REGEX_PATTERNS,
-    FORM_FIELD_LENGTH_LIMITS,
-    FORM_VALIDATOR_ERROR_MESSAGES
-)
+from ..config import FORM_CONFIG, APP_CONFIG
 from ..forms import LoginForm, SignupForm, PostCreationForm
 from .socket_utils import emit_error_response
+from .cache_utils import LRUCache
+from .validation_utils import FIELD_VALIDATORS, FormSchema
 from functools import wraps
 from flask import Response, request, make_response, jsonify
 from flask_wtf import FlaskForm
 from werkzeug.datastructures import FileStorage
 from pathlib import Path
-import flask, re, filetype, json, jwt, traceback, typing
+import flask, filetype, json, jwt, traceback, hashlib, typing, time
 from datetime import datetime, timezone, timedelta
 from inspect import getfullargspec
 
+# sha256 digest of a JWT access token -> {"current_user": dict, "issued_at": float} of access tokens that were already
+# verified. each entry expires when its token does, so a cached token is exactly as valid as a freshly decoded one
+verified_token_cache = LRUCache(
+    "verified-tokens",
+    max_size = APP_CONFIG["verified_token_cache_max_size"],
+    ttl = APP_CONFIG["JWT_max_age_hours"] * 60 * 60
+)
 
-def get_current_user() -> dict | None:
-    """Decode the JWT token stored in the access_token cookie value, if it exists
+def get_verified_token() -> dict | None:
+    """Verify the JWT token stored in the access_token cookie value, if it exists. Tokens that were verified before are
+    read from the verified token cache instead of being decoded again.
 
     Returns:
-        dict | None: Decoded JWT as a dict, or None if something went wrong
+        dict | None: {"current_user": dict, "issued_at": float}, or None if the token is missing or invalid
     """
     # fetch the JWT access token from cookies and return None if its not present
     jwt_token = request.cookies.get("access_token")
     if not jwt_token:
         return None
 
+    token_digest = hashlib.sha256(jwt_token.encode()).digest()
+    verified_token = verified_token_cache.get(token_digest)
+    if verified_token:
+        return verified_token
+
     # declare a variable to which the JWT access token contents inserted, if any content is present
     jwt_dict = {}
 
@@ -53,12 +62,34 @@ def get_current_user() -> dict | None:
         return None
 
     # create a current_user object and insert he values from the parsed JWT access token
-    current_user = {
-        "user_id": int(user_id),
-        "is_admin": bool(jwt_dict.get("is_admin", False))
+    verified_token = {
+        "current_user": {
+            "user_id": int(user_id),
+            "is_admin": bool(jwt_dict.get("is_admin", False))
+        },
+        "issued_at": float(jwt_dict.get("iat", 0))
     }
 
-    return current_user
+    # cache the verified token until it expires. tokens without an expiry are cached for the longest token lifetime
+    if "exp" in jwt_dict:
+        verified_token_cache.set(token_digest, verified_token, ttl = float(jwt_dict["exp"]) - time.time())
+    else:
+        verified_token_cache.set(token_digest, verified_token)
+
+    return verified_token
+
+def get_current_user() -> dict | None:
+    """Return the user of the JWT token stored in the access_token cookie value, if it exists and is valid
+
+    Returns:
+        dict | None: {"user_id": int, "is_admin": bool}, or None if something went wrong
+    """
+    verified_token = get_verified_token()
+    if not verified_token:
+        return None
+
+    # copy the current user, so that callers can't change the cached value
+    return dict(verified_token["current_user"])
 
 
 def make_response_with_template(template_name : str,
@@ -171,13 +202,22 @@ def use_only_expected_kwargs(func) -> typing.Callable:
     decorated function. This enables functions to accept only the neccessary arguments and not all arguments produced
     by decorators such as login_required, admin_required and uses_db_connection.
     
+    The decorated function's parameters are read once, when it's decorated, so that calls don't pay for introspection.
+
     Returns:
         Any: The returned value from the wrapped function
     """
+    argspec = getfullargspec(func)
+
+    # a function that accepts **kwargs expects every keyword argument
+    if argspec.varkw:
+        return func
+
+    expected_args = frozenset(argspec.args + argspec.kwonlyargs)
+
     @wraps(func)
     def wrapper(*args, **kwargs) -> typing.Any:
         # filter the inputted kwargs by what the decorated function expects
-        expected_args = getfullargspec(func).args
         kwargs = {key:val for key,val in kwargs.items() if key in expected_args}
 
         return func(*args, **kwargs)
@@ -185,9 +225,10 @@ def use_only_expected_kwargs(func) -> typing.Callable:
     return wrapper
 
 def renews_access_token(func) -> typing.Callable:
-    """Decorator that renews the JWT access token when the decorated function is called. This decorator is meant to be
-    used on a function dedicated as a Flask route which returns a Flask Response. If this decorator is used it must come
-    after a decorator that ensures the that the current user is logged-in.
+    """Decorator that renews the JWT access token when the decorated function is called, if the token is older than
+    APP_CONFIG["JWT_renewal_age_fraction"] of its lifetime. This decorator is meant to be used on a function dedicated
+    as a Flask route which returns a Flask Response. If this decorator is used it must come after a decorator that
+    ensures the that the current user is logged-in.
     
     Returns:
         Any: The returned value from the wrapped function
@@ -202,9 +243,15 @@ def renews_access_token(func) -> typing.Callable:
         user_id = current_user["user_id"]
         is_admin = current_user["is_admin"]
 
-        # call the decorated function and append a new JWT access token to the response
+        # call the decorated function and append a new JWT access token to the response if the current one is old enough.
+        # recently issued tokens are kept, so that a page view doesn't re-sign a token that is nowhere near expiring
         response = func(*args, **kwargs)
-        append_access_token_to_response(user_id, is_admin, response)
+
+        verified_token = get_verified_token()
+        renewal_age_seconds = APP_CONFIG["JWT_max_age_hours"] * 60 * 60 * APP_CONFIG["JWT_renewal_age_fraction"]
+
+        if not verified_token or time.time() - verified_token["issued_at"] >= renewal_age_seconds:
+            append_access_token_to_response(user_id, is_admin, response)
         
         return response
     
@@ -212,8 +259,9 @@ def renews_access_token(func) -> typing.Callable:
 
 def validates_CSRF_form(form_type : type[FlaskForm]) -> typing.Callable:
     """Decorator generator which returns a decorator that validates the form data passed in the request. The validation
-    is done using the inputted form_type. Only meant to be used for API routes. The parsed form is then passed to the
-    decorated function.
+    is done using the compiled validators of the inputted form_type's fields, with the same error messages as
+    validating a form_type instance. Only meant to be used for API routes. The parsed form, whose fields have the
+    attributes of the form_type's fields, is then passed to the decorated function.
 
     Args:
         form_type (type[FlaskForm]): A type of FlaskForm to perform the form validation with.
@@ -222,6 +270,9 @@ def validates_CSRF_form(form_type : type[FlaskForm]) -> typing.Callable:
         callable: The generated decorator function
     """
 
+    # compile the form's fields once, instead of constructing a FlaskForm on every request
+    form_schema = FormSchema(form_type)
+
     def _validates_CSRF_form(func) -> typing.Callable:
         """Decorator that validates the form data passed in the request. Only meant to be used for API routes. The
         parsed form is then passed to the decorated function.
@@ -232,11 +283,13 @@ def validates_CSRF_form(form_type : type[FlaskForm]) -> typing.Callable:
         """
         @wraps(func)
         def wrapper(*args, **kwargs) -> typing.Any:
-            form = form_type()
-            form_valid = form.validate_on_submit()
+            form = form_schema.parse_request()
             
-            # return error response if the form is invalid
-            if not form_valid:
+            # return error response if the form wasn't submitted or is invalid
+            if form is None:
+                return make_json_response({}, 400)
+
+            if form.errors:
                 return make_json_response(form.errors, 400)
 
             return func(*args, **kwargs, form = form)
@@ -249,48 +302,14 @@ def check_user_input_validity(user_input : str | None,
                               value_key : str,
                               return_response = True) -> tuple[str | None, str | Response | None]:
 
-    def format_error(error_message : str, field_name : str, return_response : bool) -> str | Response:
-        error_message = error_message.format(field_name = field_name)
+    # validate the value with its validator, which was compiled from the config values at import
+    user_input, error_message = FIELD_VALIDATORS[value_key].check(user_input)
 
-        if return_response:
-            return make_error_response(error_message, 400)
-        
-        return error_message
-
-    # fetch the config values for the current value
-    field_name = FORM_CONFIG[value_key]["field_name"]
-    missing_error_message = FORM_VALIDATOR_ERROR_MESSAGES["required"]
-    regex_pattern = FORM_FIELD_REGEX_PATTERNS[value_key]["regex"]
-    regex_error_message = FORM_FIELD_REGEX_PATTERNS[value_key]["message"]
-    length_limits = FORM_FIELD_LENGTH_LIMITS[value_key]
-    length_error_message = FORM_VALIDATOR_ERROR_MESSAGES["length"]
-    filters = FORM_CONFIG[value_key]["filters"]
-
-    # if the user input is missing or an empty string
-    if not user_input:
-        # format the error and return it along with the user input
-        error = format_error(missing_error_message, field_name, return_response)
-        return (user_input, error)
-
-    # apply the filters defined in config
-    for func in filters:
-        user_input = func(user_input)
-
-    # if the user_input doesnt match the required regular expression
-    if not re.match(regex_pattern, user_input):
-        # format the error and return it along with the user input
-        error = format_error(regex_error_message, field_name, return_response)
-        return (user_input, error)
-    
-    # if the sanitized user input value is too short or too long
-    user_input_too_short = len(user_input) < length_limits["min"]
-    user_input_too_long = len(user_input) > length_limits["max"]
-    if user_input_too_short or user_input_too_long:        
-        # format the error and return it along with the user input
-        error = format_error(length_error_message % length_limits, field_name, return_response)
-        return (user_input, error)
-    
-    return (user_input, None)
+    # return the error as a response if requested
+    if error_message and return_response:
+        return (user_input, make_error_response(error_message, 400))
+
+    return (user_input, error_message)
 
 def handle_user_upload(file : FileStorage,
                        filename : str,
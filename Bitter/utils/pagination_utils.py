@@ -0,0 +1,101 @@
+from .. import app
+from ..config import API_CONFIG
+from .misc_utils import check_user_input_validity, make_error_response
+from .db_statements import CURSOR_START
+from itsdangerous import URLSafeSerializer, BadSignature
+from flask import Response
+
+# cursors are signed, so that clients can only continue from positions the server handed out and the cursor contents
+# can change without breaking clients
+cursor_serializer = URLSafeSerializer(app.config["SECRET_KEY"], salt = "pagination-cursor")
+
+# for each kind of paginated content: the API_CONFIG page size prefix and the id column that pages are keyed on
+PAGINATED_CONTENT = {
+    "posts":         {"config_prefix": "post",         "id_key": "post_id"},
+    "replies":       {"config_prefix": "reply",        "id_key": "reply_id"},
+    "conversations": {"config_prefix": "conversation", "id_key": "conversation_id"},
+    "messages":      {"config_prefix": "message",      "id_key": "message_id"}
+}
+
+def parse_page_args(content_type : str,
+                    cursor : str | None,
+                    limit : str | None,
+                    return_response = True) -> tuple[tuple[int, int] | None, str | Response | None]:
+    """Validate the cursor and limit of a page request. A missing cursor requests the first page and a missing limit
+    requests API_CONFIG["<content type>_fetch_default_results"] items. Pages are fetched with a limit of limit + 1,
+    see make_page.
+
+    Args:
+        content_type (str): A key of PAGINATED_CONTENT
+        cursor (str | None): An opaque cursor returned as "next_cursor" by a previous page
+        limit (str | None): The requested number of items
+        return_response (bool, optional): Whether errors are returned as error responses or as strings. Defaults to
+        True.
+
+    Returns:
+        tuple[tuple[int, int] | None, str | Response | None]: ((id to fetch items older than, limit), error)
+    """
+    def format_error(error_message : str) -> str | Response:
+        if return_response:
+            return make_error_response(error_message, 400)
+
+        return error_message
+
+    config_prefix = PAGINATED_CONTENT[content_type]["config_prefix"]
+    default_limit = API_CONFIG[f"{config_prefix}_fetch_default_results"]
+    max_limit = API_CONFIG[f"{config_prefix}_fetch_max_results"]
+
+    # decode the cursor
+    if cursor:
+        cursor, error = check_user_input_validity(cursor, "fetch_content_cursor", return_response)
+        if error:
+            return (None, error)
+
+        try:
+            cursor_content_type, last_id = cursor_serializer.loads(cursor)
+        except (BadSignature, TypeError, ValueError):
+            return (None, format_error("Invalid cursor"))
+
+        # a cursor can only continue the kind of content it was issued for
+        if cursor_content_type != content_type or not isinstance(last_id, int):
+            return (None, format_error("Invalid cursor"))
+
+    else:
+        last_id = CURSOR_START
+
+    # validate the limit
+    if limit:
+        limit, error = check_user_input_validity(limit, "fetch_content_limit", return_response)
+        if error:
+            return (None, error)
+
+        limit = int(limit)
+        if not 1 <= limit <= max_limit:
+            return (None, format_error(f"Limit must be between 1 and {max_limit}"))
+
+    else:
+        limit = default_limit
+
+    return ((last_id, limit), None)
+
+def make_page(content_type : str, items : list[dict], limit : int) -> dict:
+    """Wrap fetched items in a page that includes the cursor of the next page. The items are fetched with one item more
+    than the limit. That item isn't part of the page, it only shows that there's another page. The next cursor is None
+    when there isn't, so clients know there's nothing more to load without requesting an empty page.
+
+    Args:
+        content_type (str): A key of PAGINATED_CONTENT
+        items (list[dict]): The fetched items, newest first, fetched with a limit of limit + 1
+        limit (int): The page size
+
+    Returns:
+        dict: {<content type>: the first limit items, "next_cursor": str | None}
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = cursor_serializer.dumps([content_type, items[-1][PAGINATED_CONTENT[content_type]["id_key"]]])
+
+    return {content_type: items, "next_cursor": next_cursor}
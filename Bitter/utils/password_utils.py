@@ -0,0 +1,144 @@
+from ..config import PASSWORD_HASH_CONFIG
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+import multiprocessing, multiprocessing.forkserver, threading, typing, os
+
+class PasswordHashingBusyError(Exception):
+    """Raised when the password hashing queue stays full for longer than the queue timeout"""
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords in a pool of worker processes, so that the key derivation holds neither the GIL of
+    the request threads nor a database connection. At most max_queued hashes are run or queued at once. Callers wait up
+    to queue_timeout seconds for a place in the queue, and PasswordHashingBusyError is raised if none frees up.
+    """
+
+    def __init__(self,
+                 method : str,
+                 salt_length : int,
+                 process_pool_size : int,
+                 max_queued : int,
+                 queue_timeout : float) -> None:
+        self.method = method
+        self.salt_length = salt_length
+        self.process_pool_size = process_pool_size
+        self.queue_timeout = queue_timeout
+
+        self._queue_slots = threading.BoundedSemaphore(max_queued)
+        self._executor : ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+        os.register_at_fork(after_in_child = self._reset_after_fork)
+
+    def start(self) -> None:
+        """Start the fork server that the worker processes are forked from. create_app() starts it on its background
+        startup thread. The first hash waits for that start to finish, or starts the fork server itself if nothing
+        started it yet. Starting it again does nothing
+        """
+        if self._started:
+            return
+
+        with self._start_lock:
+            if not self._started:
+                self._get_executor()
+                multiprocessing.forkserver.ensure_running()
+                self._started = True
+
+    def hash_password(self, password : str) -> str:
+        """Hash a password with the configured method and salt length
+
+        Args:
+            password (str): The plaintext password
+
+        Raises:
+            PasswordHashingBusyError: If the hashing queue is full
+
+        Returns:
+            str: The hashed password, like "scrypt:32768:8:1$<salt>$<hash>"
+        """
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify_password(self, hashed_password : str, password : str) -> bool:
+        """Check a password against a stored hash, whichever method the hash was made with
+
+        Args:
+            hashed_password (str): The stored hash
+            password (str): The plaintext password
+
+        Raises:
+            PasswordHashingBusyError: If the hashing queue is full
+
+        Returns:
+            bool: Whether the password matches the hash
+        """
+        return self._run(check_password_hash, hashed_password, password)
+
+    def needs_upgrade(self, hashed_password : str) -> bool:
+        """Whether a stored hash was made with another method or salt length than the configured ones
+
+        Args:
+            hashed_password (str): The stored hash
+
+        Returns:
+            bool: Whether the password should be hashed again with the configured parameters
+        """
+        method, _, salt_and_hash = hashed_password.partition("$")
+        salt = salt_and_hash.partition("$")[0]
+
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self) -> None:
+        """Stop the worker processes. Hashing after a shutdown starts new ones"""
+        with self._executor_lock:
+            if self._executor:
+                self._executor.shutdown()
+                self._executor = None
+                self._started = False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # the workers are started on first use, so that they're started by the process that serves requests
+        with self._executor_lock:
+            if not self._executor:
+                # forking the serving process would copy it in the middle of whatever its other threads are doing,
+                # like holding a lock. the workers are forked from a fork server instead, a fresh single threaded
+                # process that imports the main module and the werkzeug hash functions once for every worker
+                mp_context = multiprocessing.get_context("forkserver")
+                mp_context.set_forkserver_preload(["__main__", "werkzeug.security"])
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers = self.process_pool_size,
+                    mp_context = mp_context
+                )
+
+            return self._executor
+
+    def _reset_after_fork(self) -> None:
+        # a forked child can't use the parent's workers, so it starts its own on first use. the lock may have been held
+        # by a thread that doesn't exist in the child, so it's replaced too
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _run(self, func : typing.Callable, *args) -> typing.Any:
+        if not self._queue_slots.acquire(timeout = self.queue_timeout):
+            raise PasswordHashingBusyError(
+                f"Password hashing queue stayed full for {self.queue_timeout} seconds"
+            )
+
+        try:
+            self.start()
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._queue_slots.release()
+
+
+password_hasher = PasswordHasher(
+    method = PASSWORD_HASH_CONFIG["method"],
+    salt_length = PASSWORD_HASH_CONFIG["salt_length"],
+    process_pool_size = PASSWORD_HASH_CONFIG["process_pool_size"],
+    max_queued = PASSWORD_HASH_CONFIG["max_queued_hashes"],
+    queue_timeout = PASSWORD_HASH_CONFIG["queue_timeout_seconds"]
+)
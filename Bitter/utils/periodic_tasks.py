@@ -0,0 +1,41 @@
+from .. import app
+import threading, typing
+
+class PeriodicTask:
+    """Runs a function every interval seconds on a background daemon thread. Exceptions raised by the function are
+    logged and the task keeps running, so that a failed run is simply retried on the next interval.
+    """
+
+    def __init__(self, name : str, func : typing.Callable[[], typing.Any], interval : float) -> None:
+        self.name = name
+        self.interval = interval
+
+        self._func = func
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread : threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start running the task in the background. Starting a task that is already running does nothing"""
+        with self._lock:
+            if self._thread:
+                return
+
+            self._thread = threading.Thread(target = self._run, name = self.name, daemon = True)
+            self._thread.start()
+
+        app.logger.info(f"Started periodic task '{self.name}' with an interval of {self.interval} seconds")
+
+    def stop(self) -> None:
+        """Stop the task and wait for a run that is in progress to finish"""
+        self._stop_event.set()
+
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self._func()
+            except Exception:
+                app.logger.exception(f"Periodic task '{self.name}' failed, retrying on next interval")
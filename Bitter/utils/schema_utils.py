@@ -0,0 +1,143 @@
+from .. import app
+from ..config import API_CONFIG
+from .db_utils import uses_db_connection
+from .db_statements import StatementCursor, STATEMENTS, CURSOR_START, LIKED_POST_LOOKUP_SIZE
+from mysql.connector.pooling import PooledMySQLConnection
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+import re
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+
+# migration files are named "<version>_<name>.sql", like "0001_add_content_indexes.sql"
+MIGRATION_FILENAME_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# the statements that run on almost every request, with example parameters to EXPLAIN them with. the example ids don't
+# have to exist, since the query plan doesn't depend on it
+HOT_STATEMENTS = {
+    "fetch_timeline_page": (CURSOR_START, API_CONFIG["post_fetch_default_results"]),
+    "fetch_liked_post_ids": (1, *[1] * LIKED_POST_LOOKUP_SIZE),
+    "fetch_post": (1, 1),
+    "fetch_replies": (1, CURSOR_START, API_CONFIG["reply_fetch_default_results"]),
+    "fetch_conversations": (1, 1, 1, 1, 1, CURSOR_START, API_CONFIG["conversation_fetch_default_results"]),
+    "fetch_conversation_id": (1, 2, 2, 1),
+    "fetch_messages": (1, CURSOR_START, API_CONFIG["message_fetch_default_results"]),
+    "fetch_profile_from_username": ("admin",),
+    "fetch_login_credentials": ("admin",),
+    "fetch_own_profile": (1,)
+}
+
+# EXPLAIN access types that read a whole table or a whole index
+FULL_SCAN_ACCESS_TYPES = ("ALL", "index")
+
+def find_migrations() -> list[tuple[int, str, Path]]:
+    """Return every migration in MIGRATIONS_DIR
+
+    Returns:
+        list[tuple[int, str, Path]]: (version, name, path) of each migration, ordered by version
+    """
+    migrations = []
+
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        filename_match = MIGRATION_FILENAME_PATTERN.match(path.name)
+        if not filename_match:
+            raise ValueError(f"Invalid migration filename '{path.name}', expected '<version>_<name>.sql'")
+
+        migrations.append((int(filename_match.group(1)), filename_match.group(2), path))
+
+    migrations.sort()
+
+    # two migrations with the same version would be applied in an arbitrary order
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in '{MIGRATIONS_DIR}'")
+
+    return migrations
+
+def read_migration_statements(path : Path) -> list[str]:
+    """Split a migration file into its statements. Statements end with a semicolon at the end of a line, and lines
+    starting with "--" are comments.
+
+    Args:
+        path (Path): The migration file
+
+    Returns:
+        list[str]: The statements of the migration, in order
+    """
+    lines = [line for line in path.read_text().splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags = re.MULTILINE)
+
+    return [statement.strip() for statement in statements if statement.strip()]
+
+@uses_db_connection
+def apply_migrations(db_conn : PooledMySQLConnection, db_cursor : StatementCursor) -> list[str]:
+    """Apply every migration that hasn't been applied to the database yet, in order of version. A named lock makes
+    processes that start at the same time apply the migrations one after another instead of concurrently.
+
+    MySQL commits schema changes right away, so a migration is recorded as applied once all its statements ran. The
+    statements of a migration must therefore be safe to run again, in case a migration failed partway.
+
+    Returns:
+        list[str]: The filenames of the migrations that were applied
+    """
+    db_cursor.execute("acquire_migration_lock", (API_CONFIG["migration_lock_timeout_seconds"],))
+    if not (db_cursor.fetchone() or {}).get("lock_acquired"):
+        raise TimeoutError("Timed out waiting for another process to finish applying migrations")
+
+    try:
+        db_cursor.execute("create_schema_migrations_table")
+
+        db_cursor.execute("fetch_applied_migration_versions")
+        applied_versions = {row["version"] for row in db_cursor.fetchall()}
+
+        applied_migrations = []
+
+        for version, name, path in find_migrations():
+            if version in applied_versions:
+                continue
+
+            app.logger.info(f"Applying migration '{path.name}'")
+
+            # the statements of a migration file aren't named statements, so they're run with a regular cursor
+            with closing(db_conn.cursor()) as migration_cursor:
+                for statement in read_migration_statements(path):
+                    migration_cursor.execute(statement)
+
+            date_applied = int(datetime.now(timezone.utc).timestamp())
+            db_cursor.execute("record_migration", (version, name, date_applied))
+            db_conn.commit()
+
+            applied_migrations.append(path.name)
+
+    finally:
+        db_cursor.execute("release_migration_lock")
+
+    return applied_migrations
+
+@uses_db_connection
+def find_full_scans(db_conn : PooledMySQLConnection, min_rows : int) -> list[str]:
+    """EXPLAIN each of HOT_STATEMENTS and return the ones that would read a whole table or index of at least min_rows
+    estimated rows. Smaller tables are ignored, since MySQL prefers scanning a table that fits in a few pages over using
+    an index.
+
+    Args:
+        min_rows (int): The smallest estimated row count of a scan that is reported
+
+    Returns:
+        list[str]: A description of every full scan, like "fetch_messages: full scan of messages (~5000 rows)"
+    """
+    full_scans = []
+
+    with closing(db_conn.cursor(dictionary = True)) as explain_cursor:
+        for statement_name, params in HOT_STATEMENTS.items():
+            explain_cursor.execute(f"EXPLAIN {STATEMENTS[statement_name]}", params)
+
+            for plan_row in explain_cursor.fetchall():
+                if plan_row["type"] in FULL_SCAN_ACCESS_TYPES and (plan_row["rows"] or 0) >= min_rows:
+                    full_scans.append(
+                        f"{statement_name}: full {'index ' if plan_row['type'] == 'index' else ''}scan of "
+                        f"{plan_row['table']} (~{plan_row['rows']} rows)"
+                    )
+
+    return full_scans
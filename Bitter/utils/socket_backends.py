@@ -0,0 +1,191 @@
+from .. import app
+from ..config import SOCKET_BUS_CONFIG
+from .socket_rooms import SocketRoomRegistry
+from pathlib import Path
+import threading, socket, struct, atexit, json, os, typing, abc
+
+# large enough for any message Bitter publishes, and below the default Unix datagram size limit
+MAX_DATAGRAM_SIZE = 64 * 1024
+
+class RoomBackend(abc.ABC):
+    """Base class for socket room backends. Each process keeps the room memberships of the sockets connected to it,
+    while published messages are handed to the message handler of every Bitter process using the backend. The message
+    handler then delivers the message to the process' own room members.
+    """
+
+    def __init__(self) -> None:
+        self.rooms = SocketRoomRegistry()
+        self._message_handler : typing.Callable[[dict], None] | None = None
+
+    def set_message_handler(self, message_handler : typing.Callable[[dict], None]) -> None:
+        """Set the function that delivers published messages to this process' room members"""
+        self._message_handler = message_handler
+
+    def add_member(self, conversation_id : int, user_id : int, sid : str) -> None:
+        self.rooms.add(conversation_id, user_id, sid)
+
+    def remove_member(self, sid : str) -> list[int]:
+        return self.rooms.remove_sid(sid)
+
+    @abc.abstractmethod
+    def publish(self, message : dict) -> None:
+        """Hand a message to the message handler of every process using this backend
+
+        Args:
+            message (dict): A JSON-serializable message
+        """
+
+    def _handle_message(self, message : dict) -> None:
+        if not self._message_handler:
+            return
+
+        try:
+            self._message_handler(message)
+        except Exception:
+            app.logger.exception(f"Failed delivering published message {json.dumps(message)}")
+
+
+class InMemoryRoomBackend(RoomBackend):
+    """Room backend for a single Bitter process. Published messages are delivered right away"""
+
+    def publish(self, message : dict) -> None:
+        self._handle_message(message)
+
+
+class UnixSocketRoomBackend(RoomBackend):
+    """Room backend for several Bitter processes on the same machine. Every process binds a Unix datagram socket in
+    bus_dir, and a published message is sent to every socket in bus_dir, including the publishing process' own. The
+    socket is bound on first use and removed when the process exits. Sockets left behind by processes that died are
+    removed once sending to them fails.
+
+    Delivery is at most once. A process whose receive buffer stays full through every publish attempt doesn't get the
+    message, and its clients only see it once they fetch the message history again.
+    """
+
+    def __init__(self, bus_dir : str | Path) -> None:
+        super().__init__()
+
+        self.bus_dir = Path(bus_dir)
+
+        self._socket : socket.socket | None = None
+        self._send_socket : socket.socket | None = None
+        self._socket_path : Path | None = None
+        self._lock = threading.Lock()
+
+        # peers that dropped a message. they're sent to without waiting until they accept a message again, so that a
+        # process that stopped reading doesn't slow down every publish
+        self._congested_peers : set[str] = set()
+
+    def add_member(self, conversation_id : int, user_id : int, sid : str) -> None:
+        # a process only needs to receive messages once it has room members
+        self._ensure_started()
+        super().add_member(conversation_id, user_id, sid)
+
+    def publish(self, message : dict) -> None:
+        self._ensure_started()
+        payload = json.dumps(message).encode()
+
+        for peer_path in self.bus_dir.glob("*.sock"):
+            self._send(payload, peer_path)
+
+    def close(self) -> None:
+        """Stop receiving published messages and remove this process' socket from bus_dir"""
+        with self._lock:
+            if not self._socket:
+                return
+
+            self._socket.close()
+            self._send_socket.close()
+            self._socket_path.unlink(missing_ok = True)
+            self._socket = None
+            self._send_socket = None
+
+    def _send(self, payload : bytes, peer_path : Path) -> None:
+        congested = peer_path.name in self._congested_peers
+        attempts = 1 if congested else SOCKET_BUS_CONFIG["publish_attempts"]
+
+        for _ in range(attempts):
+            try:
+                self._send_socket.sendto(payload, socket.MSG_DONTWAIT if congested else 0, str(peer_path))
+                self._congested_peers.discard(peer_path.name)
+                return
+
+            except (ConnectionRefusedError, FileNotFoundError):
+                # the process that bound this socket has exited
+                peer_path.unlink(missing_ok = True)
+                self._congested_peers.discard(peer_path.name)
+                return
+
+            except BlockingIOError:
+                # the send timed out waiting for room in the peer's receive buffer
+                continue
+
+        self._congested_peers.add(peer_path.name)
+        app.logger.warning(f"Dropped a published message to '{peer_path.name}', its receive buffer stayed full")
+
+    def _ensure_started(self) -> None:
+        if self._socket:
+            return
+
+        with self._lock:
+            # another thread may have bound the socket while this one waited for the lock
+            if self._socket:
+                return
+
+            self.bus_dir.mkdir(mode = 0o700, parents = True, exist_ok = True)
+
+            socket_path = self.bus_dir / f"{os.getpid()}.sock"
+            socket_path.unlink(missing_ok = True)
+
+            bus_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            bus_socket.bind(str(socket_path))
+
+            # messages are sent from a separate socket, whose sends block until the peer has room in its receive buffer
+            # for at most publish_timeout_seconds. the timeout is set on the socket itself, since a Python socket
+            # timeout would poll the sending socket, which is always writable, instead of waiting for the peer
+            send_timeout = SOCKET_BUS_CONFIG["publish_timeout_seconds"]
+            send_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            send_socket.setsockopt(
+                socket.SOL_SOCKET,
+                socket.SO_SNDTIMEO,
+                struct.pack("ll", int(send_timeout), int(send_timeout % 1 * 1_000_000))
+            )
+
+            self._socket = bus_socket
+            self._send_socket = send_socket
+            self._socket_path = socket_path
+
+            threading.Thread(target = self._receive, args = (bus_socket,), name = "socket-bus-receiver", daemon = True).start()
+
+        atexit.register(self.close)
+        app.logger.info(f"Joined socket room bus at '{socket_path}'")
+
+    def _receive(self, bus_socket : socket.socket) -> None:
+        while True:
+            try:
+                payload = bus_socket.recv(MAX_DATAGRAM_SIZE)
+            except OSError:
+                # the socket was closed
+                return
+
+            # a malformed datagram, like one truncated at MAX_DATAGRAM_SIZE, mustn't stop this process from receiving
+            try:
+                self._handle_message(json.loads(payload))
+            except Exception:
+                app.logger.exception(f"Failed handling a {len(payload)} byte message from the socket room bus")
+
+
+def create_room_backend(backend_name : str, bus_dir : str | Path) -> RoomBackend:
+    """Create the socket room backend with the inputted name
+
+    Args:
+        backend_name (str): Either "memory" or "unix"
+        bus_dir (str | Path): The directory the "unix" backend binds its sockets in
+
+    Returns:
+        RoomBackend: The room backend
+    """
+    match backend_name:
+        case "memory": return InMemoryRoomBackend()
+        case "unix": return UnixSocketRoomBackend(bus_dir)
+        case _: raise ValueError(f"Unknown socket room backend '{backend_name}', expected 'memory' or 'unix'")
@@ -0,0 +1,99 @@
+import threading
+
+class RoomMember:
+    """A socket session that is registered to a socket room"""
+
+    __slots__ = ("user_id", "sid")
+
+    def __init__(self, user_id : int, sid : str) -> None:
+        self.user_id = user_id
+        self.sid = sid
+
+    def __eq__(self, other : object) -> bool:
+        return isinstance(other, RoomMember) and (self.user_id, self.sid) == (other.user_id, other.sid)
+
+    def __hash__(self) -> int:
+        return hash((self.user_id, self.sid))
+
+    def __repr__(self) -> str:
+        return f"RoomMember(user_id={self.user_id!r}, sid={self.sid!r})"
+
+
+class SocketRoomRegistry:
+    """Thread-safe registry of which socket sessions are in which conversation's socket room. Besides the members of
+    each room, the registry keeps the rooms of each socket session, so that a disconnecting socket is removed from its
+    rooms without scanning every room. Adding and removing members is idempotent.
+    """
+
+    def __init__(self) -> None:
+        self._rooms : dict[int, set[RoomMember]] = {}
+        # ^ {conversation_id: {RoomMember, }}
+        self._sid_rooms : dict[str, dict[int, RoomMember]] = {}
+        # ^ {sid: {conversation_id: RoomMember}}
+        self._lock = threading.Lock()
+
+    def add(self, conversation_id : int, user_id : int, sid : str) -> None:
+        """Add a socket session to the room of the inputted conversation id. Adding a session that is already in the
+        room does nothing
+
+        Args:
+            conversation_id (int): The conversation id of the room
+            user_id (int): The user the socket session belongs to
+            sid (str): The socket session id
+        """
+        member = RoomMember(user_id, sid)
+
+        with self._lock:
+            self._rooms.setdefault(conversation_id, set()).add(member)
+            self._sid_rooms.setdefault(sid, {})[conversation_id] = member
+
+    def remove_sid(self, sid : str) -> list[int]:
+        """Remove a socket session from every room it's in
+
+        Args:
+            sid (str): The socket session id
+
+        Returns:
+            list[int]: The conversation ids of the rooms the session was removed from
+        """
+        with self._lock:
+            sid_rooms = self._sid_rooms.pop(sid, {})
+
+            for conversation_id, member in sid_rooms.items():
+                self._discard_member(conversation_id, member)
+
+        return list(sid_rooms)
+
+    def members(self, conversation_id : int) -> tuple[RoomMember, ...]:
+        """Return a snapshot of the members of the room of the inputted conversation id
+
+        Args:
+            conversation_id (int): The conversation id of the room
+
+        Returns:
+            tuple[RoomMember, ...]: The room's members
+        """
+        with self._lock:
+            return tuple(self._rooms.get(conversation_id, ()))
+
+    def user_ids(self, conversation_id : int) -> set[int]:
+        """Return the ids of the users that have at least one socket session in the room of the inputted conversation id
+
+        Args:
+            conversation_id (int): The conversation id of the room
+
+        Returns:
+            set[int]: The user ids
+        """
+        with self._lock:
+            return {member.user_id for member in self._rooms.get(conversation_id, ())}
+
+    def _discard_member(self, conversation_id : int, member : RoomMember) -> None:
+        # delete the room once its last member is removed
+        room = self._rooms.get(conversation_id)
+        if room is None:
+            return
+
+        room.discard(member)
+        if not room:
+            del self._rooms[conversation_id]
@@ -1,39 +1,37 @@
-from .. import socket_rooms, socketio
+from .. import socket_room_backend, socketio
+from .socket_rooms import RoomMember
 from flask import request
+from flask_socketio import join_room
 
-def add_room_member(conversation_id : int, user_id : str, sid : str) -> None:
-    """Adds a socket session-id to the room with the given conversation id
+def get_user_room_name(conversation_id : int, user_id : int) -> str:
+    """Return the name of the Socket.IO room that holds one user's socket sessions in a conversation's socket-room. Each
+    conversation has one such room per user, so that a message is emitted once per user instead of once per socket
+    """
+    return f"conversation-{conversation_id}-user-{user_id}"
+
+def add_room_member(conversation_id : int, user_id : int, sid : str) -> None:
+    """Adds a socket session-id to the room with the given conversation id. Registering the same socket session to the
+    same room again does nothing
 
     Args:
         conversation_id (int): The conversation id of the room to add a new member to
-        user_id (str): user id
+        user_id (int): user id
         sid (str): socket session-id
     """
-    if not conversation_id in socket_rooms:
-        socket_rooms[conversation_id] = []
-    
-    socket_rooms[conversation_id].append({
-        "user_id": user_id,
-        "sid": sid
-    })
-
-def get_room_members(conversation_id) -> list:
-    return socket_rooms.get(conversation_id, [])
-
-def remove_room_member(sid) -> None:
-    # go through each room and remove the member with the current sid once found. also delete the socket room if there
-    # are no members left after removing the member with the current sid
-    for conversation_id, room in socket_rooms.items():
-        for member in room:
-            if member["sid"] == sid:
-                # remove the member with the current sid
-                room.remove(member)
-
-                # delete the room if it is now empty
-                if not len(socket_rooms[conversation_id]):
-                    socket_rooms.pop(conversation_id)
-                
-                return
+    socket_room_backend.add_member(conversation_id, user_id, sid)
+    join_room(get_user_room_name(conversation_id, user_id), sid = sid)
+
+def get_room_members(conversation_id : int) -> tuple[RoomMember, ...]:
+    return socket_room_backend.rooms.members(conversation_id)
+
+def is_user_in_room(conversation_id : int, user_id : int) -> bool:
+    """Return whether the inputted user has a socket session in the conversation's socket-room on this process"""
+    return user_id in socket_room_backend.rooms.user_ids(conversation_id)
+
+def remove_room_member(sid : str) -> None:
+    # remove the member with the current sid from every room it's in. rooms without members left are deleted. Socket.IO
+    # removes a disconnected socket from its own rooms
+    socket_room_backend.remove_member(sid)
 
 
 def emit_error_response(message : str) -> None:
@@ -43,36 +41,44 @@ def emit_error_response(message : str) -> None:
         to = request.sid
     )
 
-def broadcast_message_to_room(message : str) -> bool:
-    """Sent a message to every member of a socket-room. Return a bool whether the
+def publish_message(message : dict) -> None:
+    """Publish a new message to every Bitter process, each of which sends it to the members of the message's socket-room
+    that are connected to it
+
+    Args:
+        message (dict): The message
+    """
+    socket_room_backend.publish(message)
+
+def broadcast_message_to_room(message : dict) -> bool:
+    """Sent a message to every member of a socket-room that is connected to this process. Return a bool whether the
     message recipient received the message
 
     Args:
-        message (str): The message
+        message (dict): The message
 
     Returns:
         bool: Did the message recipient see the message?
     """
     recipient_saw_message = False
 
-    # send the new message to each member of this conversation's socket_room
+    # send the new message to each user that has a socket session in this conversation's socket_room. every session of
+    # a user is in that user's Socket.IO room, so each variant of the message is emitted and serialized once
     conversation_id = message["conversation_id"]
-    for room_member in get_room_members(conversation_id):
-        unique_message = message.copy()
-        
+    for user_id in socket_room_backend.rooms.user_ids(conversation_id):
         # note that the message recipient saw the message if the message is being sent to them
-        if unique_message["author_id"] != room_member["user_id"]:
+        from_current_user = message["author_id"] == user_id
+        if not from_current_user:
             recipient_saw_message = True
 
         # add whether the message originated from the user the message is being sent to
-        from_current_user = unique_message["author_id"] == room_member["user_id"]
-        unique_message["origin"] = "sent" if from_current_user else "received"
+        unique_message = {**message, "origin": "sent" if from_current_user else "received"}
 
         # send the new message
         socketio.emit(
             "new_message_created",
             unique_message,
-            to = room_member["sid"]
+            to = get_user_room_name(conversation_id, user_id)
         )
     
     return recipient_saw_message
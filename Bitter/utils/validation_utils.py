@@ -0,0 +1,224 @@
+from ..config import (
+    FORM_CONFIG,
+    FORM_FIELD_REGEX_PATTERNS,
+    FORM_FIELD_LENGTH_LIMITS,
+    FORM_VALIDATOR_ERROR_MESSAGES
+)
+from flask import request
+from flask_wtf import FlaskForm
+from wtforms.validators import InputRequired, Length, Regexp, ValidationError, StopValidation
+from werkzeug.datastructures import CombinedMultiDict, ImmutableMultiDict, MultiDict
+import re, typing
+
+# the request methods that submit a form, like FlaskForm.is_submitted()
+SUBMIT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+class ParsedField:
+    """The raw and filtered data of one form field, and its validation errors. Has the same attributes as a WTForms
+    field after validation.
+    """
+    __slots__ = ("raw_data", "data", "errors")
+
+    def __init__(self, raw_data : list | None, data : typing.Any) -> None:
+        self.raw_data = raw_data
+        self.data = data
+        self.errors : list[str] = []
+
+
+class ParsedForm:
+    """Form data parsed by a FormSchema. Each field is an attribute holding a ParsedField, so routes read the parsed
+    values like they would from a FlaskForm, i.e. form.username.data
+    """
+
+    def __init__(self, fields : dict[str, ParsedField]) -> None:
+        self._fields = fields
+        self.__dict__.update(fields)
+
+    @property
+    def errors(self) -> dict[str, list[str]]:
+        """The errors of every invalid field by field name, like FlaskForm.errors"""
+        return {name: field.errors for name, field in self._fields.items() if field.errors}
+
+
+class FieldValidator:
+    """The validation of one FORM_CONFIG value, compiled once. The error messages are formatted, the regex compiled and
+    the length limits looked up when the validator is created, instead of on every validation.
+
+    check() validates a single value like check_user_input_validity always has, returning the first error. validate()
+    validates a submitted form field like its WTForms validators would, running every validator in FORM_CONFIG order
+    and collecting their errors.
+    """
+
+    def __init__(self, value_key : str) -> None:
+        value_config = FORM_CONFIG[value_key]
+
+        self.value_key = value_key
+        self.field_name = value_config["field_name"]
+        self.filters = tuple(value_config["filters"])
+        self.default = value_config["default"]
+
+        self.required_message = FORM_VALIDATOR_ERROR_MESSAGES["required"].format(field_name = self.field_name)
+
+        # values without a regex or length limits, like uploaded files, skip those checks
+        regex_pattern = FORM_FIELD_REGEX_PATTERNS.get(value_key)
+        self.regex = re.compile(regex_pattern["regex"]) if regex_pattern else None
+        self.regex_message = regex_pattern["message"].format(field_name = self.field_name) if regex_pattern else None
+
+        length_limits = FORM_FIELD_LENGTH_LIMITS.get(value_key)
+        self.min_length = length_limits["min"] if length_limits else None
+        self.max_length = length_limits["max"] if length_limits else None
+        self.length_message = (
+            (FORM_VALIDATOR_ERROR_MESSAGES["length"] % length_limits).format(field_name = self.field_name)
+            if length_limits else None
+        )
+
+        # the checks validate() runs, in the order of the WTForms validators. validators that aren't compiled, like
+        # Email, are called as they are
+        self._validation_chain : list[typing.Callable[[ParsedField], None]] = []
+
+        for validator in value_config["validators"]:
+            if isinstance(validator, InputRequired):
+                self._validation_chain.append(self._validate_required)
+            elif isinstance(validator, Length):
+                self._validation_chain.append(self._validate_length)
+            elif isinstance(validator, Regexp):
+                self._validation_chain.append(self._validate_regex)
+            else:
+                self._validation_chain.append(lambda field, validator = validator: validator(None, field))
+
+    def check(self, user_input : str | None) -> tuple[str | None, str | None]:
+        """Validate a single inputted value. Missing values, values that don't match the regex and values of the wrong
+        length are rejected, in that order.
+
+        Args:
+            user_input (str | None): The value to validate
+
+        Returns:
+            tuple[str | None, str | None]: The filtered value and the error message, which is None if the value is valid
+        """
+        # if the user input is missing or an empty string
+        if not user_input:
+            return (user_input, self.required_message)
+
+        # apply the filters defined in config
+        for func in self.filters:
+            user_input = func(user_input)
+
+        if self.regex and not self.regex.match(user_input):
+            return (user_input, self.regex_message)
+
+        if self.min_length is not None and not self.min_length <= len(user_input) <= self.max_length:
+            return (user_input, self.length_message)
+
+        return (user_input, None)
+
+    def validate(self, raw_data : list | None) -> ParsedField:
+        """Validate a submitted form field with the same semantics as the field's WTForms validators. The filters
+        are applied first, a missing value stops the validation, and the errors of the other validators are collected.
+
+        Args:
+            raw_data (list | None): The submitted values of the field, or None if no form data was submitted
+
+        Returns:
+            ParsedField: The filtered field data and its errors
+        """
+        field = ParsedField(raw_data, raw_data[0] if raw_data else self.default)
+
+        try:
+            for func in self.filters:
+                field.data = func(field.data)
+        except ValueError as error:
+            field.errors.append(error.args[0])
+
+        for validate_func in self._validation_chain:
+            try:
+                validate_func(field)
+            except StopValidation as error:
+                if error.args and error.args[0]:
+                    field.errors.append(error.args[0])
+                break
+            except ValidationError as error:
+                field.errors.append(error.args[0])
+
+        return field
+
+    def _validate_required(self, field : ParsedField) -> None:
+        # like InputRequired, a missing value replaces any other errors
+        if field.raw_data and field.raw_data[0]:
+            return
+
+        field.errors.clear()
+        raise StopValidation(self.required_message)
+
+    def _validate_length(self, field : ParsedField) -> None:
+        length = field.data and len(field.data) or 0
+        if not self.min_length <= length <= self.max_length:
+            raise ValidationError(self.length_message)
+
+    def _validate_regex(self, field : ParsedField) -> None:
+        if not self.regex.match(field.data or ""):
+            raise ValidationError(self.regex_message)
+
+
+# every FORM_CONFIG value's validator, compiled at import
+FIELD_VALIDATORS = {value_key: FieldValidator(value_key) for value_key in FORM_CONFIG}
+
+class FormSchema:
+    """The fields of a FlaskForm type and their compiled validators. parse_request() validates the submitted form
+    data with the same error messages as validating a FlaskForm instance, without constructing the form's fields.
+
+    Only the fields built by construct_input_field are parsed, since the others, like submit buttons, are never read.
+    CSRF tokens are left to CSRFProtect, which validates them before the route is called.
+    """
+
+    def __init__(self, form_type : type[FlaskForm]) -> None:
+        self.form_type = form_type
+
+        # the form's fields in declaration order, like FlaskForm orders them
+        unbound_fields = [
+            (name, getattr(form_type, name)) for name in dir(form_type)
+            if not name.startswith("_") and hasattr(getattr(form_type, name), "_formfield")
+        ]
+        unbound_fields.sort(key = lambda unbound_field: (unbound_field[1].creation_counter, unbound_field[0]))
+
+        self.field_validators = {
+            name: FIELD_VALIDATORS[unbound_field.value_key]
+            for name, unbound_field in unbound_fields
+            if hasattr(unbound_field, "value_key")
+        }
+
+    def parse_request(self) -> ParsedForm | None:
+        """Parse and validate the form data of the current request
+
+        Returns:
+            ParsedForm | None: The parsed form, or None if the request didn't submit a form
+        """
+        if request.method not in SUBMIT_METHODS:
+            return None
+
+        formdata = get_request_formdata()
+
+        return ParsedForm({
+            name: field_validator.validate(
+                None if formdata is None else formdata.getlist(name)
+            )
+            for name, field_validator in self.field_validators.items()
+        })
+
+
+def get_request_formdata() -> MultiDict | None:
+    """Return the submitted form data of the current request, read from the same places FlaskForm reads it from
+
+    Returns:
+        MultiDict | None: The uploaded files and form values, or None if the request has no form data
+    """
+    if request.files:
+        return CombinedMultiDict((request.files, request.form))
+
+    elif request.form:
+        return request.form
+
+    elif request.is_json:
+        return ImmutableMultiDict(request.get_json())
+
+    return None
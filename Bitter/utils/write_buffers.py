@@ -0,0 +1,160 @@
+from .. import app
+import threading, atexit, typing, abc
+
+class WriteBuffer(abc.ABC):
+    """Base class for in-process buffers that coalesce many small writes and hand them to a write function in batches.
+    A background thread flushes the buffer every flush_interval seconds, or as soon as flush_threshold distinct keys
+    are pending. The thread is started on first use, so that it is started in the process that actually serves
+    requests, and the buffer is drained when the interpreter exits.
+
+    Subclasses decide how pending writes are stored and merged by implementing _empty, _merge and _restore.
+    """
+
+    def __init__(self,
+                 name : str,
+                 write_func : typing.Callable[[typing.Any], None],
+                 flush_interval : float,
+                 flush_threshold : int) -> None:
+        self.name = name
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._write_func = write_func
+        self._pending = self._empty()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread : threading.Thread | None = None
+
+    def add(self, keys : typing.Iterable) -> None:
+        """Buffer a write for each of the inputted keys
+
+        Args:
+            keys (typing.Iterable): The keys to buffer a write for
+        """
+        with self._lock:
+            self._merge(self._pending, keys)
+            threshold_reached = len(self._pending) >= self.flush_threshold
+
+        self._ensure_started()
+
+        # wake the flusher thread up early instead of waiting for the next interval
+        if threshold_reached:
+            self._wake_event.set()
+
+    def flush(self) -> None:
+        """Write everything that is currently pending. Writes that fail are put back into the buffer so that they are
+        retried on the next flush.
+        """
+        # only one flush at a time, so that a failed batch can't be restored after a newer flush already went through
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, self._empty()
+
+            if not pending:
+                return
+
+            try:
+                self._write_func(pending)
+            except Exception:
+                app.logger.exception(f"Failed flushing write buffer '{self.name}', retrying on next flush")
+
+                with self._lock:
+                    self._restore(self._pending, pending)
+
+    def close(self) -> None:
+        """Stop the flusher thread and write everything that is still pending"""
+        self._stop_event.set()
+        self._wake_event.set()
+
+        if self._thread:
+            self._thread.join()
+
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._thread or self._stop_event.is_set():
+            return
+
+        with self._lock:
+            # another thread may have started the flusher while this one waited for the lock
+            if self._thread:
+                return
+
+            self._thread = threading.Thread(target = self._run, name = f"{self.name}-flusher", daemon = True)
+            self._thread.start()
+
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            self.flush()
+
+    @abc.abstractmethod
+    def _empty(self) -> typing.Any:
+        """Return an empty collection of pending writes"""
+
+    @abc.abstractmethod
+    def _merge(self, pending : typing.Any, keys : typing.Iterable) -> None:
+        """Add a write for each of the inputted keys to the pending writes"""
+
+    @abc.abstractmethod
+    def _restore(self, pending : typing.Any, failed : typing.Any) -> None:
+        """Put the writes of a failed flush back into the pending writes"""
+
+
+class CountingWriteBuffer(WriteBuffer):
+    """Write buffer that counts how many times each key was added. The write function receives a dict of
+    {key: count}."""
+
+    def pending_count(self, key : typing.Hashable) -> int:
+        """Return how many writes for the inputted key haven't been flushed yet
+
+        Args:
+            key (typing.Hashable): The key to look up
+
+        Returns:
+            int: Number of pending writes for the key
+        """
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def _empty(self) -> dict:
+        return {}
+
+    def _merge(self, pending : dict, keys : typing.Iterable) -> None:
+        for key in keys:
+            pending[key] = pending.get(key, 0) + 1
+
+    def _restore(self, pending : dict, failed : dict) -> None:
+        for key, count in failed.items():
+            pending[key] = pending.get(key, 0) + count
+
+
+class SetWriteBuffer(WriteBuffer):
+    """Write buffer that only records whether each key was added, so that repeated writes for the same key are written
+    once. The write function receives a set of keys."""
+
+    def is_pending(self, key : typing.Hashable) -> bool:
+        """Return whether a write for the inputted key hasn't been flushed yet
+
+        Args:
+            key (typing.Hashable): The key to look up
+
+        Returns:
+            bool: Whether a write for the key is pending
+        """
+        with self._lock:
+            return key in self._pending
+
+    def _empty(self) -> set:
+        return set()
+
+    def _merge(self, pending : set, keys : typing.Iterable) -> None:
+        pending.update(keys)
+
+    def _restore(self, pending : set, failed : set) -> None:
+        pending.update(failed)
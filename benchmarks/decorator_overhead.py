@@ -0,0 +1,68 @@
+"""Measure the per-call overhead of the decorators that wrap every API route and socket handler, without a server or
+database. Reports the nanoseconds per call of each decorator stack as JSON, next to the undecorated function.
+
+"use_only_expected_kwargs (per-call introspection)" is the implementation that called getfullargspec on every call,
+kept here for comparison with the current one.
+
+    python benchmarks/decorator_overhead.py --calls 200000
+"""
+from pathlib import Path
+from functools import wraps
+from inspect import getfullargspec
+import argparse, timeit, typing, json, sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Bitter import app
+from Bitter.utils.misc_utils import login_required, use_only_expected_kwargs, append_access_token_to_response
+from flask import Response
+
+def use_only_expected_kwargs_per_call(func) -> typing.Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs) -> typing.Any:
+        expected_args = getfullargspec(func).args
+        kwargs = {key:val for key,val in kwargs.items() if key in expected_args}
+
+        return func(*args, **kwargs)
+
+    return wrapper
+
+def route(current_user : dict) -> int:
+    return current_user["user_id"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Measure the per-call overhead of Bitter's route decorators")
+    parser.add_argument("--calls", type = int, default = 100_000)
+    args = parser.parse_args()
+
+    # decorator stacks, called like login_required calls the function below it
+    stacks = {
+        "undecorated": lambda: route(current_user = {"user_id": 1}),
+        "use_only_expected_kwargs (per-call introspection)": (
+            lambda wrapped = use_only_expected_kwargs_per_call(route):
+                wrapped(current_user = {"user_id": 1}, db_conn = None, db_cursor = None)
+        ),
+        "use_only_expected_kwargs": (
+            lambda wrapped = use_only_expected_kwargs(route):
+                wrapped(current_user = {"user_id": 1}, db_conn = None, db_cursor = None)
+        ),
+        "login_required + use_only_expected_kwargs": login_required(use_only_expected_kwargs(route))
+    }
+
+    # a request carrying a valid access token, so that login_required succeeds
+    token_response = Response()
+    with app.app_context():
+        append_access_token_to_response(1, False, token_response)
+
+    access_token = token_response.headers["Set-Cookie"].split(";")[0]
+
+    results = {}
+    with app.test_request_context("/api/fetch-posts", headers = {"Cookie": access_token}):
+        for name, stack in stacks.items():
+            seconds = min(timeit.repeat(stack, number = args.calls, repeat = 5))
+            results[name] = {"ns_per_call": round(seconds / args.calls * 1e9, 1)}
+
+    print(json.dumps(results, indent = 4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Measure the per-request cost of validating the API forms, without a server or database. Reports the microseconds per
+validation of constructing and validating each FlaskForm, next to parsing the same form data with its compiled
+FormSchema, as JSON.
+
+    python benchmarks/form_validation.py --calls 5000
+"""
+from pathlib import Path
+import argparse, timeit, json, sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Bitter import app, forms
+from Bitter.utils.validation_utils import FormSchema
+
+# valid form data of each benchmarked form
+FORM_DATA = {
+    forms.LoginForm: {"username": "bench1", "password": "benchpass"},
+    forms.SignupForm: {"display_name": "Bench 1", "username": "bench1", "email": "bench1@example.com",
+                       "password": "benchpass"},
+    forms.PostCreationForm: {"post_body": "benchmark post"},
+    forms.LikePostForm: {"post_id": "1"}
+}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Measure the cost of validating Bitter's API forms")
+    parser.add_argument("--calls", type = int, default = 5_000)
+    args = parser.parse_args()
+
+    results = {}
+
+    for form_type, form_data in FORM_DATA.items():
+        form_schema = FormSchema(form_type)
+
+        with app.test_request_context("/", method = "POST", data = form_data):
+            flask_form_seconds = min(timeit.repeat(
+                lambda: form_type().validate_on_submit(), number = args.calls, repeat = 5
+            ))
+            form_schema_seconds = min(timeit.repeat(form_schema.parse_request, number = args.calls, repeat = 5))
+
+        results[form_type.__name__] = {
+            "flask_form_us_per_call": round(flask_form_seconds / args.calls * 1e6, 1),
+            "form_schema_us_per_call": round(form_schema_seconds / args.calls * 1e6, 1)
+        }
+
+    print(json.dumps(results, indent = 4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Drive the hot HTTP routes and socket chat events of a running Bitter server at a fixed concurrency, and report the
+throughput and latency percentiles of each as JSON. Scenarios run one after another, each for --duration seconds, so
+that their numbers don't affect each other.
+
+The workers log in as the users created by seed_dataset.py, so seed the database first and start the server with the
+same dataset. Worker i logs in as "bench<i % --users + 1>".
+
+    python benchmarks/load_test.py --base-url http://127.0.0.1:5000 --concurrency 32 --duration 30
+"""
+from urllib.parse import urlsplit, urlencode
+from http.client import HTTPConnection, HTTPSConnection
+from http.cookies import SimpleCookie
+import simple_websocket
+import argparse, threading, random, typing, json, time
+
+SCENARIOS = [
+    "fetch-posts",
+    "fetch-replies",
+    "fetch-conversations",
+    "like-post",
+    "create-post",
+    "chat-send-message",
+    "chat-message-history"
+]
+
+class HTTPClient:
+    """Keep-alive HTTP client for one worker, logged in as one user"""
+
+    def __init__(self, base_url : str) -> None:
+        url = urlsplit(base_url)
+        connection_type = HTTPSConnection if url.scheme == "https" else HTTPConnection
+
+        self.connection = connection_type(url.netloc, timeout = 30)
+        self.access_token : str | None = None
+
+    def request(self, method : str, path : str, params : dict | None = None) -> tuple[int, bytes, typing.Any]:
+        headers = {}
+        body = None
+
+        if self.access_token:
+            headers["Cookie"] = f"access_token={self.access_token}"
+
+        # GET parameters go in the url, other parameters are sent as a form
+        if params and method == "GET":
+            path = f"{path}?{urlencode(params)}"
+        elif params:
+            body = urlencode(params)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        self.connection.request(method, path, body = body, headers = headers)
+        response = self.connection.getresponse()
+        response_body = response.read()
+
+        return response.status, response_body, response
+
+    def login(self, username : str, password : str) -> None:
+        status, body, response = self.request("POST", "/api/login", {"username": username, "password": password})
+        if status != 200:
+            raise RuntimeError(f"Failed logging in as '{username}': [{status}] {body.decode(errors = 'replace')}")
+
+        cookie = SimpleCookie(response.getheader("Set-Cookie"))
+        self.access_token = cookie["access_token"].value
+
+
+class ChatClient:
+    """Minimal Socket.IO client over a websocket, enough to emit events and wait for the server's events"""
+
+    def __init__(self, base_url : str, access_token : str) -> None:
+        url = urlsplit(base_url)
+        websocket_scheme = "wss" if url.scheme == "https" else "ws"
+
+        self.websocket = simple_websocket.Client.connect(
+            f"{websocket_scheme}://{url.netloc}/socket.io/?EIO=4&transport=websocket",
+            headers = {"Cookie": f"access_token={access_token}"}
+        )
+
+        # Engine.IO open packet, then connect to the default Socket.IO namespace
+        self._receive_packet()
+        self.websocket.send("40")
+        while not self._receive_packet().startswith("40"):
+            pass
+
+    def emit(self, event : str, *args) -> None:
+        self.websocket.send("42" + json.dumps([event, *args]))
+
+    def wait_for(self, event : str, matches : typing.Callable[[list], bool] = lambda _args: True) -> list:
+        """Wait for the inputted event and return its arguments. Other events are skipped
+
+        Raises:
+            RuntimeError: If the server emits an error_response event
+        """
+        while True:
+            packet = self._receive_packet()
+            if not packet.startswith("42"):
+                continue
+
+            event_name, *args = json.loads(packet[2:])
+            if event_name == "error_response":
+                raise RuntimeError(f"Socket error response: {args}")
+
+            if event_name == event and matches(args):
+                return args
+
+    def close(self) -> None:
+        self.websocket.close()
+
+    def _receive_packet(self) -> str:
+        while True:
+            packet = self.websocket.receive(timeout = 30)
+            if packet is None:
+                raise TimeoutError("Timed out waiting for a socket packet")
+
+            # answer Engine.IO pings, so the server keeps the connection open
+            if packet == "2":
+                self.websocket.send("3")
+                continue
+
+            return packet
+
+
+class ScenarioResult:
+    """Latencies and response statuses of one scenario, shared by its workers"""
+
+    def __init__(self) -> None:
+        self.latencies : list[float] = []
+        self.status_counts : dict[str, int] = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency : float, status : str, is_error : bool) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.errors += is_error
+
+    def summary(self, duration : float) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction : float) -> float:
+            # nearest-rank percentile, in milliseconds
+            if not latencies:
+                return 0.0
+
+            rank = max(0, min(len(latencies) - 1, round(fraction * len(latencies)) - 1))
+            return round(latencies[rank] * 1000, 2)
+
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "status_counts": self.status_counts,
+            "throughput_per_second": round(len(latencies) / duration, 1),
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0
+            }
+        }
+
+
+def run_http_worker(scenario : str, client : HTTPClient, args : argparse.Namespace, result : ScenarioResult,
+                    deadline : float) -> None:
+    rng = random.Random()
+    next_cursor = None
+    pages_followed = 0
+
+    while time.monotonic() < deadline:
+        # each scenario is one request. fetch-posts follows the next cursor for a few pages like a scrolling user
+        match scenario:
+            case "fetch-posts":
+                params = {"cursor": next_cursor} if next_cursor else {}
+                request_args = ("GET", "/api/fetch-posts", params)
+            case "fetch-replies":
+                request_args = ("GET", "/api/fetch-replies", {"post_id": rng.randint(1, args.posts)})
+            case "fetch-conversations":
+                request_args = ("GET", "/api/fetch-conversations", None)
+            case "like-post":
+                request_args = ("PUT", "/api/like-post", {"post_id": rng.randint(1, args.posts)})
+            case "create-post":
+                request_args = ("POST", "/api/create-post", {"post_body": f"benchmark post {rng.randint(0, 10 ** 9)}"})
+
+        started_at = time.monotonic()
+        try:
+            status, body, _ = client.request(*request_args)
+        except OSError:
+            # the connection is reopened by the next request
+            client.connection.close()
+            result.record(time.monotonic() - started_at, "connection_error", True)
+            continue
+
+        latency = time.monotonic() - started_at
+
+        # liking a post that is already liked is an expected conflict, not a failure
+        is_error = not (200 <= status < 300 or (scenario == "like-post" and status == 409))
+        result.record(latency, str(status), is_error)
+
+        if scenario == "fetch-posts" and status == 200:
+            pages_followed += 1
+            next_cursor = json.loads(body).get("next_cursor") if pages_followed < args.max_pages else None
+            if not next_cursor:
+                pages_followed = 0
+
+def run_chat_worker(scenario : str, client : HTTPClient, args : argparse.Namespace, result : ScenarioResult,
+                    deadline : float) -> None:
+    # chat with the first conversation partner of the worker's user
+    status, body, _ = client.request("GET", "/api/fetch-conversations", {"limit": 1})
+    conversations = json.loads(body).get("conversations", []) if status == 200 else []
+    if not conversations:
+        raise RuntimeError("The benchmark user has no conversations, seed more conversations than users")
+
+    recipient_username = conversations[0]["recipient_username"]
+
+    def connect() -> ChatClient:
+        chat_client = ChatClient(args.base_url, client.access_token)
+        chat_client.emit("register_for_realtime", recipient_username)
+        return chat_client
+
+    def disconnect(chat_client : ChatClient | None) -> None:
+        # the connection may already be broken, so closing it can fail too
+        if chat_client:
+            try:
+                chat_client.close()
+            except Exception:
+                pass
+
+    rng = random.Random()
+    chat_client = None
+
+    try:
+        while time.monotonic() < deadline:
+            started_at = time.monotonic()
+
+            try:
+                # the socket is reconnected by the next round trip after a timeout or a connection error
+                if not chat_client:
+                    chat_client = connect()
+
+                if scenario == "chat-send-message":
+                    # a sent message is emitted back to the sender once it's stored, which ends the round trip
+                    message_body = f"benchmark message {rng.randint(0, 10 ** 9)}"
+                    chat_client.emit("send_message", recipient_username, message_body)
+                    chat_client.wait_for(
+                        "new_message_created",
+                        lambda event_args: event_args[0]["body"] == message_body and event_args[0]["origin"] == "sent"
+                    )
+                else:
+                    chat_client.emit("request_message_history", recipient_username)
+                    chat_client.wait_for("send_message_history")
+
+                result.record(time.monotonic() - started_at, "ok", False)
+
+            # a late response to a timed out round trip would be taken for the next one's, so the socket is reconnected
+            # after a timeout too. TimeoutError is an OSError and ConnectionClosed is a RuntimeError, so both are caught
+            # before them
+            except TimeoutError:
+                result.record(time.monotonic() - started_at, "timeout", True)
+                disconnect(chat_client)
+                chat_client = None
+
+            except (simple_websocket.ConnectionClosed, OSError):
+                result.record(time.monotonic() - started_at, "connection_error", True)
+                disconnect(chat_client)
+                chat_client = None
+
+            except RuntimeError:
+                result.record(time.monotonic() - started_at, "error_response", True)
+
+    finally:
+        disconnect(chat_client)
+
+def run_scenario(scenario : str, clients : list[HTTPClient], args : argparse.Namespace) -> dict:
+    result = ScenarioResult()
+    worker_func = run_chat_worker if scenario.startswith("chat-") else run_http_worker
+
+    started_at = time.monotonic()
+    deadline = started_at + args.duration
+
+    workers = [
+        threading.Thread(target = worker_func, args = (scenario, client, args, result, deadline), daemon = True)
+        for client in clients
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    return result.summary(time.monotonic() - started_at)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Benchmark the hot routes and socket events of a Bitter server")
+    parser.add_argument("--base-url", default = "http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type = int, default = 16, help = "Number of concurrent workers")
+    parser.add_argument("--duration", type = float, default = 20, help = "Seconds to run each scenario for")
+    parser.add_argument("--users", type = int, default = 1000, help = "Number of seeded users to log in as")
+    parser.add_argument("--posts", type = int, default = 500_000, help = "Number of seeded posts to pick post ids from")
+    parser.add_argument("--password", default = "benchpass", help = "Password of the seeded users")
+    parser.add_argument("--max-pages", type = int, default = 5, help = "Timeline pages fetch-posts scrolls through")
+    parser.add_argument("--scenarios", nargs = "+", choices = SCENARIOS, default = SCENARIOS)
+    parser.add_argument("--output", help = "File to write the JSON report to, instead of stdout")
+    args = parser.parse_args()
+
+    # log every worker in before any scenario starts, so logging in isn't measured
+    clients = []
+    for worker_idx in range(args.concurrency):
+        client = HTTPClient(args.base_url)
+        client.login(f"bench{worker_idx % args.users + 1}", args.password)
+        clients.append(client)
+
+    report = {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "scenarios": {scenario: run_scenario(scenario, clients, args) for scenario in args.scenarios}
+    }
+
+    report_json = json.dumps(report, indent = 4)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(report_json + "\n")
+    else:
+        print(report_json)
+
+if __name__ == "__main__":
+    main()
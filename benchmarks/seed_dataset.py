@@ -0,0 +1,227 @@
+"""Fill the Bitter database with a large generated dataset for benchmarking. Every table is emptied first, and the
+generated rows are written to tab separated files and bulk loaded with LOAD DATA LOCAL INFILE. The denormalized counts
+and indexes, like like_count and message_idx, are computed while generating, so the dataset is consistent without
+running reconcile-counters or rebuild-content-indexes afterwards.
+
+Every seeded user is named "bench<user id>" and has the password given by --password. User u shares a conversation with
+users u + 1, u + 2 and so on, wrapping around, so every user has a conversation partner as long as --conversations is at
+least --users. The users table is emptied too, so the admin account is recreated when the server starts next.
+
+Run from the project root, with the same .env as the server:
+    python benchmarks/seed_dataset.py --users 1000000 --posts 2000000 --likes 10000000
+"""
+from werkzeug.security import generate_password_hash
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from array import array
+import mysql.connector
+import argparse, random, typing, json, time, sys, os, dotenv
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Bitter.config import PASSWORD_HASH_CONFIG
+
+BODY_WORDS = ["bitter", "post", "reply", "hello", "world", "benchmark", "data", "flask", "mariadb", "chat"]
+
+def make_counter_array(size : int) -> array:
+    # one zeroed int per id, indexed by id, so index 0 is unused
+    return array("i", bytes(4 * (size + 1)))
+
+def make_body(rng : random.Random) -> str:
+    return " ".join(rng.choices(BODY_WORDS, k = rng.randint(2, 12)))
+
+def write_rows(path : Path, rows : typing.Iterable[tuple]) -> None:
+    with path.open("w") as rows_file:
+        for row in rows:
+            rows_file.write("\t".join(str(value) for value in row) + "\n")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Seed the Bitter database with a large generated dataset")
+    parser.add_argument("--users", type = int, default = 100_000)
+    parser.add_argument("--posts", type = int, default = 500_000)
+    parser.add_argument("--replies", type = int, default = 1_000_000)
+    parser.add_argument("--likes", type = int, default = 2_000_000)
+    parser.add_argument("--conversations", type = int, default = 200_000)
+    parser.add_argument("--messages", type = int, default = 2_000_000)
+    parser.add_argument("--password", default = "benchpass", help = "Password of every seeded user")
+    parser.add_argument("--seed", type = int, default = 0, help = "Random seed, so that runs generate the same dataset")
+    args = parser.parse_args()
+
+    if args.users < 2 or args.posts < 1:
+        parser.error("At least 2 users and 1 post are needed")
+
+    # user u is paired with users u + 1 up to u + (users - 1) // 2. larger offsets would repeat a pair the other way
+    # around
+    if args.conversations > args.users * ((args.users - 1) // 2):
+        parser.error("More conversations than there are distinct pairs of users")
+
+    if args.messages and not args.conversations:
+        parser.error("Messages need at least 1 conversation")
+
+    if -(-args.likes // args.users) > args.posts:
+        parser.error("More likes per user than there are posts")
+
+    rng = random.Random(args.seed)
+    started_at = time.monotonic()
+
+    user_count, post_count = args.users, args.posts
+    date_start = int(time.time()) - 365 * 24 * 60 * 60
+
+    user_conversation_counts = make_counter_array(user_count)
+    post_like_counts = make_counter_array(post_count)
+    post_reply_counts = make_counter_array(post_count)
+
+    with TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+
+        # conversations pair user u with user u + offset, so that no pair is repeated. like create_conversation, the
+        # lower user id of each pair is stored as user_1_id. the conversation index relative to each user is the number
+        # of conversations the user had before it
+        conversation_user_1 = array("i", [0])
+        conversation_user_2 = array("i", [0])
+        conversation_idxs = []
+
+        for conversation_id in range(1, args.conversations + 1):
+            offset, user_idx = divmod(conversation_id - 1, user_count)
+            user_1_id, user_2_id = sorted((user_idx + 1, (user_idx + offset + 1) % user_count + 1))
+
+            conversation_user_1.append(user_1_id)
+            conversation_user_2.append(user_2_id)
+            conversation_idxs.append((user_conversation_counts[user_1_id], user_conversation_counts[user_2_id]))
+
+            user_conversation_counts[user_1_id] += 1
+            user_conversation_counts[user_2_id] += 1
+
+        # messages are spread randomly over the conversations. message indexes start at 1
+        conversation_message_counts = make_counter_array(args.conversations)
+
+        def generate_messages():
+            for message_id in range(1, args.messages + 1):
+                conversation_id = rng.randint(1, args.conversations)
+                author_id = rng.choice((conversation_user_1[conversation_id], conversation_user_2[conversation_id]))
+                conversation_message_counts[conversation_id] += 1
+
+                yield (message_id, author_id, make_body(rng), date_start + message_id, conversation_id, 1,
+                       conversation_message_counts[conversation_id])
+
+        write_rows(tmp_dir / "messages.tsv", generate_messages())
+
+        write_rows(tmp_dir / "conversations.tsv", (
+            (conversation_id, conversation_user_1[conversation_id], conversation_user_2[conversation_id],
+             date_start + conversation_id, *conversation_idxs[conversation_id - 1],
+             conversation_message_counts[conversation_id])
+            for conversation_id in range(1, args.conversations + 1)
+        ))
+
+        # replies are spread randomly over the posts. reply indexes start at 0
+        def generate_replies():
+            for reply_id in range(1, args.replies + 1):
+                parent_post_id = rng.randint(1, post_count)
+                reply_idx = post_reply_counts[parent_post_id]
+                post_reply_counts[parent_post_id] += 1
+
+                yield (reply_id, parent_post_id, rng.randint(1, user_count), date_start + reply_id, make_body(rng),
+                       reply_idx)
+
+        write_rows(tmp_dir / "replies.tsv", generate_replies())
+
+        # every user likes a distinct sample of posts, so no user likes a post twice
+        def generate_likes():
+            likes_per_user, extra_likes = divmod(args.likes, user_count)
+
+            for user_id in range(1, user_count + 1):
+                like_count = likes_per_user + (user_id <= extra_likes)
+
+                for like_idx, post_idx in enumerate(rng.sample(range(post_count), like_count)):
+                    post_id = post_idx + 1
+                    post_like_counts[post_id] += 1
+
+                    yield (post_id, user_id, date_start + like_idx)
+
+        write_rows(tmp_dir / "likes.tsv", generate_likes())
+
+        # the posts and users are written last, since their counts depend on the rows generated above
+        write_rows(tmp_dir / "posts.tsv", (
+            (post_id, rng.randint(1, user_count), date_start + post_id, make_body(rng), 0, 0,
+             post_like_counts[post_id], 0, post_reply_counts[post_id], post_id - 1)
+            for post_id in range(1, post_count + 1)
+        ))
+
+        # every user shares one password hash, since hashing millions of passwords would take hours. it's hashed like
+        # the server hashes passwords, so that logging in as a seeded user costs the same as logging in as a real one
+        password_hash = generate_password_hash(
+            args.password,
+            method = PASSWORD_HASH_CONFIG["method"],
+            salt_length = PASSWORD_HASH_CONFIG["salt_length"]
+        )
+
+        write_rows(tmp_dir / "users.tsv", (
+            (user_id, f"bench{user_id}", f"Bench {user_id}", f"bench{user_id}@example.com", password_hash, 0,
+             user_conversation_counts[user_id])
+            for user_id in range(1, user_count + 1)
+        ))
+
+        generated_at = time.monotonic()
+
+        # load the generated rows, replacing any existing data
+        table_columns = {
+            "users": "user_id, username, display_name, email, password, is_admin, conversation_count",
+            "posts": "post_id, author_id, date_created, body, contains_image, view_count, like_count, old_like_count, "
+                     "reply_count, post_idx",
+            "replies": "reply_id, parent_post_id, author_id, date_created, body, reply_idx",
+            "likes": "post_id, user_id, date_created",
+            "conversations": "conversation_id, user_1_id, user_2_id, date_created, user_1_conversation_idx, "
+                             "user_2_conversation_idx, message_count",
+            "messages": "message_id, author_id, body, date_created, conversation_id, seen, message_idx"
+        }
+
+        db_conn = mysql.connector.connect(
+            host = os.getenv("DB_HOST", "localhost"),
+            user = os.getenv("DB_USER", "root"),
+            password = os.getenv("DB_PASSWORD", ""),
+            database = "Bitter",
+            allow_local_infile = True
+        )
+        db_cursor = db_conn.cursor()
+
+        # the rows are consistent by construction, so the checks are skipped to speed up the load
+        db_cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        db_cursor.execute("SET UNIQUE_CHECKS = 0")
+
+        for table_name in reversed(list(table_columns)):
+            db_cursor.execute(f"TRUNCATE TABLE {table_name}")
+
+        for table_name, columns in table_columns.items():
+            db_cursor.execute(
+                f"LOAD DATA LOCAL INFILE '{(tmp_dir / f'{table_name}.tsv').as_posix()}' "
+                f"INTO TABLE {table_name} FIELDS TERMINATED BY '\\t' ({columns})"
+            )
+            db_conn.commit()
+
+        db_cursor.execute("UPDATE counters SET counter_value = %s WHERE counter_name = 'post_count'", (post_count,))
+        db_cursor.execute("SET UNIQUE_CHECKS = 1")
+        db_cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        db_conn.commit()
+
+        # refresh the index statistics, so the optimizer plans for the new table sizes
+        for table_name in table_columns:
+            db_cursor.execute(f"ANALYZE TABLE {table_name}")
+            db_cursor.fetchall()
+
+        db_cursor.close()
+        db_conn.close()
+
+    print(json.dumps({
+        "users": user_count,
+        "posts": post_count,
+        "replies": args.replies,
+        "likes": args.likes,
+        "conversations": args.conversations,
+        "messages": args.messages,
+        "generate_seconds": round(generated_at - started_at, 1),
+        "load_seconds": round(time.monotonic() - generated_at, 1)
+    }, indent = 4))
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    main()
@@ -138,18 +138,19 @@ socket.on("connect", () => {
     Array(...message_collection)
         .forEach(element => element.remove())
 
-    message_cursor_position = 0
+    message_cursor_position = ""
 
     request_messages()
     register_for_realtime()
 })
 
-socket.on("send_message_history", (messages) => {
-    console.log(messages)
+socket.on("send_message_history", (message_page) => {
+    console.log(message_page)
     clear_global_flash_messages()
 
     // if the socket reply doesnt contain the expected messages
-    if (!messages || !Object.keys(messages).length || "error" in messages) {
+    const messages = (message_page && message_page.messages) || []
+    if (!messages.length) {
         load_messages_button.classList.add("hidden")
     } else {
         messages.forEach(add_old_message)
@@ -157,20 +158,18 @@ socket.on("send_message_history", (messages) => {
 
     // scroll to the bottom of the message container if its the first message
     // fetch
-    if (message_cursor_position === 0) {
+    const is_first_fetch = message_cursor_position === ""
+    if (is_first_fetch) {
         message_container.scrollTop = 10e10
     }
 
     // update cursor position
-    const last_message = messages.at(-1)
-    if (last_message) {
-        message_cursor_position = last_message.message_id
-    }
+    message_cursor_position = message_page ? message_page.next_cursor : null
 
     // update load-messages-button visibility
     // theres no more to load or nothing was loaded
-    const no_more_to_load = last_message && last_message.message_idx === 1
-    const nothing_was_loaded = !message_cursor_position
+    const no_more_to_load = !message_cursor_position
+    const nothing_was_loaded = is_first_fetch && !messages.length
 
     // tell the user that loading finished and yielded nothing
     if (nothing_was_loaded) {
@@ -0,0 +1,5 @@
+from pathlib import Path
+import sys
+
+# the tests import Bitter from the repository root, like the benchmarks do. importing it doesn't connect to the database
+sys.path.insert(0, str(Path(__file__).parent.parent))
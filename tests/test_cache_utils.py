@@ -0,0 +1,97 @@
+from Bitter.utils import cache_utils
+from Bitter.utils.cache_utils import LRUCache
+import itertools, pytest
+
+_cache_names = itertools.count()
+
+@pytest.fixture
+def clock(monkeypatch : pytest.MonkeyPatch) -> list[float]:
+    # the current monotonic time as seen by the caches, moved forward by the tests
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, "monotonic", lambda: now[0])
+    return now
+
+def make_cache(max_size = 3, ttl = 10.0) -> LRUCache:
+    return LRUCache(f"test-cache-{next(_cache_names)}", max_size = max_size, ttl = ttl)
+
+def test_get_returns_default_on_miss() -> None:
+    cache = make_cache()
+
+    assert cache.get("missing") is None
+    assert cache.get("missing", 0) == 0
+
+def test_entries_expire_after_ttl(clock : list[float]) -> None:
+    cache = make_cache(ttl = 10)
+    cache.set("key", "value")
+
+    clock[0] += 9.9
+    assert cache.get("key") == "value"
+
+    clock[0] += 0.2
+    assert cache.get("key") is None
+    assert cache.stats()["size"] == 0
+
+def test_per_entry_ttl_overrides_cache_ttl(clock : list[float]) -> None:
+    cache = make_cache(ttl = 10)
+    cache.set("short", 1, ttl = 1)
+    cache.set("long", 2)
+
+    clock[0] += 2
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = make_cache(max_size = 2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # reading "a" makes "b" the least recently used entry
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_set_with_outdated_generation_is_ignored() -> None:
+    cache = make_cache()
+    generation = cache.generation
+
+    # another request invalidates the cache while this one reads from the database
+    cache.clear()
+    cache.set("key", "stale", generation = generation)
+
+    assert cache.get("key") is None
+
+    cache.set("key", "fresh", generation = cache.generation)
+    assert cache.get("key") == "fresh"
+
+@pytest.mark.parametrize("invalidate", [
+    lambda cache: cache.delete("other"),
+    lambda cache: cache.clear(),
+    lambda cache: cache.update_values(lambda value: None)
+])
+def test_invalidations_bump_generation(invalidate) -> None:
+    cache = make_cache()
+    generation = cache.generation
+
+    invalidate(cache)
+
+    assert cache.generation == generation + 1
+
+def test_update_values_patches_entries_in_place() -> None:
+    cache = make_cache()
+    cache.set("post", {"like_count": 1})
+
+    cache.update_values(lambda post: post.update(like_count = post["like_count"] + 1))
+
+    assert cache.get("post") == {"like_count": 2}
+
+def test_stats_count_hits_and_misses() -> None:
+    cache = make_cache()
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
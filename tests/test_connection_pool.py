@@ -0,0 +1,160 @@
+from Bitter.utils.connection_pool import ElasticConnectionPool
+from mysql.connector.errors import PoolError
+import itertools, threading, time, pytest
+
+class FakeConnection:
+    """Stands in for a MySQLConnection, so that the pool can be tested without a database"""
+
+    _ids = itertools.count()
+
+    def __init__(self) -> None:
+        self.id = next(self._ids)
+        self.closed = False
+        self.pings = 0
+
+    def ping(self, reconnect = False) -> None:
+        self.pings += 1
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnectionPool(ElasticConnectionPool):
+    def __init__(self, **kwargs) -> None:
+        pool_config = dict(
+            pool_name = "test-pool",
+            min_size = 0,
+            max_size = 2,
+            checkout_timeout = 0.2,
+            idle_timeout = 300,
+            ping_interval = 30,
+            reap_interval = 60
+        )
+        pool_config.update(kwargs)
+        super().__init__(**pool_config)
+
+        self.opened : list[FakeConnection] = []
+
+    def _open_connection(self) -> FakeConnection:
+        cnx = FakeConnection()
+        self.opened.append(cnx)
+
+        with self._condition:
+            self._metrics["connections_opened"] += 1
+
+        return cnx
+
+def test_creating_the_pool_opens_no_connections() -> None:
+    pool = FakeConnectionPool(min_size = 2)
+
+    assert pool.opened == []
+    assert pool.prefill() == 2
+    assert pool.prefill() == 0
+    assert pool.stats()["idle"] == 2
+
+def test_returned_connection_is_reused() -> None:
+    pool = FakeConnectionPool()
+
+    first = pool.get_connection()
+    first_cnx = first._cnx
+    first.close()
+
+    second = pool.get_connection()
+
+    assert second._cnx is first_cnx
+    assert len(pool.opened) == 1
+
+def test_closing_a_connection_twice_returns_it_once() -> None:
+    pool = FakeConnectionPool()
+
+    cnx = pool.get_connection()
+    cnx.close()
+    cnx.close()
+
+    assert pool.stats()["idle"] == 1
+
+def test_checkout_times_out_when_the_pool_is_exhausted() -> None:
+    pool = FakeConnectionPool(max_size = 2, checkout_timeout = 0.05)
+    held = [pool.get_connection(), pool.get_connection()]
+
+    started_at = time.monotonic()
+    with pytest.raises(PoolError):
+        pool.get_connection()
+
+    assert time.monotonic() - started_at >= 0.05
+    assert pool.stats()["exhaustions"] == 1
+    assert len(held) == len(pool.opened) == 2
+
+def test_waiting_checkout_gets_the_returned_connection() -> None:
+    pool = FakeConnectionPool(max_size = 1, checkout_timeout = 2)
+    held = pool.get_connection()
+    held_cnx = held._cnx
+
+    checked_out = []
+    waiter = threading.Thread(target = lambda: checked_out.append(pool.get_connection()))
+    waiter.start()
+
+    # wait for the checkout to block on the full pool before returning the held connection
+    while pool.stats()["waiting"] == 0:
+        time.sleep(0.001)
+
+    held.close()
+    waiter.join(timeout = 2)
+
+    assert checked_out[0]._cnx is held_cnx
+    assert len(pool.opened) == 1
+
+def test_failed_open_frees_the_slot() -> None:
+    pool = FakeConnectionPool(max_size = 1)
+
+    def fail_to_open() -> FakeConnection:
+        raise ConnectionError("database unavailable")
+
+    pool._open_connection = fail_to_open
+    with pytest.raises(ConnectionError):
+        pool.get_connection()
+
+    assert pool.stats()["size"] == 0
+
+def test_idle_connections_are_pinged_before_checkout() -> None:
+    pool = FakeConnectionPool(ping_interval = 0)
+
+    cnx = pool.get_connection()
+    fake_cnx = cnx._cnx
+    cnx.close()
+    time.sleep(0.001)
+
+    pool.get_connection()
+
+    assert fake_cnx.pings == 1
+
+def test_reaping_closes_idle_connections_down_to_min_size() -> None:
+    pool = FakeConnectionPool(min_size = 1, max_size = 3, idle_timeout = 0)
+    connections = [pool.get_connection() for _ in range(3)]
+    for cnx in connections:
+        cnx.close()
+
+    time.sleep(0.001)
+
+    assert pool.reap_idle_connections() == 2
+    assert pool.stats()["size"] == 1
+    assert sum(cnx.closed for cnx in pool.opened) == 2
+    assert pool.reap_idle_connections() == 0
+
+def test_reaping_keeps_recently_used_connections() -> None:
+    pool = FakeConnectionPool(max_size = 2, idle_timeout = 300)
+    pool.get_connection().close()
+
+    assert pool.reap_idle_connections() == 0
+    assert pool.stats()["idle"] == 1
+
+def test_reaping_leaves_checked_out_connections() -> None:
+    pool = FakeConnectionPool(idle_timeout = 0)
+    held = pool.get_connection()
+
+    assert pool.reap_idle_connections() == 0
+    assert not held._cnx.closed
+
+def test_invalid_pool_size_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        FakeConnectionPool(min_size = 3, max_size = 2)
@@ -0,0 +1,80 @@
+from Bitter.utils.db_statements import StatementCursor, STATEMENTS
+from mysql.connector.conversion import MySQLConverter
+from mysql.connector.errors import ProgrammingError
+import pytest
+
+class FakeConnection:
+    """Stands in for a MySQLConnection and records the commands sent to the server, so that the statement cursor can be
+    tested without a database"""
+
+    def __init__(self, result) -> None:
+        self.connection_id = 1
+        self.python_charset = "utf8"
+        self.converter = MySQLConverter()
+        self.unread_result = False
+        self.commands : list[tuple] = []
+        self._result = result
+        self._next_statement_id = 1
+
+    def cmd_stmt_prepare(self, operation : bytes) -> dict:
+        self.commands.append(("prepare", operation))
+        statement_id, self._next_statement_id = self._next_statement_id, self._next_statement_id + 1
+        return {"statement_id": statement_id, "parameters": [None] * operation.count(b"?"), "columns": []}
+
+    def cmd_stmt_reset(self, statement_id : int) -> None:
+        self.commands.append(("reset", statement_id))
+
+    def cmd_stmt_execute(self, statement_id : int, data = (), parameters = ()) -> dict | tuple:
+        self.commands.append(("execute", statement_id, data))
+        return self._result
+
+    def get_rows(self, binary = False, columns = None) -> tuple[list, dict]:
+        assert binary and self.unread_result
+        self.unread_result = False
+        return [(b"admin", 1)], {}
+
+def test_statements_are_prepared_once_and_executed_without_a_reset() -> None:
+    conn = FakeConnection({"affected_rows": 1, "insert_id": 7})
+    db_cursor = StatementCursor(conn)
+
+    db_cursor.execute("delete_like", (1, 2))
+    db_cursor.execute("delete_like", (3, 4))
+
+    assert [command[0] for command in conn.commands] == ["prepare", "execute", "execute"]
+    assert conn.commands[2] == ("execute", 1, (3, 4))
+    assert (db_cursor.rowcount, db_cursor.lastrowid) == (1, 7)
+
+def test_statements_are_prepared_again_after_a_reconnect() -> None:
+    conn = FakeConnection({"affected_rows": 1, "insert_id": 0})
+    db_cursor = StatementCursor(conn)
+
+    db_cursor.execute("delete_like", (1, 2))
+    conn.connection_id = 2
+    db_cursor.execute("delete_like", (1, 2))
+
+    assert [command[0] for command in conn.commands] == ["prepare", "execute", "prepare", "execute"]
+
+def test_result_rows_are_read_in_full_as_dicts() -> None:
+    description = [("username", 253, None, None, None, None, 0, 0), ("user_id", 3, None, None, None, None, 0, 0)]
+    conn = FakeConnection((2, description, {}))
+    db_cursor = StatementCursor(conn)
+
+    db_cursor.execute("fetch_login_credentials", ("admin",))
+
+    assert not conn.unread_result
+    assert db_cursor.fetchall() == [{"username": "admin", "user_id": 1}]
+    assert db_cursor.fetchone() is None
+
+def test_placeholders_are_sent_as_question_marks() -> None:
+    conn = FakeConnection({"affected_rows": 0, "insert_id": 0})
+    StatementCursor(conn).execute("delete_like", (1, 2))
+
+    _, operation = conn.commands[0]
+    assert b"%s" not in operation
+    assert operation.count(b"?") == STATEMENTS["delete_like"].count("%s")
+
+def test_wrong_parameter_count_is_rejected() -> None:
+    conn = FakeConnection({"affected_rows": 0, "insert_id": 0})
+
+    with pytest.raises(ProgrammingError):
+        StatementCursor(conn).execute("delete_like", (1,))
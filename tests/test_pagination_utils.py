@@ -0,0 +1,57 @@
+from Bitter.utils.pagination_utils import parse_page_args, make_page, cursor_serializer
+from Bitter.utils.db_statements import CURSOR_START
+from Bitter.config import API_CONFIG
+import pytest
+
+def make_posts(*post_ids : int) -> list[dict]:
+    return [{"post_id": post_id} for post_id in post_ids]
+
+def test_missing_cursor_and_limit_request_the_first_page() -> None:
+    page_args, error = parse_page_args("posts", None, None, return_response = False)
+
+    assert error is None
+    assert page_args == (CURSOR_START, API_CONFIG["post_fetch_default_results"])
+
+def test_next_cursor_continues_after_the_last_item() -> None:
+    page = make_page("posts", make_posts(9, 8, 7), limit = 2)
+
+    assert page["posts"] == make_posts(9, 8)
+
+    page_args, error = parse_page_args("posts", page["next_cursor"], "2", return_response = False)
+    assert error is None
+    assert page_args == (8, 2)
+
+def test_last_page_has_no_next_cursor() -> None:
+    page = make_page("posts", make_posts(2, 1), limit = 2)
+
+    assert page == {"posts": make_posts(2, 1), "next_cursor": None}
+    assert make_page("posts", [], limit = 2) == {"posts": [], "next_cursor": None}
+
+def test_tampered_cursor_is_rejected() -> None:
+    cursor = make_page("posts", make_posts(9, 8, 7), limit = 2)["next_cursor"]
+    payload, signature = cursor.rsplit(".", 1)
+    tampered_signature = ("A" if signature[0] != "A" else "B") + signature[1:]
+
+    assert parse_page_args("posts", f"{payload}.{tampered_signature}", None, return_response = False) == (
+        None, "Invalid cursor"
+    )
+
+def test_unsigned_cursor_is_rejected() -> None:
+    assert parse_page_args("posts", "WyJwb3N0cyIsNF0", None, return_response = False) == (None, "Invalid cursor")
+
+def test_cursor_of_another_content_type_is_rejected() -> None:
+    cursor = make_page("replies", [{"reply_id": 5}, {"reply_id": 4}], limit = 1)["next_cursor"]
+
+    assert parse_page_args("posts", cursor, None, return_response = False) == (None, "Invalid cursor")
+
+def test_cursor_with_a_non_integer_id_is_rejected() -> None:
+    cursor = cursor_serializer.dumps(["posts", "8"])
+
+    assert parse_page_args("posts", cursor, None, return_response = False) == (None, "Invalid cursor")
+
+@pytest.mark.parametrize("limit", ["0", str(API_CONFIG["post_fetch_max_results"] + 1)])
+def test_limit_out_of_range_is_rejected(limit : str) -> None:
+    page_args, error = parse_page_args("posts", None, limit, return_response = False)
+
+    assert page_args is None
+    assert error == f"Limit must be between 1 and {API_CONFIG['post_fetch_max_results']}"
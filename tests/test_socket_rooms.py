@@ -0,0 +1,37 @@
+from Bitter.utils.socket_rooms import SocketRoomRegistry, RoomMember
+
+def test_add_is_idempotent() -> None:
+    rooms = SocketRoomRegistry()
+    rooms.add(1, 10, "sid-a")
+    rooms.add(1, 10, "sid-a")
+
+    assert rooms.members(1) == (RoomMember(10, "sid-a"),)
+
+def test_user_ids_counts_each_user_once() -> None:
+    rooms = SocketRoomRegistry()
+    rooms.add(1, 10, "sid-a")
+    rooms.add(1, 10, "sid-b")
+    rooms.add(1, 20, "sid-c")
+
+    assert rooms.user_ids(1) == {10, 20}
+    assert rooms.user_ids(2) == set()
+
+def test_remove_sid_removes_the_session_from_every_room() -> None:
+    rooms = SocketRoomRegistry()
+    rooms.add(1, 10, "sid-a")
+    rooms.add(2, 10, "sid-a")
+    rooms.add(2, 20, "sid-b")
+
+    assert sorted(rooms.remove_sid("sid-a")) == [1, 2]
+
+    assert rooms.members(1) == ()
+    assert rooms.members(2) == (RoomMember(20, "sid-b"),)
+    assert rooms.remove_sid("sid-a") == []
+
+def test_empty_rooms_are_deleted() -> None:
+    rooms = SocketRoomRegistry()
+    rooms.add(1, 10, "sid-a")
+    rooms.remove_sid("sid-a")
+
+    assert rooms._rooms == {}
+    assert rooms._sid_rooms == {}
@@ -0,0 +1,61 @@
+from Bitter import app, forms
+from Bitter.utils.validation_utils import FormSchema, FIELD_VALIDATORS
+import pytest
+
+@pytest.fixture(autouse = True)
+def without_csrf(monkeypatch : pytest.MonkeyPatch) -> None:
+    # CSRF tokens are left to CSRFProtect, so the FlaskForms that FormSchema is compared to don't check them either
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+
+@pytest.mark.parametrize("form_type, form_data", [
+    (forms.LoginForm, {"username": "bench1", "password": "benchpass"}),
+    (forms.LoginForm, {"username": "", "password": "benchpass"}),
+    (forms.LoginForm, {"username": "not valid!", "password": "x" * 25}),
+    (forms.SignupForm, {"display_name": "Bench 1", "username": "bench1", "email": "bench1@example.com",
+                        "password": "benchpass"}),
+    (forms.SignupForm, {"display_name": "Bench 1", "username": "bench1", "email": "not an email",
+                        "password": "benchpass"}),
+    (forms.LikePostForm, {"post_id": "12"}),
+    (forms.LikePostForm, {"post_id": "12a"}),
+    (forms.LikePostForm, {})
+])
+def test_parse_request_matches_flask_form(form_type : type, form_data : dict) -> None:
+    with app.test_request_context("/", method = "POST", data = form_data):
+        flask_form = form_type()
+        flask_form.validate_on_submit()
+
+        parsed_form = FormSchema(form_type).parse_request()
+
+    assert parsed_form.errors == {name: errors for name, errors in flask_form.errors.items() if name != "csrf_token"}
+
+    for name in FormSchema(form_type).field_validators:
+        assert getattr(parsed_form, name).data == getattr(flask_form, name).data
+
+def test_parse_request_returns_none_without_a_submitted_form() -> None:
+    with app.test_request_context("/", method = "GET"):
+        assert FormSchema(forms.LoginForm).parse_request() is None
+
+def test_only_input_fields_are_parsed() -> None:
+    assert list(FormSchema(forms.LoginForm).field_validators) == ["username", "password"]
+
+def test_parse_request_reads_json() -> None:
+    with app.test_request_context("/", method = "POST", json = {"post_id": "7"}):
+        parsed_form = FormSchema(forms.LikePostForm).parse_request()
+
+    assert parsed_form.errors == {}
+    assert parsed_form.post_id.data == "7"
+
+@pytest.mark.parametrize("user_input, expected_error", [
+    ("bench1", None),
+    ("", "Username is missing"),
+    (None, "Username is missing"),
+    ("bench 1", "Username can only contain alphanumerical characters"),
+    ("x" * 25, "Username must be between 1 and 24 characters long")
+])
+def test_check_returns_the_first_error(user_input : str | None, expected_error : str | None) -> None:
+    _, error = FIELD_VALIDATORS["user_username"].check(user_input)
+
+    if expected_error is None:
+        assert error is None
+    else:
+        assert error.startswith(expected_error)
@@ -0,0 +1,103 @@
+from Bitter.utils.write_buffers import WriteBuffer, CountingWriteBuffer, SetWriteBuffer
+import typing, pytest
+
+class FlakyWriter:
+    """Write function that fails its first failures calls and records the writes it accepts"""
+
+    def __init__(self, failures : int) -> None:
+        self.failures = failures
+        self.writes = []
+
+    def __call__(self, pending : typing.Any) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+
+        self.writes.append(pending)
+
+@pytest.fixture
+def make_buffer() -> typing.Iterator[typing.Callable]:
+    buffers = []
+
+    def make_buffer(buffer_type : type, write_func : typing.Callable):
+        # the flusher thread never flushes on its own during a test, so every flush is one of the test's
+        buffer = buffer_type("test-buffer", write_func, flush_interval = 3600, flush_threshold = 1_000_000)
+        buffers.append(buffer)
+        return buffer
+
+    yield make_buffer
+
+    for buffer in buffers:
+        buffer._write_func = lambda pending: None
+        buffer.close()
+
+def test_counting_buffer_merges_writes(make_buffer : typing.Callable) -> None:
+    writer = FlakyWriter(failures = 0)
+    buffer = make_buffer(CountingWriteBuffer, writer)
+
+    buffer.add([1, 2, 1])
+    assert buffer.pending_count(1) == 2
+
+    buffer.flush()
+    assert writer.writes == [{1: 2, 2: 1}]
+    assert buffer.pending_count(1) == 0
+
+def test_counting_buffer_restores_failed_writes(make_buffer : typing.Callable) -> None:
+    writer = FlakyWriter(failures = 1)
+    buffer = make_buffer(CountingWriteBuffer, writer)
+
+    buffer.add([1, 1, 2])
+    buffer.flush()
+
+    # the failed counts are merged with the writes buffered since
+    assert writer.writes == []
+    buffer.add([1, 3])
+    assert buffer.pending_count(1) == 3
+
+    buffer.flush()
+    assert writer.writes == [{1: 3, 2: 1, 3: 1}]
+
+def test_set_buffer_restores_failed_writes(make_buffer : typing.Callable) -> None:
+    writer = FlakyWriter(failures = 1)
+    buffer = make_buffer(SetWriteBuffer, writer)
+
+    buffer.add([1, 2])
+    buffer.flush()
+
+    assert buffer.is_pending(1)
+    buffer.add([2, 3])
+
+    buffer.flush()
+    assert writer.writes == [{1, 2, 3}]
+    assert not buffer.is_pending(1)
+
+def test_set_buffer_writes_repeated_keys_once(make_buffer : typing.Callable) -> None:
+    writer = FlakyWriter(failures = 0)
+    buffer = make_buffer(SetWriteBuffer, writer)
+
+    buffer.add([1, 1, 2])
+    buffer.add([1])
+
+    buffer.flush()
+    assert writer.writes == [{1, 2}]
+
+def test_flushing_an_empty_buffer_writes_nothing(make_buffer : typing.Callable) -> None:
+    writer = FlakyWriter(failures = 0)
+    buffer = make_buffer(CountingWriteBuffer, writer)
+
+    buffer.flush()
+
+    assert writer.writes == []
+
+def test_close_writes_what_is_pending() -> None:
+    writer = FlakyWriter(failures = 0)
+    buffer = CountingWriteBuffer("test-buffer", writer, flush_interval = 3600, flush_threshold = 1_000_000)
+
+    buffer.add([1])
+    buffer.close()
+
+    assert writer.writes == [{1: 1}]
+
+def test_write_buffer_requires_the_merge_hooks() -> None:
+    with pytest.raises(TypeError):
+        WriteBuffer("test-buffer", lambda pending: None, flush_interval = 3600, flush_threshold = 1_000_000)